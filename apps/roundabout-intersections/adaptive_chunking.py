@@ -0,0 +1,206 @@
+"""
+Density-adaptive quadtree chunking of a bounding box.
+
+Starts from a coarse grid and probes each tile with a cheap element count.
+Dense tiles, and tiles whose probe times out, are split into quadrants until
+they are small enough; empty tiles are dropped and neighbouring sparse tiles
+are merged into larger ones.
+"""
+
+import logging
+from typing import Callable, List, Optional, Tuple
+import config
+import projection
+from geometry_utils import split_bbox_into_quadrants
+from overpass_queries import is_size_error
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_MILE = 1609.34
+
+
+def bbox_size_miles(bbox: List[float]) -> Tuple[float, float]:
+    """
+    Get the width and height of a bounding box in miles.
+
+    Args:
+        bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+    Returns:
+        Tuple of (width, height) in miles
+    """
+    xs, ys = projection.transform_coords([bbox[0], bbox[2]], [bbox[1], bbox[3]])
+    return (xs[1] - xs[0]) / METERS_PER_MILE, (ys[1] - ys[0]) / METERS_PER_MILE
+
+
+def coarse_grid(bbox: List[float], chunk_size_miles: float) -> List[List[List[float]]]:
+    """
+    Divide a bounding box into a lon/lat-aligned grid of roughly square tiles.
+
+    Tiles share exact edges, so the grid covers the bbox without gaps.
+
+    Args:
+        bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+        chunk_size_miles: Approximate tile width and height in miles
+
+    Returns:
+        Rows of tiles (south to north), each ordered west to east
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    width, height = bbox_size_miles(bbox)
+    num_x = max(1, int(round(width / chunk_size_miles)))
+    num_y = max(1, int(round(height / chunk_size_miles)))
+
+    lon_edges = [min_lon + (max_lon - min_lon) * i / num_x for i in range(num_x)] + [max_lon]
+    lat_edges = [min_lat + (max_lat - min_lat) * j / num_y for j in range(num_y)] + [max_lat]
+
+    return [
+        [[lon_edges[i], lat_edges[j], lon_edges[i + 1], lat_edges[j + 1]] for i in range(num_x)]
+        for j in range(num_y)
+    ]
+
+
+def _probe(probe: Callable[[List[float]], int], bbox: List[float]) -> Optional[int]:
+    """
+    Count the elements in a tile.
+
+    Args:
+        probe: Function returning the element count for a bbox
+        bbox: Tile bounding box
+
+    Returns:
+        Element count, or None if the probe failed because the tile is too large
+
+    Raises:
+        Exception: If the probe fails for a reason unrelated to tile size
+    """
+    try:
+        return probe(bbox)
+    except Exception as e:
+        if is_size_error(e):
+            logger.info(f"  Probe for {bbox} hit a size limit, splitting: {e}")
+            return None
+        raise
+
+
+def _split_tile(
+    bbox: List[float],
+    probe: Callable[[List[float]], int],
+    max_elements: int,
+    min_chunk_miles: float,
+) -> List[Tuple[List[float], int]]:
+    """
+    Recursively split a tile until every piece is under max_elements.
+
+    Args:
+        bbox: Tile bounding box
+        probe: Function returning the element count for a bbox
+        max_elements: Maximum elements per chunk
+        min_chunk_miles: Tiles are never split below this width/height
+
+    Returns:
+        List of (bbox, element count) tuples for non-empty tiles
+    """
+    count = _probe(probe, bbox)
+
+    if count == 0:
+        return []
+
+    too_dense = count is None or count > max_elements
+    width, height = bbox_size_miles(bbox)
+    can_split = min(width, height) / 2 >= min_chunk_miles
+
+    if not too_dense or not can_split:
+        if too_dense:
+            logger.warning(
+                f"  Tile {bbox} is still dense at the minimum chunk size "
+                f"({count if count is not None else 'unknown'} elements)"
+            )
+        return [(bbox, count if count is not None else max_elements)]
+
+    tiles = []
+    for quadrant in split_bbox_into_quadrants(bbox):
+        tiles.extend(_split_tile(quadrant, probe, max_elements, min_chunk_miles))
+    return tiles
+
+
+def _merge_row(row: List[Tuple[List[float], int]], max_elements: int) -> List[List[float]]:
+    """
+    Merge horizontally adjacent coarse tiles of one grid row while they stay sparse.
+
+    Args:
+        row: List of (bbox, element count) tuples, ordered west to east, or
+            None entries where the row was broken by an empty or split tile
+        max_elements: Maximum elements per merged chunk
+
+    Returns:
+        List of merged bounding boxes
+    """
+    merged = []
+    current = None
+    current_count = 0
+
+    for entry in row:
+        if entry is None:
+            if current is not None:
+                merged.append(current)
+            current = None
+            continue
+
+        bbox, count = entry
+        if current is not None and current_count + count <= max_elements:
+            current = [current[0], current[1], bbox[2], current[3]]
+            current_count += count
+            continue
+
+        if current is not None:
+            merged.append(current)
+        current = list(bbox)
+        current_count = count
+
+    if current is not None:
+        merged.append(current)
+    return merged
+
+
+def build_adaptive_chunks(
+    bbox: List[float],
+    probe: Callable[[List[float]], int],
+    coarse_chunk_miles: float = config.ADAPTIVE_COARSE_CHUNK_MILES,
+    min_chunk_miles: float = config.ADAPTIVE_MIN_CHUNK_MILES,
+    max_elements: int = config.ADAPTIVE_MAX_ELEMENTS,
+) -> List[List[float]]:
+    """
+    Break a bounding box into chunks sized by data density.
+
+    Args:
+        bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+        probe: Function returning the element count for a bbox
+            (e.g. OverpassQueries.count_chunk_elements)
+        coarse_chunk_miles: Size of the initial coarse tiles in miles
+        min_chunk_miles: Tiles are never split below this size in miles
+        max_elements: Maximum number of elements per chunk
+
+    Returns:
+        List of bounding boxes [min_lon, min_lat, max_lon, max_lat]
+    """
+    rows = coarse_grid(bbox, coarse_chunk_miles)
+    logger.info(f"Probing {sum(len(row) for row in rows)} coarse tiles of ~{coarse_chunk_miles} miles")
+
+    chunks = []
+    for coarse_row in rows:
+        row = []
+        for tile in coarse_row:
+            pieces = _split_tile(tile, probe, max_elements, min_chunk_miles)
+            if len(pieces) == 1 and pieces[0][0] == tile:
+                # Unsplit sparse tile, candidate for merging with its neighbours
+                row.append(pieces[0])
+                continue
+
+            row.append(None)
+            chunks.extend(piece for piece, _ in pieces)
+
+        chunks.extend(_merge_row(row, max_elements))
+
+    logger.info(f"Adaptive chunking produced {len(chunks)} chunks")
+    return chunks
@@ -0,0 +1,299 @@
+"""
+Layered on-disk cache of the intermediate results of each chunk.
+
+Every chunk passes through four layers, each stored separately:
+1. chunk_data: the parsed roads and traffic signals (a ChunkStore)
+2. two_lane_roads: the two-lane road mask over the chunk's ways
+3. road_counts: the number of two-lane roads near each traffic signal
+4. records: the chunk's final intersection features
+
+A layer's key hashes the key or content of the layer before it together
+with the layer's own parameters: the data source and query settings for
+chunk data, the two-lane rules for road sets, the buffer radius for road
+counts and MIN_ROAD_INTERSECTIONS for records. Changing a parameter
+therefore only misses the layers from its own onwards; e.g. a new
+MIN_ROAD_INTERSECTIONS reuses the chunk data, road sets and road counts.
+
+Chunk data expires after a TTL, as the OSM data behind it changes. The
+derived layers are keyed by the digest of the chunk data they were computed
+from, so refreshed but unchanged data keeps them valid.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import config
+import two_lane_filter
+from chunk_store import ChunkStore
+
+logger = logging.getLogger(__name__)
+
+# Cache layers, in pipeline order
+CHUNK_DATA = "chunk_data"
+TWO_LANE_ROADS = "two_lane_roads"
+ROAD_COUNTS = "road_counts"
+RECORDS = "records"
+LAYERS = [CHUNK_DATA, TWO_LANE_ROADS, ROAD_COUNTS, RECORDS]
+
+# Bump when the layout of an intersection record changes
+RECORDS_FORMAT_VERSION = 1
+
+
+def layer_key(layer: str, parent: Optional[str], params: Dict[str, Any]) -> str:
+    """
+    Build the key of a layer entry.
+
+    Args:
+        layer: Layer name
+        parent: Key or content digest of the entry this one is derived from
+        params: Parameters the layer applies
+
+    Returns:
+        Hex digest identifying the entry
+    """
+    text = json.dumps({"layer": layer, "parent": parent, "params": params}, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def data_source_params() -> Dict[str, Any]:
+    """
+    Describe where chunk data comes from, so data from different sources never share an entry.
+
+    Returns:
+        Dictionary with the source name, and the path, size and modification
+        time of the extract when reading one
+    """
+    if config.DATA_SOURCE != "extract":
+        return {"source": config.DATA_SOURCE}
+    path = Path(config.OSM_EXTRACT_PATH)
+    stat = path.stat()
+    return {
+        "source": "extract",
+        "path": str(path.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+class ArtifactCache:
+    """Persistent cache of per-chunk artifacts in dependent layers."""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        source: Optional[Dict[str, Any]] = None,
+        ttl_seconds: float = config.ARTIFACT_CACHE_TTL_SECONDS,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding one subdirectory per layer
+            source: Description of the data source (defaults to data_source_params())
+            ttl_seconds: Age in seconds after which chunk data is treated as missing
+        """
+        self.cache_dir = Path(cache_dir)
+        for layer in LAYERS:
+            (self.cache_dir / layer).mkdir(parents=True, exist_ok=True)
+        self.source = source if source is not None else data_source_params()
+        self.ttl_seconds = ttl_seconds
+        self._counts = {layer: {"hits": 0, "misses": 0} for layer in LAYERS}
+        self._lock = threading.Lock()
+
+    def _path(self, layer: str, key: str) -> Path:
+        suffix = ".json" if layer == RECORDS else ".npz"
+        return self.cache_dir / layer / f"{key}{suffix}"
+
+    def _count(self, layer: str, hit: bool):
+        with self._lock:
+            self._counts[layer]["hits" if hit else "misses"] += 1
+
+    def _read(self, layer: str, key: str) -> Optional[Any]:
+        """Read an entry: a dict of arrays, or the decoded JSON of a records entry."""
+        path = self._path(layer, key)
+        try:
+            if layer == CHUNK_DATA and time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink()
+                self._count(layer, False)
+                return None
+            if layer == RECORDS:
+                value = json.loads(path.read_text())
+            else:
+                with np.load(path) as data:
+                    value = {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            self._count(layer, False)
+            return None
+        self._count(layer, True)
+        return value
+
+    def _write(self, layer: str, key: str, value: Any):
+        """Write an entry atomically, so concurrent readers never see a partial file."""
+        path = self._path(layer, key)
+        tmp_path = path.with_name(f"{path.stem}.tmp{threading.get_ident()}{path.suffix}")
+        if layer == RECORDS:
+            tmp_path.write_text(json.dumps(value, separators=(",", ":")))
+        else:
+            np.savez(tmp_path, **value)
+        os.replace(tmp_path, path)
+
+    def _get_or_compute(self, layer: str, key: str, compute: Callable[[], Any], encode, decode) -> Any:
+        cached = self._read(layer, key)
+        if cached is not None:
+            return decode(cached)
+        value = compute()
+        self._write(layer, key, encode(value))
+        return value
+
+    def chunk_data_key(self, chunk_bbox: List[float]) -> str:
+        """
+        Key of a chunk's data: its bbox, the data source and the query settings.
+
+        With TWO_LANE_PUSHDOWN the server only returns roads passing the
+        two-lane rules, so the rules are part of the key in that mode.
+        """
+        return layer_key(CHUNK_DATA, None, {
+            "bbox": [round(coord, 7) for coord in chunk_bbox],
+            "source": self.source,
+            "road_highways": config.TWO_LANE_ROAD_TAGS["highway"],
+            "combined_query": config.COMBINED_CHUNK_QUERY,
+            "two_lane_pushdown": config.TWO_LANE_PUSHDOWN,
+            "pushdown_rules": two_lane_filter.rule_parameters() if config.TWO_LANE_PUSHDOWN else None,
+            "inline_geometry": config.INLINE_GEOMETRY,
+            "tag_keys": config.STORE_TAG_KEYS,
+            "tag_prefixes": config.STORE_TAG_PREFIXES,
+        })
+
+    def two_lane_key(self, store: ChunkStore) -> str:
+        """Key of a chunk's two-lane road set: the chunk data content and the two-lane rules."""
+        return layer_key(TWO_LANE_ROADS, store.digest(), two_lane_filter.rule_parameters())
+
+    def road_counts_key(self, store: ChunkStore, chunk_bbox: List[float]) -> str:
+        """Key of a chunk's road counts: its road set, the signals' bbox and the buffer radius."""
+        return layer_key(ROAD_COUNTS, self.two_lane_key(store), {
+            "bbox": [round(coord, 7) for coord in chunk_bbox],
+            "buffer_radius_meters": config.SIGNAL_BUFFER_RADIUS_METERS,
+            "utm_crs": config.UTM_CRS,
+        })
+
+    def records_key(self, store: ChunkStore, chunk_bbox: List[float]) -> str:
+        """Key of a chunk's records: its road counts and the minimum road count."""
+        return layer_key(RECORDS, self.road_counts_key(store, chunk_bbox), {
+            "min_road_intersections": config.MIN_ROAD_INTERSECTIONS,
+            "format": RECORDS_FORMAT_VERSION,
+        })
+
+    def load_chunk_data(self, chunk_bbox: List[float]) -> Optional[ChunkStore]:
+        """
+        Look up a chunk's data.
+
+        Args:
+            chunk_bbox: Chunk bounding box
+
+        Returns:
+            Chunk store with the chunk's roads and signals, or None on a miss
+        """
+        arrays = self._read(CHUNK_DATA, self.chunk_data_key(chunk_bbox))
+        return None if arrays is None else ChunkStore.from_arrays(arrays)
+
+    def save_chunk_data(self, chunk_bbox: List[float], store: ChunkStore):
+        """
+        Store a chunk's data.
+
+        Args:
+            chunk_bbox: Chunk bounding box
+            store: Chunk store with the chunk's roads and signals
+        """
+        self._write(CHUNK_DATA, self.chunk_data_key(chunk_bbox), store.to_arrays())
+
+    def discard_chunk_data(self, chunk_bbox: List[float]):
+        """
+        Drop a chunk's data, e.g. when its OSM data is known to have changed.
+
+        Args:
+            chunk_bbox: Chunk bounding box
+        """
+        try:
+            self._path(CHUNK_DATA, self.chunk_data_key(chunk_bbox)).unlink()
+        except OSError:
+            pass
+
+    def two_lane_mask(self, store: ChunkStore, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Get a chunk's two-lane road mask, computing and storing it on a miss.
+
+        Args:
+            store: Chunk store
+            compute: Function computing the mask over store.way_ids
+
+        Returns:
+            Boolean mask over the store's ways
+        """
+        return self._get_or_compute(
+            TWO_LANE_ROADS,
+            self.two_lane_key(store),
+            compute,
+            lambda mask: {"mask": np.asarray(mask, dtype=bool)},
+            lambda arrays: arrays["mask"],
+        )
+
+    def road_counts(
+        self, store: ChunkStore, chunk_bbox: List[float], compute: Callable[[], Dict[str, int]]
+    ) -> Dict[str, int]:
+        """
+        Get a chunk's per-signal road counts, computing and storing them on a miss.
+
+        Args:
+            store: Chunk store
+            chunk_bbox: Chunk bounding box the signals lie in
+            compute: Function counting the two-lane roads near each signal
+
+        Returns:
+            Dictionary mapping signal node IDs to road counts
+        """
+        return self._get_or_compute(
+            ROAD_COUNTS,
+            self.road_counts_key(store, chunk_bbox),
+            compute,
+            lambda counts: {
+                "signal_ids": np.array([int(signal_id) for signal_id in counts], dtype=np.int64),
+                "counts": np.array(list(counts.values()), dtype=np.int64),
+            },
+            lambda arrays: {
+                str(signal_id): int(count) for signal_id, count in zip(arrays["signal_ids"], arrays["counts"])
+            },
+        )
+
+    def records(
+        self, store: ChunkStore, chunk_bbox: List[float], compute: Callable[[], List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a chunk's intersection features, computing and storing them on a miss.
+
+        Args:
+            store: Chunk store
+            chunk_bbox: Chunk bounding box
+            compute: Function building the chunk's GeoJSON features
+
+        Returns:
+            List of GeoJSON features
+        """
+        return self._get_or_compute(
+            RECORDS, self.records_key(store, chunk_bbox), compute, lambda features: features, lambda features: features
+        )
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get hit and miss counters per layer.
+
+        Returns:
+            Dictionary mapping layer name to {"hits", "misses"}
+        """
+        with self._lock:
+            return {layer: dict(counts) for layer, counts in self._counts.items()}
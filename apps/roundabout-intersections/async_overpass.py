@@ -0,0 +1,494 @@
+"""
+Asyncio Overpass API client with pooled keep-alive connections.
+
+AsyncOverpassQueries offers the query methods of OverpassQueries as
+coroutines. Requests go over a small pool of persistent HTTP/1.1
+connections opened with asyncio streams, backoff sleeps only suspend the
+waiting task, and cancelling a task drops its connection instead of
+returning it to the pool. The query plans of OverpassQueries (query
+building, bbox splits, retries, endpoint choice, caching, missing nodes and
+parsing) are shared; this client only supplies the transport and awaits
+the plans' effects.
+"""
+
+import asyncio
+import contextvars
+import gzip
+import logging
+import ssl
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import config
+import overpass_queries
+import overpass_status
+from overpass_queries import (
+    Acquire,
+    Blocking,
+    OverpassQueries,
+    OverpassRateLimited,
+    Plan,
+    Sleep,
+    advance,
+)
+from rate_limiter import AsyncRateLimiter
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+_MAX_HEADER_LINE = 64 * 1024
+
+
+class HTTPResponse:
+    """Status, headers and fully read body of one HTTP response."""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        """
+        Initialize the response.
+
+        Args:
+            status: HTTP status code
+            headers: Response headers with lower-case names
+            body: Response body, already decoded from its content encoding
+        """
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class _Connection:
+    """One keep-alive connection of the pool."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+        self.requests = 0
+
+    def close(self):
+        """Close the underlying transport."""
+        self.writer.close()
+
+
+class ConnectionPool:
+    """Pool of persistent HTTP/1.1 connections to one host."""
+
+    def __init__(
+        self,
+        url: str,
+        max_connections: int = config.ASYNC_MAX_CONNECTIONS,
+        idle_timeout: float = config.ASYNC_IDLE_TIMEOUT_SECONDS,
+        connect_timeout: float = config.ASYNC_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = config.ASYNC_READ_TIMEOUT_SECONDS,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            url: Endpoint URL (http or https)
+            max_connections: Maximum number of open connections
+            idle_timeout: Seconds after which an idle connection is not reused
+            connect_timeout: Timeout in seconds for opening a connection
+            read_timeout: Timeout in seconds for each read of a response
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += f"?{parts.query}"
+        self.host_header = parts.netloc
+
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._idle: List[_Connection] = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    async def _connect(self) -> _Connection:
+        """Open a new connection."""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl, limit=_MAX_HEADER_LINE
+            ),
+            self.connect_timeout,
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    def _take_idle(self) -> Optional[_Connection]:
+        """Take the most recently used idle connection that is still usable."""
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop()
+            if now - connection.last_used < self.idle_timeout and not connection.reader.at_eof():
+                return connection
+            connection.close()
+        return None
+
+    async def request(
+        self, method: str, path: Optional[str] = None, body: bytes = b"", headers: Optional[Dict[str, str]] = None
+    ) -> HTTPResponse:
+        """
+        Send a request and read the whole response.
+
+        A request failing on a reused connection before any response arrived
+        is retried once on a new connection, as the server may have closed
+        the idle connection in the meantime.
+
+        Args:
+            method: HTTP method
+            path: Request path (defaults to the endpoint URL's path)
+            body: Request body
+            headers: Additional request headers
+
+        Returns:
+            HTTPResponse
+
+        Raises:
+            ConnectionError: If the connection fails
+            asyncio.TimeoutError: If connecting or reading times out
+        """
+        request = self._format_request(method, path or self.path, body, headers or {})
+
+        async with self._slots:
+            connection = self._take_idle()
+            reused = connection is not None
+            if connection is None:
+                connection = await self._connect()
+
+            try:
+                response, keep_alive = await self._send(connection, request)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                connection.close()
+                if not reused:
+                    raise
+                logger.debug(f"Reused connection failed ({e!r}); reconnecting")
+                connection = await self._connect()
+                try:
+                    response, keep_alive = await self._send(connection, request)
+                except BaseException:
+                    connection.close()
+                    raise
+            except BaseException:
+                # Includes cancellation: a half-read response leaves the connection unusable
+                connection.close()
+                raise
+
+            if keep_alive:
+                connection.last_used = time.monotonic()
+                self._idle.append(connection)
+            else:
+                connection.close()
+            return response
+
+    def _format_request(self, method: str, path: str, body: bytes, headers: Dict[str, str]) -> bytes:
+        """Serialize a request head and body."""
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host_header}",
+            "Connection: keep-alive",
+            "Accept-Encoding: gzip, deflate",
+            f"Content-Length: {len(body)}",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    async def _send(self, connection: _Connection, request: bytes) -> Tuple[HTTPResponse, bool]:
+        """
+        Write a request on a connection and read its response.
+
+        Returns:
+            Tuple of (response, whether the connection can be reused)
+        """
+        connection.writer.write(request)
+        await connection.writer.drain()
+        connection.requests += 1
+        self.requests_sent += 1
+
+        reader = connection.reader
+        status_line = await self._read_line(reader)
+        if not status_line:
+            raise ConnectionError("Connection closed before a response arrived")
+        version, status = self._parse_status_line(status_line)
+
+        headers = {}
+        while True:
+            line = await self._read_line(reader)
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked(reader)
+        elif "content-length" in headers:
+            body = await self._read_exactly(reader, int(headers["content-length"]))
+        else:
+            body = await asyncio.wait_for(reader.read(), self.read_timeout)
+            headers["connection"] = "close"
+
+        connection_header = headers.get("connection", "").lower()
+        keep_alive = connection_header != "close" and (version != "HTTP/1.0" or connection_header == "keep-alive")
+        return HTTPResponse(status, headers, self._decode_body(body, headers)), keep_alive
+
+    async def _read_line(self, reader: asyncio.StreamReader) -> str:
+        """Read one header line without its line ending."""
+        line = await asyncio.wait_for(reader.readline(), self.read_timeout)
+        if line and not line.endswith(b"\n"):
+            raise asyncio.IncompleteReadError(line, None)
+        return line.rstrip(b"\r\n").decode("latin-1")
+
+    async def _read_exactly(self, reader: asyncio.StreamReader, size: int) -> bytes:
+        """Read a body of known size."""
+        return await asyncio.wait_for(reader.readexactly(size), self.read_timeout)
+
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        """Read a body sent with chunked transfer encoding."""
+        chunks = []
+        while True:
+            size = int((await self._read_line(reader)).split(";")[0], 16)
+            if size == 0:
+                # Skip trailers up to the final empty line
+                while await self._read_line(reader):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await self._read_exactly(reader, size))
+            await self._read_line(reader)
+
+    @staticmethod
+    def _parse_status_line(line: str) -> Tuple[str, int]:
+        """Split a status line into (HTTP version, status code)."""
+        parts = line.split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ConnectionError(f"Malformed status line: {line!r}")
+        return parts[0], int(parts[1])
+
+    @staticmethod
+    def _decode_body(body: bytes, headers: Dict[str, str]) -> bytes:
+        """Undo gzip or deflate content encoding."""
+        encoding = headers.get("content-encoding", "").lower()
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        if encoding == "deflate":
+            return zlib.decompress(body)
+        return body
+
+    async def close(self):
+        """Close all idle connections."""
+        while self._idle:
+            connection = self._idle.pop()
+            connection.close()
+            try:
+                await connection.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+
+class AsyncOverpassQueries(OverpassQueries):
+    """Handle Overpass API queries as coroutines over pooled keep-alive connections."""
+
+    def __init__(
+        self,
+        api_url: str = config.OVERPASS_API_URL,
+        max_retries: int = 5,
+        initial_delay: float = 5.0,
+        max_delay: float = 300.0,
+        rate_limiter: Optional[AsyncRateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        max_connections: int = config.ASYNC_MAX_CONNECTIONS,
+        **kwargs,
+    ):
+        """
+        Initialize the async Overpass API client.
+
+        Must be created inside a running event loop's thread; call close()
+        (or use `async with`) to close the pooled connections.
+
+        Args:
+            api_url: Overpass API endpoint URL
+            max_retries: Maximum number of retry attempts
+            initial_delay: Initial delay in seconds before first retry
+            max_delay: Maximum delay in seconds between retries
+            rate_limiter: Optional rate limiter shared by all tasks using the endpoint
+            cache: Optional on-disk cache of raw responses
+            max_connections: Maximum number of pooled connections
+            **kwargs: Further OverpassQueries options (streaming_json, endpoints, ...);
+                an endpoint pool must be built with AsyncRateLimiter
+        """
+        super().__init__(
+            api_url=api_url,
+            max_retries=max_retries,
+            initial_delay=initial_delay,
+            max_delay=max_delay,
+            cache=cache,
+            **kwargs,
+        )
+        self.rate_limiter = rate_limiter
+        self.max_connections = max_connections
+        self.pool = ConnectionPool(self.api_url, max_connections=max_connections)
+        # Connection pools of the other endpoints of an endpoint pool, by URL
+        self._pools = {self.api_url: self.pool}
+
+        # Raw response bytes received, counted per task so concurrent chunks don't mix
+        self._bytes_received = contextvars.ContextVar("bytes_received", default=0)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    async def close(self):
+        """Close the pooled connections."""
+        for pool in self._pools.values():
+            await pool.close()
+
+    def _connection_pool(self, url: str) -> ConnectionPool:
+        """Get the connection pool of an endpoint, creating it on first use."""
+        if url not in self._pools:
+            self._pools[url] = ConnectionPool(url, max_connections=self.max_connections)
+        return self._pools[url]
+
+    def take_bytes_received(self) -> int:
+        """
+        Get and reset the raw response bytes received by the calling task.
+
+        Returns:
+            Number of response bytes (cached or fetched) since the last call
+        """
+        received = self._bytes_received.get()
+        self._bytes_received.set(0)
+        return received
+
+    def _count_bytes(self, body: bytes):
+        """Add a response body to the calling task's byte counter."""
+        self._bytes_received.set(self._bytes_received.get() + len(body))
+
+    async def _fetch_raw(self, query: str, url: Optional[str] = None) -> Tuple[bytes, str]:
+        """
+        Send a query over a pooled connection and return the raw response.
+
+        Args:
+            query: Overpass QL query string
+            url: Endpoint URL (defaults to api_url)
+
+        Returns:
+            Tuple of (raw response body, content type)
+
+        Raises:
+            overpy.exception.OverPyException: If the server returns an error status
+        """
+        url = url or self.api_url
+        await self._wait_for_slot(url)
+        response = await self._connection_pool(url).request(
+            "POST",
+            body=query.encode("utf-8"),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        try:
+            result = overpass_queries.check_response_status(
+                query,
+                response.status,
+                response.body,
+                response.headers.get("content-type", ""),
+                response.headers.get("retry-after"),
+            )
+        except OverpassRateLimited as e:
+            self._note_throttled(url, e)
+            raise
+        self._note_accepted(url)
+        return result
+
+    async def _wait_for_slot(self, url: str):
+        """
+        Wait until the endpoint's status page reports a free query slot.
+
+        Args:
+            url: Endpoint URL
+        """
+        scheduler = self._slot_scheduler(url)
+        if scheduler is None:
+            return
+
+        while True:
+            reserved, wait = scheduler.reserve()
+            if reserved:
+                return
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                response = await asyncio.wait_for(
+                    self._connection_pool(url).request("GET", path=urlsplit(scheduler.status_url).path),
+                    config.OVERPASS_STATUS_TIMEOUT_SECONDS,
+                )
+                if response.status != 200:
+                    raise ValueError(f"HTTP status {response.status}")
+                text = response.body.decode("utf-8", errors="replace")
+                scheduler.update(overpass_status.parse_status(text))
+            except asyncio.CancelledError:
+                scheduler.cancel_refresh()
+                raise
+            except Exception as e:
+                scheduler.disable(e)
+
+    async def _run(self, plan: Plan) -> Any:
+        """
+        Drive a plan to completion, awaiting its effects.
+
+        Cancelling the calling task closes the plan, which releases its
+        endpoint and rate limiter slot.
+
+        Args:
+            plan: Generator returned by a plan method
+
+        Returns:
+            The plan's return value
+        """
+        try:
+            finished, step = advance(plan)
+            while not finished:
+                try:
+                    value = await self._perform(step)
+                except Exception as e:
+                    finished, step = advance(plan, error=e)
+                else:
+                    finished, step = advance(plan, value)
+            return step
+        finally:
+            plan.close()
+
+    async def _perform(self, effect: Any) -> Any:
+        """
+        Perform one effect of a plan without blocking the event loop.
+
+        Blocking calls (cache and recording files, parsing) run in worker
+        threads so they don't stall the other requests of the event loop.
+
+        Args:
+            effect: Sleep, Blocking, Acquire or Send
+
+        Returns:
+            The effect's result
+        """
+        if isinstance(effect, Sleep):
+            await asyncio.sleep(effect.seconds)
+            return None
+        if isinstance(effect, Blocking):
+            return await asyncio.to_thread(effect.function, *effect.args)
+        if isinstance(effect, Acquire):
+            await effect.rate_limiter.acquire()
+            return None
+        return await self._fetch_raw(effect.query, effect.url)
@@ -0,0 +1,244 @@
+"""
+End-to-end benchmark of the intersection pipeline on recorded Overpass data.
+
+Usage:
+    python benchmark.py record --recording data/recordings/phoenix
+    python benchmark.py replay --recording data/recordings/phoenix --repeat 3 --json bench.json
+
+`record` runs main.main() against the live API once, saving every raw
+Overpass response and the run's output as the recording's baseline.
+`replay` runs main.main() from the recording without network access,
+reports per-stage timings and checks the output against the baseline.
+Both use a scratch manifest and output directory, so they never resume
+from or overwrite a regular run.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import config
+import geojson_stream
+import main as pipeline
+import stage_timings
+from overpass_recording import RECORD, REPLAY
+
+logger = logging.getLogger(__name__)
+
+BASELINE_FILE = "baseline.geojson"
+COORDINATE_DECIMALS = 7
+
+
+@contextmanager
+def config_overrides(**values: Any) -> Iterator[None]:
+    """Temporarily replace config settings."""
+    previous = {name: getattr(config, name) for name in values}
+    for name, value in values.items():
+        setattr(config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(config, name, value)
+
+
+def run_pipeline(recording_dir: Path, mode: str, output_file: Path, work_dir: Path) -> Dict[str, Any]:
+    """
+    Run main.main() once with a recording and scratch state.
+
+    Args:
+        recording_dir: Recording directory
+        mode: RECORD or REPLAY
+        output_file: Path of the aggregated output
+        work_dir: Directory for the run's manifest and chunk files
+
+    Returns:
+        Dictionary with the run's wall time and per-stage timings
+    """
+    overrides = {
+        "OVERPASS_RECORDING_MODE": mode,
+        "OVERPASS_RECORDING_DIR": str(recording_dir),
+        "MANIFEST_DB": str(work_dir / "manifest.sqlite"),
+        "CHUNK_RESULTS_DIR": str(work_dir / "intersections"),
+        "RESULTS_FILE": str(output_file),
+    }
+    if mode == REPLAY:
+        # Every response comes from the recording
+        overrides["RESPONSE_CACHE_ENABLED"] = False
+
+    stage_timings.TIMINGS.reset()
+    with config_overrides(**overrides):
+        started = time.perf_counter()
+        pipeline.main()
+        wall = time.perf_counter() - started
+    return {"wall_seconds": wall, "stages": stage_timings.TIMINGS.snapshot()}
+
+
+def _feature_key(feature: Dict[str, Any]) -> str:
+    """Identify a feature by its intersection id."""
+    return str(feature.get("properties", {}).get("intersection_id"))
+
+
+def _normalize_feature(feature: Dict[str, Any]) -> Dict[str, Any]:
+    """Round coordinates so floating point noise does not count as a difference."""
+    geometry = feature.get("geometry") or {}
+    coordinates = geometry.get("coordinates")
+    if coordinates is not None and geometry.get("type") == "Point":
+        coordinates = [round(value, COORDINATE_DECIMALS) for value in coordinates]
+    return {
+        "geometry": {"type": geometry.get("type"), "coordinates": coordinates},
+        "properties": feature.get("properties", {}),
+    }
+
+
+def compare_outputs(output_file: Path, baseline_file: Path) -> Dict[str, List[str]]:
+    """
+    Compare a run's output with a baseline, feature by feature.
+
+    Args:
+        output_file: Output of the run
+        baseline_file: Baseline GeoJSON
+
+    Returns:
+        Dictionary with the intersection ids that are "missing" from the
+        output, "extra" in the output, or "changed"
+    """
+    baseline = {_feature_key(f): _normalize_feature(f) for f in geojson_stream.iter_features(str(baseline_file))}
+    output = {_feature_key(f): _normalize_feature(f) for f in geojson_stream.iter_features(str(output_file))}
+    return {
+        "missing": sorted(baseline.keys() - output.keys()),
+        "extra": sorted(output.keys() - baseline.keys()),
+        "changed": sorted(key for key in baseline.keys() & output.keys() if baseline[key] != output[key]),
+    }
+
+
+def summarize_runs(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Summarize repeated runs by their best and median times.
+
+    Args:
+        runs: Results of run_pipeline()
+
+    Returns:
+        Dictionary with wall time and per-stage statistics
+    """
+
+    def stats(values: List[float]) -> Dict[str, float]:
+        values = sorted(values)
+        return {"min": values[0], "median": values[len(values) // 2], "max": values[-1]}
+
+    stage_names = sorted({name for run in runs for name in run["stages"]})
+    return {
+        "runs": len(runs),
+        "wall_seconds": stats([run["wall_seconds"] for run in runs]),
+        "stages": {
+            name: {
+                "seconds": stats([run["stages"].get(name, {}).get("seconds", 0.0) for run in runs]),
+                "calls": runs[0]["stages"].get(name, {}).get("calls", 0),
+            }
+            for name in stage_names
+        },
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    """Print a table of the median stage timings."""
+    wall = summary["wall_seconds"]
+    print(f"\n{summary['runs']} run(s), wall time median {wall['median']:.3f}s (min {wall['min']:.3f}s)")
+    print(f"{'stage':<24}{'calls':>8}{'median s':>12}{'min s':>12}")
+    for name, stage in sorted(summary["stages"].items(), key=lambda item: -item[1]["seconds"]["median"]):
+        seconds = stage["seconds"]
+        print(f"{name:<24}{stage['calls']:>8}{seconds['median']:>12.3f}{seconds['min']:>12.3f}")
+
+
+def record(recording_dir: Path):
+    """
+    Record a live run and keep its output as the baseline.
+
+    Args:
+        recording_dir: Recording directory to create or extend
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = run_pipeline(recording_dir, RECORD, recording_dir / BASELINE_FILE, Path(work_dir))
+    logger.info(f"Recorded run in {result['wall_seconds']:.1f}s to {recording_dir}")
+
+
+def replay(
+    recording_dir: Path,
+    repeat: int = 1,
+    baseline_file: Optional[Path] = None,
+    json_file: Optional[Path] = None,
+) -> bool:
+    """
+    Benchmark replayed runs and verify their output.
+
+    Args:
+        recording_dir: Recording directory
+        repeat: Number of runs
+        baseline_file: Baseline GeoJSON (defaults to the recording's baseline)
+        json_file: Optional path for a machine-readable report
+
+    Returns:
+        True if every run's output matches the baseline
+    """
+    baseline_file = baseline_file or recording_dir / BASELINE_FILE
+    runs = []
+    mismatches = []
+    for i in range(repeat):
+        with tempfile.TemporaryDirectory() as work_dir:
+            output_file = Path(work_dir) / "results.geojson"
+            runs.append(run_pipeline(recording_dir, REPLAY, output_file, Path(work_dir)))
+            if baseline_file.exists():
+                diff = compare_outputs(output_file, baseline_file)
+                if any(diff.values()):
+                    mismatches.append({"run": i + 1, **diff})
+
+    summary = summarize_runs(runs)
+    summary["baseline"] = str(baseline_file) if baseline_file.exists() else None
+    summary["matches_baseline"] = not mismatches if baseline_file.exists() else None
+    summary["mismatches"] = mismatches
+
+    print_summary(summary)
+    if not baseline_file.exists():
+        print(f"No baseline at {baseline_file}; output not verified")
+    elif mismatches:
+        for mismatch in mismatches:
+            print(
+                f"Run {mismatch['run']} differs from the baseline: {len(mismatch['missing'])} missing, "
+                f"{len(mismatch['extra'])} extra, {len(mismatch['changed'])} changed"
+            )
+    else:
+        print(f"Output matches {baseline_file}")
+
+    if json_file is not None:
+        json_file.write_text(json.dumps(summary, indent=2))
+    return not mismatches
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=[RECORD, REPLAY])
+    parser.add_argument("--recording", type=Path, default=Path(config.OVERPASS_RECORDING_DIR))
+    parser.add_argument("--repeat", type=int, default=1, help="Number of replayed runs")
+    parser.add_argument("--baseline", type=Path, help="Baseline GeoJSON (default: the recording's)")
+    parser.add_argument("--json", type=Path, help="Write the replay report as JSON")
+    parser.add_argument("--quiet", action="store_true", help="Only log warnings from the pipeline")
+    args = parser.parse_args(argv)
+
+    if args.quiet:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    if args.command == RECORD:
+        record(args.recording)
+        return 0
+    return 0 if replay(args.recording, args.repeat, args.baseline, args.json) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
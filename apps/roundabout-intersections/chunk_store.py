@@ -0,0 +1,1009 @@
+"""
+Compact columnar storage for the OSM elements of one chunk.
+
+Nodes, ways and relations are held in NumPy arrays instead of overpy object
+graphs: int64 ids, float64 coordinates, CSR-style way -> node and
+relation -> member indexes, and tags interned into one string table shared
+by all columns. Filters select elements with vectorized comparisons on tag
+columns instead of walking tag dictionaries one element at a time.
+"""
+
+import hashlib
+import logging
+from array import array
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import overpy
+
+logger = logging.getLogger(__name__)
+
+# Code used for absent tags and unresolved references
+MISSING = -1
+
+# Node id recorded for the nodes of ways known only from inline member geometry
+MISSING_NODE_ID = 0
+
+# Relation member type codes
+MEMBER_NODE = 0
+MEMBER_WAY = 1
+MEMBER_RELATION = 2
+
+_MEMBER_TYPES = {"node": MEMBER_NODE, "way": MEMBER_WAY, "relation": MEMBER_RELATION}
+
+
+def csr_take(offsets: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select rows of a CSR index.
+
+    Args:
+        offsets: Row offsets into the flat value arrays (length rows + 1)
+        rows: Indices of the rows to select
+
+    Returns:
+        Tuple of (offsets of the selected rows, positions of their values in the flat arrays)
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    positions = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1], dtype=np.int64)
+    return new_offsets, positions
+
+
+def csr_concat(offsets_list: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Concatenate the offsets of several CSR indexes whose value arrays are concatenated too.
+
+    Args:
+        offsets_list: Row offsets of each index
+
+    Returns:
+        Row offsets of the combined index
+    """
+    parts = [np.zeros(1, dtype=np.int64)]
+    base = 0
+    for offsets in offsets_list:
+        parts.append(offsets[1:] + base)
+        base += int(offsets[-1])
+    return np.concatenate(parts)
+
+
+def _row_lengths_to_owners(offsets: np.ndarray) -> np.ndarray:
+    """Map every value position of a CSR index to the row it belongs to."""
+    return np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+
+
+class StringTable:
+    """Interned strings shared by the tag and role columns of a store."""
+
+    def __init__(self, strings: Optional[Iterable[str]] = None):
+        """
+        Initialize the table.
+
+        Args:
+            strings: Optional strings to intern, in code order
+        """
+        self.strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in strings or []:
+            self.intern(value)
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def intern(self, value: str) -> int:
+        """
+        Get the code of a string, adding it to the table if needed.
+
+        Args:
+            value: String to intern
+
+        Returns:
+            Integer code of the string
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self._codes[value] = code
+            self.strings.append(value)
+        return code
+
+    def code(self, value: str) -> int:
+        """
+        Look up the code of a string without adding it.
+
+        Args:
+            value: String to look up
+
+        Returns:
+            Integer code, or MISSING if the string is not in the table
+        """
+        return self._codes.get(value, MISSING)
+
+
+class TagColumns:
+    """Tags of one element type, stored as per-element ranges of interned (key, value) codes."""
+
+    def __init__(self, strings: StringTable, offsets: np.ndarray, keys: np.ndarray, values: np.ndarray):
+        """
+        Initialize the tag columns.
+
+        Args:
+            strings: String table the codes refer to
+            offsets: Per-element offsets into keys/values (length elements + 1)
+            keys: Interned tag key codes
+            values: Interned tag value codes
+        """
+        self.strings = strings
+        self.offsets = offsets
+        self.keys = keys
+        self.values = values
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the tag arrays in bytes."""
+        return self.offsets.nbytes + self.keys.nbytes + self.values.nbytes
+
+    def column(self, key: str) -> np.ndarray:
+        """
+        Get the value codes of one tag key for every element.
+
+        Args:
+            key: Tag key
+
+        Returns:
+            Array of value codes aligned with the elements, MISSING where the tag is absent
+        """
+        column = self._columns.get(key)
+        if column is not None:
+            return column
+
+        column = np.full(len(self), MISSING, dtype=np.int32)
+        key_code = self.strings.code(key)
+        if key_code != MISSING:
+            hits = np.flatnonzero(self.keys == key_code)
+            owners = np.searchsorted(self.offsets, hits, side="right") - 1
+            column[owners] = self.values[hits]
+
+        self._columns[key] = column
+        return column
+
+    def has(self, key: str) -> np.ndarray:
+        """
+        Check which elements have a tag.
+
+        Args:
+            key: Tag key
+
+        Returns:
+            Boolean mask aligned with the elements
+        """
+        return self.column(key) != MISSING
+
+    def equals(self, key: str, value: str) -> np.ndarray:
+        """
+        Check which elements have a tag with the given value.
+
+        Args:
+            key: Tag key
+            value: Tag value
+
+        Returns:
+            Boolean mask aligned with the elements
+        """
+        value_code = self.strings.code(value)
+        if value_code == MISSING:
+            return np.zeros(len(self), dtype=bool)
+        return self.column(key) == value_code
+
+    def int_values(self, key: str) -> np.ndarray:
+        """
+        Parse a tag as an integer for every element.
+
+        Each distinct value string is parsed once, so elements sharing a
+        value share the conversion.
+
+        Args:
+            key: Tag key
+
+        Returns:
+            Float array aligned with the elements, NaN where the tag is absent or not an integer
+        """
+        column = self.column(key)
+        parsed = np.full(len(self.strings) + 1, np.nan)
+        for code in np.unique(column[column != MISSING]):
+            try:
+                parsed[code] = int(self.strings.strings[code])
+            except (ValueError, TypeError):
+                pass
+        # MISSING (-1) picks the trailing NaN entry
+        return parsed[column]
+
+    def get(self, index: int, key: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Get one tag value of one element.
+
+        Args:
+            index: Element index
+            key: Tag key
+            default: Value returned when the tag is absent
+
+        Returns:
+            Tag value string or default
+        """
+        code = self.column(key)[index]
+        return self.strings.strings[code] if code != MISSING else default
+
+    def to_dict(self, index: int) -> Dict[str, str]:
+        """
+        Get all tags of one element.
+
+        Args:
+            index: Element index
+
+        Returns:
+            Dictionary of tag keys to values
+        """
+        start, end = self.offsets[index], self.offsets[index + 1]
+        strings = self.strings.strings
+        return {strings[k]: strings[v] for k, v in zip(self.keys[start:end], self.values[start:end])}
+
+    def take(self, rows: np.ndarray) -> "TagColumns":
+        """
+        Select the tags of a subset of elements.
+
+        Args:
+            rows: Element indices to keep
+
+        Returns:
+            TagColumns for the selected elements
+        """
+        offsets, positions = csr_take(self.offsets, rows)
+        return TagColumns(self.strings, offsets, self.keys[positions], self.values[positions])
+
+
+class ChunkStore:
+    """Columnar nodes, ways and relations of one Overpass response."""
+
+    def __init__(
+        self,
+        strings: StringTable,
+        node_ids: np.ndarray,
+        node_lons: np.ndarray,
+        node_lats: np.ndarray,
+        node_tags: TagColumns,
+        way_ids: np.ndarray,
+        way_node_offsets: np.ndarray,
+        way_node_ids: np.ndarray,
+        way_tags: TagColumns,
+        relation_ids: np.ndarray,
+        relation_member_offsets: np.ndarray,
+        relation_member_types: np.ndarray,
+        relation_member_refs: np.ndarray,
+        relation_member_roles: np.ndarray,
+        relation_tags: TagColumns,
+        way_node_lons: Optional[np.ndarray] = None,
+        way_node_lats: Optional[np.ndarray] = None,
+    ):
+        """
+        Initialize the store from its columns. Use ChunkStoreBuilder or from_overpy() to create one.
+
+        Args:
+            strings: String table shared by all tag and role columns
+            node_ids: Node ids (int64)
+            node_lons: Node longitudes (float64)
+            node_lats: Node latitudes (float64)
+            node_tags: Node tags
+            way_ids: Way ids (int64)
+            way_node_offsets: Per-way offsets into way_node_ids
+            way_node_ids: Node ids referenced by the ways, in way order
+            way_tags: Way tags
+            relation_ids: Relation ids (int64)
+            relation_member_offsets: Per-relation offsets into the member arrays
+            relation_member_types: Member type codes (MEMBER_NODE/WAY/RELATION)
+            relation_member_refs: Member element ids
+            relation_member_roles: Member role codes in the string table
+            relation_tags: Relation tags
+            way_node_lons: Optional inline way coordinates (`out geom`) aligned
+                with way_node_ids, NaN where a way has no inline geometry
+            way_node_lats: Optional inline way latitudes, as way_node_lons
+        """
+        self.strings = strings
+        self.node_ids = node_ids
+        self.node_lons = node_lons
+        self.node_lats = node_lats
+        self.node_tags = node_tags
+        self.way_ids = way_ids
+        self.way_node_offsets = way_node_offsets
+        self.way_node_ids = way_node_ids
+        self.way_tags = way_tags
+        self.relation_ids = relation_ids
+        self.relation_member_offsets = relation_member_offsets
+        self.relation_member_types = relation_member_types
+        self.relation_member_refs = relation_member_refs
+        self.relation_member_roles = relation_member_roles
+        self.relation_tags = relation_tags
+        self.way_node_lons = way_node_lons
+        self.way_node_lats = way_node_lats
+
+        # Sorted views for id lookups, and way node references resolved to node indices
+        self._node_order = np.argsort(node_ids, kind="stable")
+        self._way_order = np.argsort(way_ids, kind="stable")
+        self.way_node_index = self.node_index(way_node_ids)
+        self._digest: Optional[str] = None
+
+    @property
+    def num_nodes(self) -> int:
+        """Number of nodes in the store."""
+        return len(self.node_ids)
+
+    @property
+    def num_ways(self) -> int:
+        """Number of ways in the store."""
+        return len(self.way_ids)
+
+    @property
+    def num_relations(self) -> int:
+        """Number of relations in the store."""
+        return len(self.relation_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the store's arrays in bytes."""
+        arrays = [
+            self.node_ids, self.node_lons, self.node_lats, self.way_ids, self.way_node_offsets,
+            self.way_node_ids, self.way_node_index, self.relation_ids, self.relation_member_offsets,
+            self.relation_member_types, self.relation_member_refs, self.relation_member_roles,
+            self._node_order, self._way_order,
+        ]
+        if self.way_node_lons is not None:
+            arrays += [self.way_node_lons, self.way_node_lats]
+        tags = self.node_tags.nbytes + self.way_tags.nbytes + self.relation_tags.nbytes
+        return sum(a.nbytes for a in arrays) + tags
+
+    @staticmethod
+    def _lookup(ids: np.ndarray, order: np.ndarray, wanted) -> np.ndarray:
+        """Find the positions of wanted ids in an id array, MISSING where absent."""
+        wanted = np.asarray(wanted, dtype=np.int64)
+        if len(ids) == 0:
+            return np.full(wanted.shape, MISSING, dtype=np.int64)
+
+        sorted_ids = ids[order]
+        pos = np.minimum(np.searchsorted(sorted_ids, wanted), len(ids) - 1)
+        found = sorted_ids[pos] == wanted
+        return np.where(found, order[pos], MISSING)
+
+    def node_index(self, node_ids) -> np.ndarray:
+        """
+        Find the indices of nodes by id.
+
+        Args:
+            node_ids: Node ids to look up
+
+        Returns:
+            Array of node indices, MISSING for ids not in the store
+        """
+        return self._lookup(self.node_ids, self._node_order, node_ids)
+
+    def way_index(self, way_ids) -> np.ndarray:
+        """
+        Find the indices of ways by id.
+
+        Args:
+            way_ids: Way ids to look up
+
+        Returns:
+            Array of way indices, MISSING for ids not in the store
+        """
+        return self._lookup(self.way_ids, self._way_order, way_ids)
+
+    def nodes_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        """
+        Check which nodes lie inside a bounding box (edges included).
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            Boolean mask aligned with the nodes
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        return (
+            (self.node_lons >= min_lon) & (self.node_lons <= max_lon)
+            & (self.node_lats >= min_lat) & (self.node_lats <= max_lat)
+        )
+
+    def missing_node_ids(self) -> np.ndarray:
+        """
+        Find the nodes referenced by ways that are neither in the store nor given inline.
+
+        Returns:
+            Sorted array of unique missing node ids
+        """
+        missing = self.way_node_index == MISSING
+        if self.way_node_lons is not None:
+            missing &= np.isnan(self.way_node_lons)
+        missing &= self.way_node_ids != MISSING_NODE_ID
+        return np.unique(self.way_node_ids[missing])
+
+    def way_coordinates(
+        self, way_indices, min_nodes: int = 2
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gather the coordinates of ways, keeping only ways whose coordinates are all known.
+
+        Inline `out geom` coordinates are used where present; other ways are
+        resolved through their node references.
+
+        Args:
+            way_indices: Indices of the ways
+            min_nodes: Ways with fewer nodes are dropped
+
+        Returns:
+            Tuple of (kept way indices, per-way offsets, longitudes, latitudes)
+        """
+        way_indices = np.asarray(way_indices, dtype=np.int64)
+        offsets, positions = csr_take(self.way_node_offsets, way_indices)
+
+        node_index = self.way_node_index[positions]
+        resolved = node_index != MISSING
+        lons = np.full(len(positions), np.nan)
+        lats = np.full(len(positions), np.nan)
+        lons[resolved] = self.node_lons[node_index[resolved]]
+        lats[resolved] = self.node_lats[node_index[resolved]]
+
+        if self.way_node_lons is not None:
+            inline = ~np.isnan(self.way_node_lons[positions])
+            lons[inline] = self.way_node_lons[positions][inline]
+            lats[inline] = self.way_node_lats[positions][inline]
+
+        missing = np.bincount(
+            _row_lengths_to_owners(offsets)[np.isnan(lons)], minlength=len(way_indices)
+        )
+        keep = (np.diff(offsets) >= min_nodes) & (missing == 0)
+        if np.any(missing):
+            logger.warning(f"Skipping {int(np.count_nonzero(missing))} ways with nodes missing from the response")
+
+        if np.all(keep):
+            return way_indices, offsets, lons, lats
+
+        row_keep = np.repeat(keep, np.diff(offsets))
+        kept_offsets = np.zeros(int(np.count_nonzero(keep)) + 1, dtype=np.int64)
+        np.cumsum(np.diff(offsets)[keep], out=kept_offsets[1:])
+        return way_indices[keep], kept_offsets, lons[row_keep], lats[row_keep]
+
+    def take(self, node_rows, way_rows, relation_rows) -> "ChunkStore":
+        """
+        Select a subset of the store's elements.
+
+        Args:
+            node_rows: Indices of the nodes to keep
+            way_rows: Indices of the ways to keep
+            relation_rows: Indices of the relations to keep
+
+        Returns:
+            ChunkStore sharing this store's string table
+        """
+        node_rows = np.asarray(node_rows, dtype=np.int64)
+        way_rows = np.asarray(way_rows, dtype=np.int64)
+        relation_rows = np.asarray(relation_rows, dtype=np.int64)
+        way_offsets, way_positions = csr_take(self.way_node_offsets, way_rows)
+        member_offsets, member_positions = csr_take(self.relation_member_offsets, relation_rows)
+        inline = self.way_node_lons is not None
+        return ChunkStore(
+            self.strings,
+            self.node_ids[node_rows],
+            self.node_lons[node_rows],
+            self.node_lats[node_rows],
+            self.node_tags.take(node_rows),
+            self.way_ids[way_rows],
+            way_offsets,
+            self.way_node_ids[way_positions],
+            self.way_tags.take(way_rows),
+            self.relation_ids[relation_rows],
+            member_offsets,
+            self.relation_member_types[member_positions],
+            self.relation_member_refs[member_positions],
+            self.relation_member_roles[member_positions],
+            self.relation_tags.take(relation_rows),
+            self.way_node_lons[way_positions] if inline else None,
+            self.way_node_lats[way_positions] if inline else None,
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Export the store's columns, e.g. to save them with np.savez.
+
+        The string table is reduced to the strings the store uses, so stores
+        cut out of a larger one don't carry its whole table.
+
+        Returns:
+            Dictionary of column name to array, the input of from_arrays()
+        """
+        tag_columns = {"node": self.node_tags, "way": self.way_tags, "relation": self.relation_tags}
+        used = np.unique(np.concatenate(
+            [self.relation_member_roles.astype(np.int64)]
+            + [tags.keys.astype(np.int64) for tags in tag_columns.values()]
+            + [tags.values.astype(np.int64) for tags in tag_columns.values()]
+        ))
+        used = used[used != MISSING]
+
+        def remap(codes: np.ndarray) -> np.ndarray:
+            remapped = np.searchsorted(used, codes).astype(np.int32)
+            return np.where(codes == MISSING, MISSING, remapped).astype(np.int32)
+
+        arrays = {
+            "strings": np.array([self.strings.strings[code] for code in used], dtype=str),
+            "node_ids": self.node_ids,
+            "node_lons": self.node_lons,
+            "node_lats": self.node_lats,
+            "way_ids": self.way_ids,
+            "way_node_offsets": self.way_node_offsets,
+            "way_node_ids": self.way_node_ids,
+            "relation_ids": self.relation_ids,
+            "relation_member_offsets": self.relation_member_offsets,
+            "relation_member_types": self.relation_member_types,
+            "relation_member_refs": self.relation_member_refs,
+            "relation_member_roles": remap(self.relation_member_roles),
+        }
+        for name, tags in tag_columns.items():
+            arrays[f"{name}_tag_offsets"] = tags.offsets
+            arrays[f"{name}_tag_keys"] = remap(tags.keys)
+            arrays[f"{name}_tag_values"] = remap(tags.values)
+        if self.way_node_lons is not None:
+            arrays["way_node_lons"] = self.way_node_lons
+            arrays["way_node_lats"] = self.way_node_lats
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "ChunkStore":
+        """
+        Rebuild a store from the columns exported by to_arrays().
+
+        Args:
+            arrays: Dictionary of column name to array (e.g. a loaded .npz file)
+
+        Returns:
+            ChunkStore with the same elements
+        """
+        strings = StringTable(str(value) for value in arrays["strings"])
+
+        def tags(name: str) -> TagColumns:
+            return TagColumns(
+                strings,
+                arrays[f"{name}_tag_offsets"],
+                arrays[f"{name}_tag_keys"],
+                arrays[f"{name}_tag_values"],
+            )
+
+        return cls(
+            strings,
+            arrays["node_ids"],
+            arrays["node_lons"],
+            arrays["node_lats"],
+            tags("node"),
+            arrays["way_ids"],
+            arrays["way_node_offsets"],
+            arrays["way_node_ids"],
+            tags("way"),
+            arrays["relation_ids"],
+            arrays["relation_member_offsets"],
+            arrays["relation_member_types"],
+            arrays["relation_member_refs"],
+            arrays["relation_member_roles"],
+            tags("relation"),
+            arrays.get("way_node_lons"),
+            arrays.get("way_node_lats"),
+        )
+
+    def digest(self) -> str:
+        """
+        Hash the store's content, so artifacts derived from it can be keyed by it.
+
+        Returns:
+            Hex digest, the same for stores with equal columns and tag strings
+        """
+        if self._digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            for name, values in sorted(self.to_arrays().items()):
+                hasher.update(name.encode("utf-8"))
+                hasher.update(str(values.dtype).encode("utf-8"))
+                hasher.update(np.ascontiguousarray(values).tobytes())
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    def to_overpy(self) -> overpy.Result:
+        """
+        Convert the store into an overpy result.
+
+        Coordinates become Decimals as in parsed responses, and inline way
+        coordinates become the ways' "geometry" attribute.
+
+        Returns:
+            overpy.Result with the store's nodes, ways and relations
+        """
+        result = overpy.Result()
+        for i in range(self.num_nodes):
+            result.append(
+                overpy.Node(
+                    node_id=int(self.node_ids[i]),
+                    lat=Decimal(repr(float(self.node_lats[i]))),
+                    lon=Decimal(repr(float(self.node_lons[i]))),
+                    tags=self.node_tags.to_dict(i),
+                    attributes={},
+                    result=result,
+                )
+            )
+
+        for i in range(self.num_ways):
+            start, end = self.way_node_offsets[i], self.way_node_offsets[i + 1]
+            attributes = {}
+            if self.way_node_lons is not None and not np.all(np.isnan(self.way_node_lons[start:end])):
+                attributes["geometry"] = [
+                    None if np.isnan(lon) else {"lon": float(lon), "lat": float(lat)}
+                    for lon, lat in zip(self.way_node_lons[start:end], self.way_node_lats[start:end])
+                ]
+            result.append(
+                overpy.Way(
+                    way_id=int(self.way_ids[i]),
+                    node_ids=[int(node_id) for node_id in self.way_node_ids[start:end]],
+                    tags=self.way_tags.to_dict(i),
+                    attributes=attributes,
+                    result=result,
+                )
+            )
+
+        member_classes = {
+            MEMBER_NODE: overpy.RelationNode,
+            MEMBER_WAY: overpy.RelationWay,
+            MEMBER_RELATION: overpy.RelationRelation,
+        }
+        for i in range(self.num_relations):
+            start, end = self.relation_member_offsets[i], self.relation_member_offsets[i + 1]
+            members = [
+                member_classes[int(member_type)](
+                    ref=int(ref), role=self.strings.strings[role], result=result
+                )
+                for member_type, ref, role in zip(
+                    self.relation_member_types[start:end],
+                    self.relation_member_refs[start:end],
+                    self.relation_member_roles[start:end],
+                )
+            ]
+            result.append(
+                overpy.Relation(
+                    rel_id=int(self.relation_ids[i]),
+                    members=members,
+                    tags=self.relation_tags.to_dict(i),
+                    attributes={},
+                    result=result,
+                )
+            )
+        return result
+
+    @classmethod
+    def from_nodes(cls, node_ids: np.ndarray, lons: np.ndarray, lats: np.ndarray) -> "ChunkStore":
+        """
+        Build a store of untagged nodes from coordinate arrays.
+
+        Args:
+            node_ids: Node ids
+            lons: Node longitudes
+            lats: Node latitudes
+
+        Returns:
+            ChunkStore holding only the nodes
+        """
+        strings = StringTable()
+
+        def no_tags(count: int) -> TagColumns:
+            empty = np.empty(0, dtype=np.int32)
+            return TagColumns(strings, np.zeros(count + 1, dtype=np.int64), empty, empty)
+
+        no_ids = np.empty(0, dtype=np.int64)
+        no_offsets = np.zeros(1, dtype=np.int64)
+        return cls(
+            strings,
+            np.asarray(node_ids, dtype=np.int64),
+            np.asarray(lons, dtype=np.float64),
+            np.asarray(lats, dtype=np.float64),
+            no_tags(len(node_ids)),
+            no_ids,
+            no_offsets,
+            no_ids,
+            no_tags(0),
+            no_ids,
+            no_offsets,
+            np.empty(0, dtype=np.int8),
+            no_ids,
+            np.empty(0, dtype=np.int32),
+            no_tags(0),
+        )
+
+    @classmethod
+    def from_overpy(cls, result: overpy.Result) -> "ChunkStore":
+        """
+        Build a store from an overpy result.
+
+        Args:
+            result: Overpass result
+
+        Returns:
+            ChunkStore holding the result's nodes, ways and relations
+        """
+        builder = ChunkStoreBuilder()
+        for node in result.nodes:
+            builder.add_node(node.id, float(node.lon), float(node.lat), node.tags)
+
+        way_ids = set()
+        for way in result.ways:
+            way_ids.add(way.id)
+            lons = lats = None
+            geometry = way.attributes.get("geometry")
+            if geometry:
+                lons = [float(point["lon"]) if point else np.nan for point in geometry]
+                lats = [float(point["lat"]) if point else np.nan for point in geometry]
+            builder.add_way(way.id, way._node_ids or [], way.tags, lons, lats)
+
+        member_geometries = {}
+        for relation in result.relations:
+            members = []
+            for member in relation.members:
+                if isinstance(member, overpy.RelationNode):
+                    member_type = "node"
+                elif isinstance(member, overpy.RelationWay):
+                    member_type = "way"
+                    if member.geometry and member.ref not in way_ids:
+                        member_geometries.setdefault(member.ref, member.geometry)
+                else:
+                    member_type = "relation"
+                members.append((member_type, member.ref, member.role))
+            builder.add_relation(relation.id, members, relation.tags)
+
+        # With `out geom`, relation member ways are only present as inline geometry
+        for way_id, geometry in member_geometries.items():
+            builder.add_way(
+                way_id,
+                [MISSING_NODE_ID] * len(geometry),
+                {},
+                [float(point.lon) for point in geometry],
+                [float(point.lat) for point in geometry],
+            )
+        return builder.build()
+
+    @classmethod
+    def concat(cls, stores: Sequence["ChunkStore"]) -> "ChunkStore":
+        """
+        Combine several stores, dropping duplicate elements.
+
+        The first occurrence of each node, way and relation id is kept.
+
+        Args:
+            stores: Stores to combine
+
+        Returns:
+            ChunkStore holding the elements of all stores
+        """
+        if len(stores) == 1:
+            return stores[0]
+
+        # Re-intern every store's strings into one table
+        strings = StringTable()
+        remaps = [
+            np.array([strings.intern(s) for s in store.strings.strings] + [MISSING], dtype=np.int32)
+            for store in stores
+        ]
+
+        def merge_tags(attr: str, keep: np.ndarray) -> TagColumns:
+            parts = [getattr(store, attr) for store in stores]
+            tags = TagColumns(
+                strings,
+                csr_concat([p.offsets for p in parts]),
+                np.concatenate([remap[p.keys] for p, remap in zip(parts, remaps)]),
+                np.concatenate([remap[p.values] for p, remap in zip(parts, remaps)]),
+            )
+            return tags.take(keep)
+
+        def first_occurrences(ids: np.ndarray) -> np.ndarray:
+            _, first = np.unique(ids, return_index=True)
+            return np.sort(first)
+
+        node_ids = np.concatenate([s.node_ids for s in stores])
+        keep_nodes = first_occurrences(node_ids)
+
+        way_ids = np.concatenate([s.way_ids for s in stores])
+        keep_ways = first_occurrences(way_ids)
+        way_offsets, way_positions = csr_take(
+            csr_concat([s.way_node_offsets for s in stores]), keep_ways
+        )
+
+        # Inline way coordinates, NaN-filled for stores without them
+        inline_coords = (None, None)
+        if any(s.way_node_lons is not None for s in stores):
+            inline_coords = tuple(
+                np.concatenate([
+                    getattr(s, attr) if getattr(s, attr) is not None else np.full(len(s.way_node_ids), np.nan)
+                    for s in stores
+                ])[way_positions]
+                for attr in ("way_node_lons", "way_node_lats")
+            )
+
+        relation_ids = np.concatenate([s.relation_ids for s in stores])
+        keep_relations = first_occurrences(relation_ids)
+        member_offsets, member_positions = csr_take(
+            csr_concat([s.relation_member_offsets for s in stores]), keep_relations
+        )
+        roles = np.concatenate(
+            [remap[s.relation_member_roles] for s, remap in zip(stores, remaps)]
+        )
+
+        return cls(
+            strings,
+            node_ids[keep_nodes],
+            np.concatenate([s.node_lons for s in stores])[keep_nodes],
+            np.concatenate([s.node_lats for s in stores])[keep_nodes],
+            merge_tags("node_tags", keep_nodes),
+            way_ids[keep_ways],
+            way_offsets,
+            np.concatenate([s.way_node_ids for s in stores])[way_positions],
+            merge_tags("way_tags", keep_ways),
+            relation_ids[keep_relations],
+            member_offsets,
+            np.concatenate([s.relation_member_types for s in stores])[member_positions],
+            np.concatenate([s.relation_member_refs for s in stores])[member_positions],
+            roles[member_positions],
+            merge_tags("relation_tags", keep_relations),
+            *inline_coords,
+        )
+
+
+def _to_numpy(values: array, dtype) -> np.ndarray:
+    """Copy a typed array into a NumPy array."""
+    if not len(values):
+        return np.empty(0, dtype=dtype)
+    return np.frombuffer(values, dtype=dtype).copy()
+
+
+class _TagAccumulator:
+    """Collects the CSR tag arrays of one element type while a store is built."""
+
+    def __init__(self):
+        self.offsets = array("q", [0])
+        self.keys = array("i")
+        self.values = array("i")
+
+    def add(self, strings: StringTable, tags: Dict[str, str]):
+        for key, value in tags.items():
+            self.keys.append(strings.intern(key))
+            self.values.append(strings.intern(value))
+        self.offsets.append(len(self.keys))
+
+    def build(self, strings: StringTable) -> TagColumns:
+        return TagColumns(
+            strings,
+            _to_numpy(self.offsets, np.int64),
+            _to_numpy(self.keys, np.int32),
+            _to_numpy(self.values, np.int32),
+        )
+
+
+class ChunkStoreBuilder:
+    """Incrementally collect elements into compact arrays and build a ChunkStore."""
+
+    def __init__(self):
+        self.strings = StringTable()
+        self._node_ids = array("q")
+        self._node_lons = array("d")
+        self._node_lats = array("d")
+        self._node_tags = _TagAccumulator()
+        self._way_ids = array("q")
+        self._way_node_offsets = array("q", [0])
+        self._way_node_ids = array("q")
+        self._way_tags = _TagAccumulator()
+        self._way_node_lons = array("d")
+        self._way_node_lats = array("d")
+        self._has_inline_geometry = False
+        self._relation_ids = array("q")
+        self._member_offsets = array("q", [0])
+        self._member_types = array("b")
+        self._member_refs = array("q")
+        self._member_roles = array("i")
+        self._relation_tags = _TagAccumulator()
+
+    def add_node(self, node_id: int, lon: float, lat: float, tags: Dict[str, str]):
+        """
+        Add a node.
+
+        Args:
+            node_id: OSM node id
+            lon: Longitude
+            lat: Latitude
+            tags: Node tags
+        """
+        self._node_ids.append(node_id)
+        self._node_lons.append(lon)
+        self._node_lats.append(lat)
+        self._node_tags.add(self.strings, tags)
+
+    def add_way(
+        self,
+        way_id: int,
+        node_ids: Sequence[int],
+        tags: Dict[str, str],
+        lons: Optional[Sequence[float]] = None,
+        lats: Optional[Sequence[float]] = None,
+    ):
+        """
+        Add a way.
+
+        Args:
+            way_id: OSM way id
+            node_ids: Ids of the way's nodes, in order
+            tags: Way tags
+            lons: Optional inline longitudes of the nodes (`out geom`), NaN where unknown
+            lats: Optional inline latitudes of the nodes
+        """
+        self._way_ids.append(way_id)
+        self._way_node_ids.extend(node_ids)
+        self._way_node_offsets.append(len(self._way_node_ids))
+        self._way_tags.add(self.strings, tags)
+
+        if lons is None:
+            self._way_node_lons.extend([np.nan] * len(node_ids))
+            self._way_node_lats.extend([np.nan] * len(node_ids))
+        else:
+            self._has_inline_geometry = True
+            self._way_node_lons.extend(lons)
+            self._way_node_lats.extend(lats)
+
+    def add_relation(
+        self, relation_id: int, members: Iterable[Tuple[str, int, str]], tags: Dict[str, str]
+    ):
+        """
+        Add a relation.
+
+        Args:
+            relation_id: OSM relation id
+            members: (type, ref, role) tuples, type being "node", "way" or "relation"
+            tags: Relation tags
+        """
+        self._relation_ids.append(relation_id)
+        for member_type, ref, role in members:
+            self._member_types.append(_MEMBER_TYPES[member_type])
+            self._member_refs.append(ref)
+            self._member_roles.append(self.strings.intern(role or ""))
+        self._member_offsets.append(len(self._member_refs))
+        self._relation_tags.add(self.strings, tags)
+
+    def build(self) -> ChunkStore:
+        """
+        Build the store from the collected elements.
+
+        Returns:
+            ChunkStore
+        """
+        return ChunkStore(
+            self.strings,
+            _to_numpy(self._node_ids, np.int64),
+            _to_numpy(self._node_lons, np.float64),
+            _to_numpy(self._node_lats, np.float64),
+            self._node_tags.build(self.strings),
+            _to_numpy(self._way_ids, np.int64),
+            _to_numpy(self._way_node_offsets, np.int64),
+            _to_numpy(self._way_node_ids, np.int64),
+            self._way_tags.build(self.strings),
+            _to_numpy(self._relation_ids, np.int64),
+            _to_numpy(self._member_offsets, np.int64),
+            _to_numpy(self._member_types, np.int8),
+            _to_numpy(self._member_refs, np.int64),
+            _to_numpy(self._member_roles, np.int32),
+            self._relation_tags.build(self.strings),
+            _to_numpy(self._way_node_lons, np.float64) if self._has_inline_geometry else None,
+            _to_numpy(self._way_node_lats, np.float64) if self._has_inline_geometry else None,
+        )
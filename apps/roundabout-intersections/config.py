@@ -6,9 +6,60 @@ Configuration for OSM intersection and landuse analysis.
 # Approximate bounding box for Phoenix metro area
 PHOENIX_BBOX = [-112.247308, 33.283753, -111.652349, 33.669733]
 
+# Coordinate reference systems
+# WGS84 for input/output coordinates, UTM Zone 12N for distance and area
+# calculations in the Phoenix area
+WGS84_CRS = "EPSG:4326"
+UTM_CRS = "EPSG:32612"
+
+# Aggregated output file (.geojson for a FeatureCollection, .ndjson/.geojsonl
+# for newline-delimited GeoJSON)
+RESULTS_FILE = "results.geojson"
+
+# Directory for per-chunk result files
+CHUNK_RESULTS_DIR = "data/intersections"
+
+# SQLite manifest tracking each chunk's status for resumable runs
+MANIFEST_DB = "data/manifest.sqlite"
+
+# Traffic signal filter parameters: a signal is kept when at least
+# MIN_ROAD_INTERSECTIONS two-lane roads lie within SIGNAL_BUFFER_RADIUS_METERS
+SIGNAL_BUFFER_RADIUS_METERS = 2.0
+MIN_ROAD_INTERSECTIONS = 3
+
 # Buffer radius in meters (0.5 miles = 804.67 meters)
 BUFFER_RADIUS_METERS = 804.67
 
+# How the bounding box is broken into chunks:
+# - "grid": uniform grid of CHUNK_SIZE_MILES squares
+# - "adaptive": quadtree sized by data density (probes each tile with `out count`)
+# - "tiles": slippy map tiles of zoom CHUNK_TILE_ZOOM, keyed by quadkey. Chunks
+#   don't depend on PHOENIX_BBOX, so cached responses and chunk results are
+#   reused by any bbox covering the same tiles; the output covers whole tiles.
+CHUNKING_MODE = "grid"
+CHUNK_SIZE_MILES = 2.0
+CHUNK_TILE_ZOOM = 13  # about 2.5 x 2.5 miles in Phoenix
+
+# Adaptive chunking settings
+ADAPTIVE_COARSE_CHUNK_MILES = 8.0
+ADAPTIVE_MIN_CHUNK_MILES = 0.5
+ADAPTIVE_MAX_ELEMENTS = 50000  # roads + road nodes + signals per chunk
+
+# Where chunk data comes from:
+# - "overpass": query the Overpass API
+# - "extract": read the local OSM extract at OSM_EXTRACT_PATH once and cut every
+#   chunk out of it, without network access. .osm/.osm.xml files (optionally .gz
+#   or .bz2) are parsed with the standard library; .osm.pbf needs `pip install osmium`.
+DATA_SOURCE = "overpass"
+OSM_EXTRACT_PATH = "data/extracts/phoenix.osm.pbf"
+
+# Tile-partitioned index of the extract (see extract_index.py). Built once and
+# reused while the extract is unchanged; chunks then read only the tiles they
+# overlap from memory-mapped arrays. None loads the whole extract into memory
+# on every run instead.
+OSM_EXTRACT_INDEX_DIR = "data/extracts/phoenix.index"
+OSM_EXTRACT_TILE_DEGREES = 0.05  # about 5.5 km x 4.6 km in Phoenix
+
 # Overpass API endpoint
 # Alternative endpoints if the default is overloaded:
 # - "https://overpass-api.de/api/interpreter" (default)
@@ -16,14 +67,106 @@ BUFFER_RADIUS_METERS = 804.67
 # - "https://overpass.openstreetmap.fr/api/interpreter"
 OVERPASS_API_URL = "https://overpass-api.de/api/interpreter"
 
+# Balance requests over several Overpass mirrors, each entry being
+# (url, requests per second, max requests in flight). Requests go to the
+# healthiest endpoint, and a failing or throttled endpoint backs off on its
+# own while requests fail over to the others. Empty uses OVERPASS_API_URL only.
+OVERPASS_ENDPOINTS = []
+# OVERPASS_ENDPOINTS = [
+#     ("https://overpass-api.de/api/interpreter", 0.5, 2),
+#     ("https://overpass.kumi.systems/api/interpreter", 0.5, 2),
+#     ("https://overpass.openstreetmap.fr/api/interpreter", 0.25, 1),
+# ]
+# Consecutive failures that open an endpoint's circuit, and how long it stays open
+ENDPOINT_FAILURE_THRESHOLD = 3
+ENDPOINT_OPEN_SECONDS = 120.0
+
+# Start each request when the server's /api/status reports a free query slot
+# and honor Retry-After headers, instead of fixed delays and blind backoff.
+# Endpoints without a usable status page fall back to exponential backoff.
+OVERPASS_SLOT_STATUS = True
+OVERPASS_STATUS_POLL_SECONDS = 1.0  # while all slots run queries with no free time given
+OVERPASS_STATUS_MAX_AGE_SECONDS = 30.0
+OVERPASS_STATUS_TIMEOUT_SECONDS = 10.0
+
 # Retry configuration for Overpass API
 OVERPASS_MAX_RETRIES = 5
 OVERPASS_INITIAL_DELAY = 5.0  # seconds
 OVERPASS_MAX_DELAY = 300.0  # seconds (5 minutes)
+# How many times a chunk may be split into quadrants when the server
+# rejects it with a timeout or out-of-memory error
+OVERPASS_MAX_SPLIT_DEPTH = 4
 
-# Delay between queries to be respectful of the API (seconds)
+# On-disk cache of raw Overpass responses
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_DIR = "data/cache/overpass"
+RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 3600  # 1 week
+RESPONSE_CACHE_MAX_BYTES = 2 * 1024**3  # 2 GB
+
+# Layered on-disk cache of per-chunk artifacts: parsed chunk data, two-lane road
+# sets, per-signal road counts and final records. Each layer is keyed by what
+# it was derived from plus its own parameters, so changing a filter parameter
+# recomputes only the layers after it. Chunk data expires after the TTL; the
+# derived layers follow the content of the chunk data they were computed from.
+ARTIFACT_CACHE_ENABLED = True
+ARTIFACT_CACHE_DIR = "data/cache/artifacts"
+ARTIFACT_CACHE_TTL_SECONDS = 7 * 24 * 3600  # 1 week
+
+# Fetch roads and traffic signals of a chunk in a single Overpass request
+COMBINED_CHUNK_QUERY = True
+
+# Select only two-lane road candidates on the server, using the rule set of
+# two_lane_filter.is_two_lane_road (results are still verified client-side)
+TWO_LANE_PUSHDOWN = True
+
+# Request JSON for chunk queries and parse it element by element into the
+# chunk store, skipping overpy objects (False parses through overpy)
+STREAMING_JSON_PARSER = True
+
+# Fetch road and landuse coordinates inline with `out geom` instead of
+# downloading every member node separately, optionally in quadtile order
+INLINE_GEOMETRY = False
+QUADTILE_ORDER = False
+
+# Nodes referenced by a chunk's ways but missing from the response are fetched
+# together in batches of MISSING_NODE_BATCH_SIZE ids. In strict mode the chunk
+# fails instead.
+STRICT_NODE_RESOLUTION = False
+MISSING_NODE_BATCH_SIZE = 2000
+
+# Tags kept by the streaming parser: exact keys and key prefixes
+STORE_TAG_KEYS = ["highway", "name", "ref", "landuse"]
+STORE_TAG_PREFIXES = ["lanes"]
+
+# Record every raw Overpass response of a run to OVERPASS_RECORDING_DIR
+# ("record"), or answer every query from such a recording without network
+# access ("replay"). None disables both; see benchmark.py.
+OVERPASS_RECORDING_MODE = None
+OVERPASS_RECORDING_DIR = "data/recordings/default"
+
+# Delay between queries to be respectful of the API (seconds), used when the
+# server's slot status is not available
 QUERY_DELAY = 2.0
 
+# Concurrent chunk processing
+# Number of chunks fetched from Overpass at the same time (1 = serial run)
+CHUNK_FETCH_WORKERS = 1
+# Number of worker threads filtering fetched chunks
+CHUNK_PROCESS_WORKERS = 2
+# Global rate limit shared by all fetch workers (used when CHUNK_FETCH_WORKERS > 1)
+OVERPASS_REQUESTS_PER_SECOND = 0.5
+OVERPASS_MAX_IN_FLIGHT = 2
+
+# Asyncio client (async_overpass.py): keeps many chunks in flight from one
+# thread over pooled keep-alive connections, under the shared
+# OVERPASS_REQUESTS_PER_SECOND and OVERPASS_MAX_IN_FLIGHT limits
+ASYNC_CLIENT = False
+ASYNC_CHUNKS_IN_FLIGHT = 8
+ASYNC_MAX_CONNECTIONS = 4
+ASYNC_IDLE_TIMEOUT_SECONDS = 30.0
+ASYNC_CONNECT_TIMEOUT_SECONDS = 30.0
+ASYNC_READ_TIMEOUT_SECONDS = 300.0  # per read; covers the server-side query timeout
+
 # OSM tags for filtering
 TWO_LANE_ROAD_TAGS = {
     "highway": [
@@ -0,0 +1,232 @@
+"""
+Pool of Overpass API endpoints with health scoring and circuit breakers.
+
+Each endpoint has its own rate limiter and tracks a smoothed latency and
+error rate. Requests go to the available endpoint with the best score.
+A failed or throttled endpoint backs off on its own, so requests fail over
+to the other endpoints instead of sleeping. After repeated failures an
+endpoint's circuit opens for a cooldown, after which a single probe request
+decides whether it is used again.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Endpoint:
+    """One Overpass endpoint with its rate limiter and health statistics."""
+
+    def __init__(self, url: str, rate_limiter: Any):
+        """
+        Initialize the endpoint.
+
+        Args:
+            url: Endpoint URL
+            rate_limiter: Rate limiter for requests to this endpoint
+        """
+        self.url = url
+        self.rate_limiter = rate_limiter
+
+        # Smoothed response time in seconds, None until the first response
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.state = CLOSED
+        self.available_at = 0.0
+        self.consecutive_failures = 0
+        self.probing = False
+
+        self.requests = 0
+        self.failures = 0
+        self.throttles = 0
+
+    def is_available(self, now: float) -> bool:
+        """Check whether the endpoint may take a request now."""
+        if now < self.available_at:
+            return False
+        if self.state == CLOSED:
+            return True
+        # Open circuits past their cooldown allow a single probe request
+        return not self.probing
+
+    def score(self) -> float:
+        """Expected cost of the next request; lower is better. Untried endpoints come first."""
+        if self.latency is None:
+            return float(self.in_flight)
+        return self.latency * (1 + self.in_flight) * (1 + 4 * self.error_rate)
+
+
+class EndpointPool:
+    """Choose the healthiest Overpass endpoint for each request and track outcomes."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[Tuple[str, float, int]],
+        limiter_factory: Callable[..., Any],
+        failure_threshold: int = 3,
+        open_seconds: float = 120.0,
+        backoff_delay: float = 5.0,
+        max_backoff_delay: float = 300.0,
+        smoothing: float = 0.2,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            endpoints: List of (url, requests per second, max requests in flight)
+            limiter_factory: Rate limiter class (RateLimiter or AsyncRateLimiter)
+            failure_threshold: Consecutive failures after which a circuit opens
+            open_seconds: How long an open circuit rejects requests
+            backoff_delay: Initial back-off of an endpoint after a failure
+            max_backoff_delay: Maximum back-off of an endpoint
+            smoothing: Weight of the newest sample in the latency and error averages
+        """
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+
+        self.endpoints = [
+            Endpoint(
+                url,
+                limiter_factory(requests_per_second=requests_per_second, max_in_flight=max_in_flight),
+            )
+            for url, requests_per_second, max_in_flight in endpoints
+        ]
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.backoff_delay = backoff_delay
+        self.max_backoff_delay = max_backoff_delay
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+
+    @property
+    def primary_url(self) -> str:
+        """URL of the first endpoint, used to key cached responses."""
+        return self.endpoints[0].url
+
+    def choose(self) -> Tuple[Optional[Endpoint], float]:
+        """
+        Reserve the available endpoint with the best score.
+
+        Every reserved endpoint must be given back with release().
+
+        Returns:
+            Tuple of (endpoint, 0.0), or (None, seconds until an endpoint is
+            available) if all endpoints are backing off
+        """
+        with self._lock:
+            now = time.monotonic()
+            ready = [endpoint for endpoint in self.endpoints if endpoint.is_available(now)]
+            if not ready:
+                return None, max(0.0, self._next_available(now) - now)
+
+            endpoint = min(ready, key=Endpoint.score)
+            if endpoint.state != CLOSED:
+                endpoint.state = HALF_OPEN
+                endpoint.probing = True
+                logger.info(f"Probing endpoint {endpoint.url}")
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint, 0.0
+
+    def release(self, endpoint: Endpoint):
+        """Give back an endpoint reserved by choose()."""
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.probing = False
+
+    def record_success(self, endpoint: Endpoint, latency: float):
+        """
+        Record a successful response.
+
+        Args:
+            endpoint: Endpoint that answered
+            latency: Response time in seconds
+        """
+        with self._lock:
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.smoothing * (latency - endpoint.latency)
+            endpoint.error_rate -= self.smoothing * endpoint.error_rate
+            endpoint.consecutive_failures = 0
+            endpoint.available_at = 0.0
+            if endpoint.state != CLOSED:
+                logger.info(f"Endpoint {endpoint.url} recovered")
+                endpoint.state = CLOSED
+
+    def record_failure(self, endpoint: Endpoint, throttled: bool = False, retry_after: Optional[float] = None):
+        """
+        Record a failed or throttled request and back the endpoint off.
+
+        Args:
+            endpoint: Endpoint that failed
+            throttled: The endpoint rejected the request because of load
+            retry_after: Seconds the server asked to wait, if known
+        """
+        with self._lock:
+            now = time.monotonic()
+            endpoint.error_rate += self.smoothing * (1.0 - endpoint.error_rate)
+            endpoint.consecutive_failures += 1
+            endpoint.failures += 1
+            if throttled:
+                endpoint.throttles += 1
+
+            if endpoint.state == HALF_OPEN or endpoint.consecutive_failures >= self.failure_threshold:
+                if endpoint.state != OPEN:
+                    logger.warning(
+                        f"Endpoint {endpoint.url} circuit opened for {self.open_seconds:.1f} seconds "
+                        f"after {endpoint.consecutive_failures} consecutive failures"
+                    )
+                endpoint.state = OPEN
+                wait = self.open_seconds
+            else:
+                wait = min(
+                    self.backoff_delay * 2 ** (endpoint.consecutive_failures - 1), self.max_backoff_delay
+                )
+            if retry_after is not None:
+                wait = max(wait, retry_after)
+            endpoint.available_at = max(endpoint.available_at, now + wait)
+
+    def wait_time(self) -> float:
+        """Seconds until any endpoint can take a request (0 if one can now)."""
+        with self._lock:
+            now = time.monotonic()
+            if any(endpoint.is_available(now) for endpoint in self.endpoints):
+                return 0.0
+            return max(0.0, self._next_available(now) - now)
+
+    def _next_available(self, now: float) -> float:
+        """Earliest time an endpoint becomes available. Caller holds the lock."""
+        times = [endpoint.available_at for endpoint in self.endpoints if not endpoint.probing]
+        # With every endpoint probing, one probe finishing frees an endpoint
+        return min(times) if times else now + self.backoff_delay
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Get per-endpoint statistics.
+
+        Returns:
+            List of dictionaries with url, state, requests, failures,
+            throttles, latency and error_rate
+        """
+        with self._lock:
+            return [
+                {
+                    "url": endpoint.url,
+                    "state": endpoint.state,
+                    "requests": endpoint.requests,
+                    "failures": endpoint.failures,
+                    "throttles": endpoint.throttles,
+                    "latency": None if endpoint.latency is None else round(endpoint.latency, 3),
+                    "error_rate": round(endpoint.error_rate, 3),
+                }
+                for endpoint in self.endpoints
+            ]
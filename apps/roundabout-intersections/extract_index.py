@@ -0,0 +1,474 @@
+"""
+Tile-partitioned on-disk index of a local OSM extract.
+
+Usage:
+    python extract_index.py data/extracts/phoenix.osm.pbf --index data/extracts/phoenix.index
+
+Building the index reads the extract once (see osm_extract.load_extract)
+and writes its columns as .npy files, with nodes and ways ordered by tile
+so the elements of one area sit close together on disk. Tiles are cells of
+a fixed lon/lat grid of OSM_EXTRACT_TILE_DEGREES. Three tile indexes map
+every tile to:
+- the ways whose bounding box overlaps it
+- the traffic signal nodes inside it
+- the relations with a member way overlapping it
+
+Opening the index memory-maps the arrays instead of loading them, so a run
+starts in milliseconds and a chunk query only reads the pages of the tiles
+it overlaps. Candidates from the tiles are then checked exactly, with the
+same selection rules as OsmExtract. The index records the size and
+modification time of its extract and the tag filters it was built with;
+open_extract_index() rebuilds it when any of them changed.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import shapely
+import config
+from chunk_store import MEMBER_WAY, MISSING, ChunkStore, StringTable, TagColumns, csr_take
+from osm_extract import ExtractSource, landuse_way_mask, load_extract, road_way_mask
+from stage_timings import stage
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the index files changes
+INDEX_FORMAT_VERSION = 1
+
+META_FILE = "meta.json"
+STRINGS_FILE = "strings.json"
+
+# Way kinds stored in the index
+WAY_OTHER = 0
+WAY_ROAD = 1
+WAY_LANDUSE = 2
+
+# Tag column groups of a store, saved as <group>_tag_offsets/_keys/_values
+_TAG_GROUPS = ["node", "way", "relation"]
+
+# Tile indexes, saved as <name>_tile_codes/_offsets/_rows
+_TILE_INDEXES = ["way", "signal", "relation"]
+
+
+def _tile_grid(tile_degrees: float) -> Tuple[int, int]:
+    """Number of (columns, rows) of the world tile grid."""
+    return int(np.ceil(360 / tile_degrees)), int(np.ceil(180 / tile_degrees))
+
+
+def _tile_ranges(
+    bboxes: np.ndarray, tile_degrees: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the tile columns and rows covered by bounding boxes.
+
+    Args:
+        bboxes: Array of shape (n, 4) with [min_lon, min_lat, max_lon, max_lat] rows
+        tile_degrees: Tile size in degrees
+
+    Returns:
+        Tuple of (first column, last column, first row, last row), inclusive
+    """
+    columns, rows = _tile_grid(tile_degrees)
+    x = np.floor((bboxes[:, [0, 2]] + 180) / tile_degrees).astype(np.int64).clip(0, columns - 1)
+    y = np.floor((bboxes[:, [1, 3]] + 90) / tile_degrees).astype(np.int64).clip(0, rows - 1)
+    return x[:, 0], x[:, 1], y[:, 0], y[:, 1]
+
+
+def tile_codes(bboxes: np.ndarray, tile_degrees: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    List every tile covered by each bounding box.
+
+    Args:
+        bboxes: Array of shape (n, 4) with [min_lon, min_lat, max_lon, max_lat] rows
+        tile_degrees: Tile size in degrees
+
+    Returns:
+        Tuple of (row of the bbox, tile code) pairs, with code = tile row * columns + tile column
+    """
+    columns, _ = _tile_grid(tile_degrees)
+    x0, x1, y0, y1 = _tile_ranges(bboxes, tile_degrees)
+    widths = x1 - x0 + 1
+    counts = widths * (y1 - y0 + 1)
+    owners = np.repeat(np.arange(len(bboxes), dtype=np.int64), counts)
+    # Position of every tile within its bbox's block of tiles
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    steps = np.arange(int(counts.sum()), dtype=np.int64) - starts
+    dy, dx = np.divmod(steps, widths[owners])
+    return owners, (y0[owners] + dy) * columns + x0[owners] + dx
+
+
+def _tile_index(owners: np.ndarray, codes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Build a tile -> rows CSR index from (row, tile code) pairs.
+
+    Returns:
+        Dictionary with the sorted unique tile codes, per-tile offsets and rows
+    """
+    order = np.lexsort((owners, codes))
+    codes, owners = codes[order], owners[order]
+    unique_codes, starts = np.unique(codes, return_index=True)
+    offsets = np.append(starts, len(codes)).astype(np.int64)
+    return {"codes": unique_codes, "offsets": offsets, "rows": owners}
+
+
+def _way_bboxes(store: ChunkStore) -> np.ndarray:
+    """Bounding boxes of the ways, NaN for ways with fewer than two or missing nodes."""
+    bboxes = np.full((store.num_ways, 4), np.nan)
+    way_rows, offsets, lons, lats = store.way_coordinates(np.arange(store.num_ways))
+    if len(way_rows):
+        starts = offsets[:-1]
+        bboxes[way_rows] = np.column_stack([
+            np.minimum.reduceat(lons, starts),
+            np.minimum.reduceat(lats, starts),
+            np.maximum.reduceat(lons, starts),
+            np.maximum.reduceat(lats, starts),
+        ])
+    return bboxes
+
+
+def _index_meta(extract_path: Path, tile_degrees: float) -> Dict[str, Any]:
+    """Describe the extract and the settings an index is built from."""
+    stat = extract_path.stat()
+    return {
+        "format_version": INDEX_FORMAT_VERSION,
+        "extract_path": str(extract_path.resolve()),
+        "extract_size": stat.st_size,
+        "extract_mtime_ns": stat.st_mtime_ns,
+        "tile_degrees": tile_degrees,
+        "road_highways": list(config.TWO_LANE_ROAD_TAGS["highway"]),
+        "landuse_types": list(config.LANDUSE_TAGS),
+    }
+
+
+def build_extract_index(
+    extract_path: str, index_dir: str, tile_degrees: float = config.OSM_EXTRACT_TILE_DEGREES
+) -> Path:
+    """
+    Read an extract once and write its tile-partitioned index.
+
+    The index is written next to index_dir and moved into place when
+    complete, so an interrupted build never leaves a partial index behind.
+
+    Args:
+        extract_path: Path of an .osm.pbf, .osm or .osm.xml file
+        index_dir: Directory of the index, replaced if it exists
+        tile_degrees: Tile size in degrees
+
+    Returns:
+        Path of the index directory
+    """
+    extract_path = Path(extract_path)
+    index_dir = Path(index_dir)
+    started = time.perf_counter()
+    logger.info(f"Building extract index {index_dir} from {extract_path}...")
+    source = load_extract(str(extract_path))
+
+    # Order nodes and ways by tile so one area's elements are stored together
+    way_bboxes = _way_bboxes(source)
+    centers = np.column_stack([
+        (way_bboxes[:, 0] + way_bboxes[:, 2]) / 2,
+        (way_bboxes[:, 1] + way_bboxes[:, 3]) / 2,
+    ])
+    centers = np.nan_to_num(centers, nan=-180.0)
+    _, way_order_codes = tile_codes(np.column_stack([centers, centers]), tile_degrees)
+    node_points = np.column_stack([source.node_lons, source.node_lats])
+    _, node_order_codes = tile_codes(np.column_stack([node_points, node_points]), tile_degrees)
+    way_order = np.argsort(way_order_codes, kind="stable")
+    store = source.take(
+        np.argsort(node_order_codes, kind="stable"), way_order, np.arange(source.num_relations)
+    )
+    way_bboxes = way_bboxes[way_order]
+
+    way_kinds = np.full(store.num_ways, WAY_OTHER, dtype=np.uint8)
+    way_kinds[road_way_mask(store)] = WAY_ROAD
+    way_kinds[landuse_way_mask(store)] = WAY_LANDUSE
+
+    is_way_member = store.relation_member_types == MEMBER_WAY
+    member_way_rows = np.where(
+        is_way_member, store.way_index(store.relation_member_refs), MISSING
+    ).astype(np.int64)
+
+    arrays: Dict[str, np.ndarray] = {
+        "node_ids": store.node_ids,
+        "node_lons": store.node_lons,
+        "node_lats": store.node_lats,
+        "way_ids": store.way_ids,
+        "way_node_offsets": store.way_node_offsets,
+        "way_node_ids": store.way_node_ids,
+        "way_node_rows": store.way_node_index,
+        "way_bboxes": way_bboxes,
+        "way_kinds": way_kinds,
+        "relation_ids": store.relation_ids,
+        "relation_member_offsets": store.relation_member_offsets,
+        "relation_member_types": store.relation_member_types,
+        "relation_member_refs": store.relation_member_refs,
+        "relation_member_roles": store.relation_member_roles,
+        "relation_member_way_rows": member_way_rows,
+    }
+    for group in _TAG_GROUPS:
+        tags: TagColumns = getattr(store, f"{group}_tags")
+        arrays[f"{group}_tag_offsets"] = tags.offsets
+        arrays[f"{group}_tag_keys"] = tags.keys
+        arrays[f"{group}_tag_values"] = tags.values
+
+    # Ways by the tiles their bbox overlaps; ways without coordinates are never selected
+    located = np.flatnonzero(~np.isnan(way_bboxes[:, 0]))
+    owners, codes = tile_codes(way_bboxes[located], tile_degrees)
+    way_tiles = _tile_index(located[owners], codes)
+
+    signals = np.flatnonzero(store.node_tags.equals("highway", "traffic_signals"))
+    signal_points = np.column_stack([store.node_lons[signals], store.node_lats[signals]])
+    owners, codes = tile_codes(np.column_stack([signal_points, signal_points]), tile_degrees)
+    signal_tiles = _tile_index(signals[owners], codes)
+
+    # Relations by the tiles of their member ways
+    member_owners = np.repeat(
+        np.arange(store.num_relations, dtype=np.int64), np.diff(store.relation_member_offsets)
+    )
+    members = member_way_rows != MISSING
+    members[members] = ~np.isnan(way_bboxes[member_way_rows[members], 0])
+    member_relations, member_ways = member_owners[members], member_way_rows[members]
+    owners, codes = tile_codes(way_bboxes[member_ways], tile_degrees)
+    pairs = np.unique(np.column_stack([member_relations[owners], codes]).reshape(-1, 2), axis=0)
+    relation_tiles = _tile_index(pairs[:, 0], pairs[:, 1])
+
+    for name, tiles in zip(_TILE_INDEXES, [way_tiles, signal_tiles, relation_tiles]):
+        for part, values in tiles.items():
+            arrays[f"{name}_tile_{part}"] = values
+
+    building_dir = index_dir.with_name(index_dir.name + ".tmp")
+    if building_dir.exists():
+        shutil.rmtree(building_dir)
+    building_dir.mkdir(parents=True)
+    for name, values in arrays.items():
+        np.save(building_dir / f"{name}.npy", np.ascontiguousarray(values))
+    (building_dir / STRINGS_FILE).write_text(json.dumps(store.strings.strings))
+    meta = _index_meta(extract_path, tile_degrees)
+    meta.update({"nodes": store.num_nodes, "ways": store.num_ways, "relations": store.num_relations})
+    (building_dir / META_FILE).write_text(json.dumps(meta, indent=2))
+
+    if index_dir.exists():
+        shutil.rmtree(index_dir)
+    os.replace(building_dir, index_dir)
+    logger.info(
+        f"Indexed {store.num_nodes} nodes, {store.num_ways} ways and {store.num_relations} relations "
+        f"into {len(way_tiles['codes'])} tiles in {time.perf_counter() - started:.1f}s"
+    )
+    return index_dir
+
+
+def index_is_current(extract_path: str, index_dir: str, tile_degrees: float) -> bool:
+    """
+    Check whether an index exists and was built from the extract as it is now.
+
+    Args:
+        extract_path: Path of the extract
+        index_dir: Directory of the index
+        tile_degrees: Tile size the index should have
+
+    Returns:
+        True if the index can be used as is
+    """
+    meta_file = Path(index_dir) / META_FILE
+    if not meta_file.exists():
+        return False
+    try:
+        meta = json.loads(meta_file.read_text())
+    except ValueError:
+        return False
+    expected = _index_meta(Path(extract_path), tile_degrees)
+    return all(meta.get(key) == value for key, value in expected.items())
+
+
+class ExtractIndex(ExtractSource):
+    """Serve the chunk queries of OverpassQueries from a memory-mapped extract index."""
+
+    def __init__(self, index_dir: str):
+        """
+        Open an index built by build_extract_index().
+
+        Args:
+            index_dir: Directory of the index
+        """
+        self.index_dir = Path(index_dir)
+        self.meta = json.loads((self.index_dir / META_FILE).read_text())
+        if self.meta.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Extract index {self.index_dir} has an unsupported format, rebuild it")
+        self.tile_degrees = float(self.meta["tile_degrees"])
+        self.strings = StringTable(json.loads((self.index_dir / STRINGS_FILE).read_text()))
+        self._arrays: Dict[str, np.ndarray] = {
+            path.stem: np.load(path, mmap_mode="r") for path in self.index_dir.glob("*.npy")
+        }
+        self._tags = {
+            group: TagColumns(
+                self.strings,
+                self._arrays[f"{group}_tag_offsets"],
+                self._arrays[f"{group}_tag_keys"],
+                self._arrays[f"{group}_tag_values"],
+            )
+            for group in _TAG_GROUPS
+        }
+        logger.info(
+            f"Opened extract index {self.index_dir} with {self.meta['nodes']} nodes, "
+            f"{self.meta['ways']} ways and {self.meta['relations']} relations"
+        )
+
+    def _tile_rows(self, name: str, bbox: List[float]) -> np.ndarray:
+        """
+        Gather the rows of a tile index for the tiles a bbox overlaps.
+
+        Args:
+            name: Tile index name ("way", "signal" or "relation")
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            Sorted unique rows
+        """
+        _, codes = tile_codes(np.asarray([bbox], dtype=np.float64), self.tile_degrees)
+        tile_codes_array = self._arrays[f"{name}_tile_codes"]
+        positions = np.searchsorted(tile_codes_array, codes)
+        present = positions < len(tile_codes_array)
+        present[present] = tile_codes_array[positions[present]] == codes[present]
+        _, row_positions = csr_take(self._arrays[f"{name}_tile_offsets"], positions[present])
+        return np.unique(self._arrays[f"{name}_tile_rows"][row_positions])
+
+    def _ways_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        """Rows of all ways with a segment in the bbox."""
+        candidates = self._tile_rows("way", bbox)
+        way_bboxes = self._arrays["way_bboxes"][candidates]
+        min_lon, min_lat, max_lon, max_lat = bbox
+        candidates = candidates[
+            (way_bboxes[:, 0] <= max_lon) & (way_bboxes[:, 2] >= min_lon)
+            & (way_bboxes[:, 1] <= max_lat) & (way_bboxes[:, 3] >= min_lat)
+        ]
+        if len(candidates) == 0:
+            return candidates
+
+        offsets, positions = csr_take(self._arrays["way_node_offsets"], candidates)
+        node_rows = self._arrays["way_node_rows"][positions]
+        lines = shapely.linestrings(
+            self._arrays["node_lons"][node_rows],
+            self._arrays["node_lats"][node_rows],
+            indices=np.repeat(np.arange(len(candidates)), np.diff(offsets)),
+        )
+        return candidates[shapely.intersects(lines, shapely.box(*bbox))]
+
+    def _roads_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        hits = self._ways_in_bbox(bbox)
+        return hits[self._arrays["way_kinds"][hits] == WAY_ROAD]
+
+    def _signals_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        candidates = self._tile_rows("signal", bbox)
+        lons = self._arrays["node_lons"][candidates]
+        lats = self._arrays["node_lats"][candidates]
+        min_lon, min_lat, max_lon, max_lat = bbox
+        return candidates[(lons >= min_lon) & (lons <= max_lon) & (lats >= min_lat) & (lats <= max_lat)]
+
+    def _member_ways(self, relation_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Member ways of relations, as (relation row, way row) pairs."""
+        offsets, positions = csr_take(self._arrays["relation_member_offsets"], relation_rows)
+        owners = np.repeat(relation_rows, np.diff(offsets))
+        way_rows = self._arrays["relation_member_way_rows"][positions]
+        found = way_rows != MISSING
+        return owners[found], way_rows[found]
+
+    def _landuse_in_bbox(self, bbox: List[float]) -> Tuple[np.ndarray, np.ndarray]:
+        hits = self._ways_in_bbox(bbox)
+        member_relations, member_ways = self._member_ways(self._tile_rows("relation", bbox))
+        relation_rows = np.unique(member_relations[np.isin(member_ways, hits)])
+        return hits[self._arrays["way_kinds"][hits] == WAY_LANDUSE], relation_rows
+
+    def _view(self, way_rows: np.ndarray, relation_rows: np.ndarray, node_rows: np.ndarray) -> ChunkStore:
+        arrays = self._arrays
+        relation_rows = np.asarray(relation_rows, dtype=np.int64)
+        _, member_ways = self._member_ways(relation_rows)
+        way_rows = np.union1d(way_rows, member_ways).astype(np.int64)
+        way_offsets, way_positions = csr_take(arrays["way_node_offsets"], way_rows)
+        way_nodes = arrays["way_node_rows"][way_positions]
+        node_rows = np.union1d(node_rows, way_nodes[way_nodes != MISSING]).astype(np.int64)
+        member_offsets, member_positions = csr_take(arrays["relation_member_offsets"], relation_rows)
+        return ChunkStore(
+            self.strings,
+            arrays["node_ids"][node_rows],
+            arrays["node_lons"][node_rows],
+            arrays["node_lats"][node_rows],
+            self._tags["node"].take(node_rows),
+            arrays["way_ids"][way_rows],
+            way_offsets,
+            arrays["way_node_ids"][way_positions],
+            self._tags["way"].take(way_rows),
+            arrays["relation_ids"][relation_rows],
+            member_offsets,
+            arrays["relation_member_types"][member_positions],
+            arrays["relation_member_refs"][member_positions],
+            arrays["relation_member_roles"][member_positions],
+            self._tags["relation"].take(relation_rows),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the size of the index.
+
+        Returns:
+            Dictionary with path, extract, nodes, ways, relations, tiles and bytes on disk
+        """
+        return {
+            "path": str(self.index_dir),
+            "extract": self.meta["extract_path"],
+            "nodes": self.meta["nodes"],
+            "ways": self.meta["ways"],
+            "relations": self.meta["relations"],
+            "tiles": len(self._arrays["way_tile_codes"]),
+            "bytes": sum(path.stat().st_size for path in self.index_dir.iterdir()),
+        }
+
+
+def open_extract_index(
+    extract_path: str, index_dir: str, tile_degrees: float = config.OSM_EXTRACT_TILE_DEGREES
+) -> ExtractIndex:
+    """
+    Open the index of an extract, building it first if it is missing or stale.
+
+    Args:
+        extract_path: Path of the extract
+        index_dir: Directory of the index
+        tile_degrees: Tile size in degrees
+
+    Returns:
+        ExtractIndex over the extract
+    """
+    if not index_is_current(extract_path, index_dir, tile_degrees):
+        with stage("build_extract_index"):
+            build_extract_index(extract_path, index_dir, tile_degrees)
+    return ExtractIndex(index_dir)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("extract", nargs="?", default=config.OSM_EXTRACT_PATH, help="OSM extract to index")
+    parser.add_argument("--index", default=config.OSM_EXTRACT_INDEX_DIR, help="Index directory")
+    parser.add_argument("--tile-degrees", type=float, default=config.OSM_EXTRACT_TILE_DEGREES)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the index is current")
+    args = parser.parse_args(argv)
+
+    if args.index is None:
+        parser.error("no index directory given and OSM_EXTRACT_INDEX_DIR is not set")
+    if args.force or not index_is_current(args.extract, args.index, args.tile_degrees):
+        build_extract_index(args.extract, args.index, args.tile_degrees)
+    else:
+        logger.info(f"Extract index {args.index} is current")
+    print(json.dumps(ExtractIndex(args.index).stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    sys.exit(main())
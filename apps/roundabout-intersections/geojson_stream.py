@@ -0,0 +1,228 @@
+"""
+Streaming GeoJSON feature writers and readers.
+
+Features are written one per line as they are produced, either as
+newline-delimited GeoJSON or inside an incrementally written
+FeatureCollection, and read back one at a time. Memory use stays flat
+regardless of how many features a file holds.
+"""
+
+import json
+import re
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# File suffixes treated as newline-delimited GeoJSON (one feature per line)
+NDJSON_SUFFIXES = {".ndjson", ".geojsonl", ".geojsons", ".jsonl"}
+
+_FEATURES_START = re.compile(r'"features"\s*:\s*\[')
+
+
+def _dumps(feature: Dict[str, Any]) -> str:
+    """Serialize a feature compactly on a single line."""
+    return json.dumps(feature, separators=(",", ":"))
+
+
+class FeatureWriter(ABC):
+    """Base class for streaming feature writers with optional on-the-fly deduplication."""
+
+    def __init__(self, output_file: str, dedup_key: Optional[str] = None):
+        """
+        Initialize the writer.
+
+        Args:
+            output_file: Path to the output file
+            dedup_key: Optional property name to deduplicate on. When set, only the
+                first feature for each value is written and features without the
+                property are skipped.
+        """
+        self.output_file = output_file
+        self.dedup_key = dedup_key
+        self.count = 0
+        self.skipped = 0
+        self._seen = set()
+        self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def open(self):
+        """Open the output file, creating parent directories if needed."""
+        output_path = Path(self.output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(output_path, "w")
+        self._write_header()
+
+    def close(self):
+        """Finish and close the output file."""
+        if self._file is None:
+            return
+        self._write_footer()
+        self._file.close()
+        self._file = None
+
+    def write(self, feature: Dict[str, Any]) -> bool:
+        """
+        Write one feature.
+
+        Args:
+            feature: GeoJSON feature dictionary
+
+        Returns:
+            True if the feature was written, False if it was a duplicate or had no dedup key
+        """
+        if self.dedup_key is not None:
+            key = feature.get("properties", {}).get(self.dedup_key)
+            if not key or key in self._seen:
+                self.skipped += 1
+                return False
+            self._seen.add(key)
+
+        self._write_feature(_dumps(feature))
+        self.count += 1
+        return True
+
+    def write_all(self, features: Iterable[Dict[str, Any]]) -> int:
+        """
+        Write every feature from an iterable.
+
+        Args:
+            features: Iterable of GeoJSON feature dictionaries
+
+        Returns:
+            Number of features written
+        """
+        written = 0
+        for feature in features:
+            if self.write(feature):
+                written += 1
+        return written
+
+    def _write_header(self):
+        pass
+
+    def _write_footer(self):
+        pass
+
+    @abstractmethod
+    def _write_feature(self, line: str):
+        """Write one serialized feature."""
+
+
+class NDJSONWriter(FeatureWriter):
+    """Write newline-delimited GeoJSON, one feature per line."""
+
+    def _write_feature(self, line: str):
+        self._file.write(line)
+        self._file.write("\n")
+
+
+class FeatureCollectionWriter(FeatureWriter):
+    """Write a GeoJSON FeatureCollection incrementally, one feature per line."""
+
+    def _write_header(self):
+        self._file.write('{"type":"FeatureCollection","features":[\n')
+
+    def _write_footer(self):
+        self._file.write("\n]}\n" if self.count else "]}\n")
+
+    def _write_feature(self, line: str):
+        if self.count:
+            self._file.write(",\n")
+        self._file.write(line)
+
+
+def open_feature_writer(output_file: str, dedup_key: Optional[str] = None) -> FeatureWriter:
+    """
+    Create a writer matching the output file's suffix.
+
+    Args:
+        output_file: Path to the output file (.ndjson/.geojsonl for newline-delimited)
+        dedup_key: Optional property name to deduplicate on
+
+    Returns:
+        NDJSONWriter or FeatureCollectionWriter
+    """
+    if Path(output_file).suffix.lower() in NDJSON_SUFFIXES:
+        return NDJSONWriter(output_file, dedup_key)
+    return FeatureCollectionWriter(output_file, dedup_key)
+
+
+def _iter_ndjson(f) -> Iterator[Dict[str, Any]]:
+    """Yield features from a newline-delimited GeoJSON file."""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_feature_collection(f, chunk_size: int = 65536) -> Iterator[Dict[str, Any]]:
+    """
+    Yield features from a FeatureCollection without loading the whole file.
+
+    Works for any formatting (pretty-printed or compact): the file is read in
+    chunks and each element of the "features" array is decoded as soon as it
+    is complete.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+
+    # Find the start of the features array
+    while True:
+        chunk = f.read(chunk_size)
+        buffer += chunk
+        match = _FEATURES_START.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        if not chunk:
+            return
+
+    pos = 0
+    eof = False
+    while True:
+        # Skip whitespace and separators between features
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+
+        try:
+            if pos >= len(buffer):
+                raise ValueError("need more data")
+            feature, end = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            if eof:
+                raise ValueError("Unexpected end of FeatureCollection")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield feature
+        pos = end
+
+
+def iter_features(input_file: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the features of a GeoJSON or newline-delimited GeoJSON file.
+
+    Args:
+        input_file: Path to a FeatureCollection (.geojson) or NDJSON file
+
+    Yields:
+        GeoJSON feature dictionaries
+    """
+    with open(input_file, "r") as f:
+        if Path(input_file).suffix.lower() in NDJSON_SUFFIXES:
+            yield from _iter_ndjson(f)
+        else:
+            yield from _iter_feature_collection(f)
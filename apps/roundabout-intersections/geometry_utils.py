@@ -2,16 +2,63 @@
 Geometric utility functions for buffer and intersection calculations.
 """
 
-import json
 import os
 import hashlib
+import math
 from pathlib import Path
+import numpy as np
+import shapely
 from shapely.geometry import Point, Polygon
-from shapely.ops import transform
-import pyproj
-from typing import Tuple, List, Dict, Set
+from typing import Tuple, List, Dict, Iterable, Iterator, Set
 import overpy
 import config
+import geojson_stream
+import projection
+
+
+def get_way_coordinates(way: overpy.Way) -> List[Tuple[float, float]]:
+    """
+    Get the (lon, lat) coordinates of an OSM way.
+
+    Uses the inline geometry of an `out geom` JSON response when present and
+    falls back to the way's nodes otherwise. Nodes are never fetched here;
+    missing nodes are fetched in batches by OverpassQueries.resolve_missing_nodes().
+
+    Args:
+        way: OSM way object
+
+    Returns:
+        List of (lon, lat) tuples in node order
+
+    Raises:
+        overpy.exception.DataIncomplete: If a node of the way is not in its result
+    """
+    geometry = way.attributes.get("geometry")
+    if geometry:
+        return [(float(point["lon"]), float(point["lat"])) for point in geometry]
+    return [(float(node.lon), float(node.lat)) for node in way.get_nodes(resolve_missing=False)]
+
+
+def get_member_coordinates(member: overpy.RelationWay) -> List[Tuple[float, float]]:
+    """
+    Get the (lon, lat) coordinates of a relation's way member.
+
+    Uses the member's inline `out geom` geometry when present and resolves
+    the member way otherwise.
+
+    Args:
+        member: Way member of an OSM relation
+
+    Returns:
+        List of (lon, lat) tuples, empty if the way is not in the result
+    """
+    if member.geometry:
+        return [(float(point.lon), float(point.lat)) for point in member.geometry]
+
+    way = member.resolve()
+    if way is None:
+        return []
+    return get_way_coordinates(way)
 
 
 def create_buffer(
@@ -28,22 +75,32 @@ def create_buffer(
         Shapely Polygon representing the buffer
     """
     # Project to a local UTM zone for accurate distance calculations
-    # Phoenix is in UTM zone 12N (EPSG:32612)
-    utm_proj = pyproj.Transformer.from_crs(
-        "EPSG:4326", "EPSG:32612", always_xy=True
-    )
-    point_utm = transform(utm_proj.transform, point)
+    point_utm = projection.to_utm(point)
 
     # Create buffer in UTM coordinates (meters)
     buffer_utm = point_utm.buffer(radius_meters)
 
     # Transform back to WGS84
-    wgs84_proj = pyproj.Transformer.from_crs(
-        "EPSG:32612", "EPSG:4326", always_xy=True
-    )
-    buffer_wgs84 = transform(wgs84_proj.transform, buffer_utm)
+    return projection.to_wgs84(buffer_utm)
+
+
+def create_buffers(
+    lons, lats, radius_meters: float = config.BUFFER_RADIUS_METERS
+) -> np.ndarray:
+    """
+    Create circular buffers around many points at once.
 
-    return buffer_wgs84
+    Args:
+        lons: Array-like of longitudes
+        lats: Array-like of latitudes
+        radius_meters: Buffer radius in meters
+
+    Returns:
+        Array of Shapely Polygons in WGS84, aligned with the input coordinates
+    """
+    xs, ys = projection.transform_coords(lons, lats)
+    buffers_utm = shapely.buffer(shapely.points(xs, ys), radius_meters)
+    return projection.to_wgs84(buffers_utm)
 
 
 def calculate_area_meters(polygon: Polygon) -> float:
@@ -57,11 +114,20 @@ def calculate_area_meters(polygon: Polygon) -> float:
         Area in square meters
     """
     # Project to UTM for accurate area calculation
-    utm_proj = pyproj.Transformer.from_crs(
-        "EPSG:4326", "EPSG:32612", always_xy=True
-    )
-    polygon_utm = transform(utm_proj.transform, polygon)
-    return polygon_utm.area
+    return projection.to_utm(polygon).area
+
+
+def calculate_areas_meters(polygons) -> np.ndarray:
+    """
+    Calculate the areas of many polygons in square meters.
+
+    Args:
+        polygons: Array-like of Shapely Polygons in WGS84
+
+    Returns:
+        Array of areas in square meters
+    """
+    return shapely.area(projection.to_utm(np.asarray(polygons, dtype=object)))
 
 
 def calculate_bbox_area_square_miles(bbox: List[float]) -> float:
@@ -119,17 +185,10 @@ def break_bbox_into_chunks(bbox: List[float], chunk_size_miles: float = 2.0) ->
     # Convert chunk size to meters (1 mile = 1609.34 meters)
     chunk_size_meters = chunk_size_miles * 1609.34
 
-    # Project to UTM for accurate distance calculations
-    utm_proj = pyproj.Transformer.from_crs(
-        "EPSG:4326", "EPSG:32612", always_xy=True
-    )
-    wgs84_proj = pyproj.Transformer.from_crs(
-        "EPSG:32612", "EPSG:4326", always_xy=True
-    )
-
     # Convert corners to UTM
-    min_corner_utm = utm_proj.transform(min_lon, min_lat)
-    max_corner_utm = utm_proj.transform(max_lon, max_lat)
+    corner_xs, corner_ys = projection.transform_coords([min_lon, max_lon], [min_lat, max_lat])
+    min_corner_utm = (corner_xs[0], corner_ys[0])
+    max_corner_utm = (corner_xs[1], corner_ys[1])
 
     # Calculate width and height in meters
     width_meters = max_corner_utm[0] - min_corner_utm[0]
@@ -139,42 +198,154 @@ def break_bbox_into_chunks(bbox: List[float], chunk_size_miles: float = 2.0) ->
     num_chunks_x = int(width_meters / chunk_size_meters) + 1
     num_chunks_y = int(height_meters / chunk_size_meters) + 1
 
+    # Calculate chunk boundaries in UTM for the whole grid (x-major order)
+    grid_i, grid_j = np.meshgrid(np.arange(num_chunks_x), np.arange(num_chunks_y), indexing="ij")
+    chunk_min_x = min_corner_utm[0] + grid_i.ravel() * chunk_size_meters
+    chunk_max_x = np.minimum(chunk_min_x + chunk_size_meters, max_corner_utm[0])
+    chunk_min_y = min_corner_utm[1] + grid_j.ravel() * chunk_size_meters
+    chunk_max_y = np.minimum(chunk_min_y + chunk_size_meters, max_corner_utm[1])
+
+    # Convert all chunk corners back to WGS84 in one call
+    lons, lats = projection.transform_coords(
+        np.concatenate([chunk_min_x, chunk_max_x]),
+        np.concatenate([chunk_min_y, chunk_max_y]),
+        config.UTM_CRS,
+        config.WGS84_CRS,
+    )
+    num_chunks = len(chunk_min_x)
+
     chunks = []
+    for k in range(num_chunks):
+        # Ensure we don't exceed original bbox
+        chunk_min_lon = max(float(lons[k]), min_lon)
+        chunk_min_lat = max(float(lats[k]), min_lat)
+        chunk_max_lon = min(float(lons[num_chunks + k]), max_lon)
+        chunk_max_lat = min(float(lats[num_chunks + k]), max_lat)
 
-    # Create grid of chunks
-    for i in range(num_chunks_x):
-        for j in range(num_chunks_y):
-            # Calculate chunk boundaries in UTM
-            chunk_min_x = min_corner_utm[0] + (i * chunk_size_meters)
-            chunk_max_x = min(chunk_min_x + chunk_size_meters, max_corner_utm[0])
-            chunk_min_y = min_corner_utm[1] + (j * chunk_size_meters)
-            chunk_max_y = min(chunk_min_y + chunk_size_meters, max_corner_utm[1])
+        chunks.append([chunk_min_lon, chunk_min_lat, chunk_max_lon, chunk_max_lat])
 
-            # Convert back to WGS84
-            chunk_min_lon, chunk_min_lat = wgs84_proj.transform(chunk_min_x, chunk_min_y)
-            chunk_max_lon, chunk_max_lat = wgs84_proj.transform(chunk_max_x, chunk_max_y)
+    return chunks
 
-            # Ensure we don't exceed original bbox
-            chunk_min_lon = max(chunk_min_lon, min_lon)
-            chunk_min_lat = max(chunk_min_lat, min_lat)
-            chunk_max_lon = min(chunk_max_lon, max_lon)
-            chunk_max_lat = min(chunk_max_lat, max_lat)
 
-            chunks.append([chunk_min_lon, chunk_min_lat, chunk_max_lon, chunk_max_lat])
+# Latitude limit of Web Mercator (slippy map) tiles
+MAX_TILE_LATITUDE = 85.0511287798
 
-    return chunks
 
+def _tile_fraction(lon: float, lat: float, zoom: int) -> Tuple[float, float]:
+    """Fractional slippy map tile (x, y) of a point; y grows southward."""
+    n = 2 ** zoom
+    lat = math.radians(min(max(lat, -MAX_TILE_LATITUDE), MAX_TILE_LATITUDE))
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n
+    return x, y
 
-def create_bbox_hash_filename(bbox: List[float], postfix: str) -> str:
+
+def tile_bounds(x: int, y: int, zoom: int) -> List[float]:
     """
-    Create a hash-based filename from a bounding box and postfix string.
+    Get the bounding box of a slippy map tile.
+
+    Args:
+        x: Tile column
+        y: Tile row (0 at the north edge)
+        zoom: Zoom level
+
+    Returns:
+        Bounding box [min_lon, min_lat, max_lon, max_lat]
+    """
+    n = 2 ** zoom
+
+    def latitude(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return [x / n * 360.0 - 180.0, latitude(y + 1), (x + 1) / n * 360.0 - 180.0, latitude(y)]
+
+
+def tile_quadkey(x: int, y: int, zoom: int) -> str:
+    """
+    Get the quadkey of a slippy map tile.
+
+    Args:
+        x: Tile column
+        y: Tile row
+        zoom: Zoom level
+
+    Returns:
+        Quadkey with one digit per zoom level, so tiles of different zooms never share a key
+    """
+    digits = []
+    for level in range(zoom, 0, -1):
+        mask = 1 << (level - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return "".join(digits)
+
+
+def tile_chunk_key(x: int, y: int, zoom: int) -> str:
+    """Chunk key of a tile, shared by every run and bbox that covers the tile."""
+    return f"tile_{tile_quadkey(x, y, zoom)}"
+
+
+def break_bbox_into_tiles(bbox: List[float], zoom: int) -> List[Tuple[str, List[float]]]:
+    """
+    Cover a bounding box with the slippy map tiles of one zoom level.
+
+    Unlike break_bbox_into_chunks(), the chunks do not depend on the bbox:
+    they are whole tiles of a fixed global grid, so overlapping or slightly
+    changed bboxes share their chunks (and cached responses and results).
 
     Args:
         bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
-        postfix: String to append to the hash (e.g., "roads", "signals")
+        zoom: Zoom level of the tiles (13 is about 2.5 miles across in Phoenix)
 
     Returns:
-        Filename string in format "{hash}_{postfix}.geojson"
+        List of (chunk key, tile bbox) tuples, row by row from the north-west
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    left, top = _tile_fraction(min_lon, max_lat, zoom)
+    right, bottom = _tile_fraction(max_lon, min_lat, zoom)
+
+    # A bbox edge lying exactly on a tile edge does not pull in the next tile
+    last = 2 ** zoom - 1
+    min_x, min_y = min(int(left), last), min(int(top), last)
+    max_x = min(max(math.ceil(right) - 1, min_x), last)
+    max_y = min(max(math.ceil(bottom) - 1, min_y), last)
+
+    return [
+        (tile_chunk_key(x, y, zoom), tile_bounds(x, y, zoom))
+        for y in range(min_y, max_y + 1)
+        for x in range(min_x, max_x + 1)
+    ]
+
+
+def split_bbox_into_quadrants(bbox: List[float]) -> List[List[float]]:
+    """
+    Split a bounding box into four equal quadrants.
+
+    Args:
+        bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+    Returns:
+        List of four bounding boxes (SW, SE, NW, NE)
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    mid_lon = (min_lon + max_lon) / 2
+    mid_lat = (min_lat + max_lat) / 2
+    return [
+        [min_lon, min_lat, mid_lon, mid_lat],
+        [mid_lon, min_lat, max_lon, mid_lat],
+        [min_lon, mid_lat, mid_lon, max_lat],
+        [mid_lon, mid_lat, max_lon, max_lat],
+    ]
+
+
+def create_bbox_hash(bbox: List[float]) -> str:
+    """
+    Create a short hash identifying a bounding box.
+
+    Args:
+        bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+    Returns:
+        12-character hex hash of the rounded coordinates
     """
     # Create a string representation of the bbox with fixed precision
     # Round to 6 decimal places (approximately 0.1 meter precision)
@@ -182,12 +353,35 @@ def create_bbox_hash_filename(bbox: List[float], postfix: str) -> str:
 
     # Create hash from the bbox string
     hash_obj = hashlib.md5(bbox_str.encode())
-    hash_hex = hash_obj.hexdigest()[:12]  # Use first 12 characters for shorter filenames
+    return hash_obj.hexdigest()[:12]  # Use first 12 characters for shorter filenames
+
+
+def create_bbox_hash_filename(bbox: List[float], postfix: str) -> str:
+    """
+    Create a hash-based filename from a bounding box and postfix string.
 
-    # Create filename with postfix
-    filename = f"{hash_hex}_{postfix}.geojson"
+    Args:
+        bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+        postfix: String to append to the hash (e.g., "roads", "signals")
+
+    Returns:
+        Filename string in format "{hash}_{postfix}.geojson"
+    """
+    return create_chunk_filename(create_bbox_hash(bbox), postfix)
 
-    return filename
+
+def create_chunk_filename(chunk_key: str, postfix: str) -> str:
+    """
+    Create the filename of a chunk's results from its key.
+
+    Args:
+        chunk_key: Chunk key (bbox hash or tile key)
+        postfix: String to append to the key (e.g., "intersections")
+
+    Returns:
+        Filename string in format "{chunk_key}_{postfix}.geojson"
+    """
+    return f"{chunk_key}_{postfix}.geojson"
 
 
 def check_bbox_file_exists(bbox: List[float], postfix: str, directory: str) -> bool:
@@ -242,32 +436,24 @@ def polygon_from_osm_way(way_nodes: List[Tuple[float, float]]) -> Polygon:
     return Polygon(way_nodes)
 
 
-def _write_features_to_geojson(features: List[Dict], output_file: str) -> int:
+def _write_features_to_geojson(features: Iterable[Dict], output_file: str) -> int:
     """
     Shared helper function to write GeoJSON features to a file.
 
+    Features are streamed to the file one at a time.
+
     Args:
-        features: List of GeoJSON feature dictionaries
-        output_file: Path to output GeoJSON file
+        features: Iterable of GeoJSON feature dictionaries
+        output_file: Path to output GeoJSON file (.ndjson/.geojsonl for newline-delimited)
 
     Returns:
         Number of features written
     """
-    # Create data directory if it doesn't exist
-    output_path = Path(output_file)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
-    # Create GeoJSON FeatureCollection
-    geojson = {
-        "type": "FeatureCollection",
-        "features": features,
-    }
-
-    # Write to file
-    with open(output_file, "w") as f:
-        json.dump(geojson, f, indent=2)
+    # Creates the data directory if it doesn't exist
+    with geojson_stream.open_feature_writer(output_file) as writer:
+        writer.write_all(features)
 
-    return len(features)
+    return writer.count
 
 
 def write_roads_to_geojson(roads: List[overpy.Way], output_file: str = "./data/roads_result.geojson"):
@@ -281,18 +467,26 @@ def write_roads_to_geojson(roads: List[overpy.Way], output_file: str = "./data/r
     Returns:
         Number of features written
     """
-    features = []
+    return _write_features_to_geojson(_road_features(roads), output_file)
 
+
+def _road_features(roads: List[overpy.Way]) -> Iterator[Dict]:
+    """
+    Yield GeoJSON LineString features for OSM ways.
+
+    Args:
+        roads: List of overpy.Way objects (roads)
+
+    Yields:
+        GeoJSON feature dictionaries
+    """
     for way in roads:
         try:
-            # Get nodes for this way
-            nodes = way.get_nodes(resolve_missing=True)
-            if len(nodes) < 2:
+            # Get coordinates for this way
+            coordinates = [list(coord) for coord in get_way_coordinates(way)]
+            if len(coordinates) < 2:
                 continue  # Skip ways with less than 2 nodes
 
-            # Extract coordinates
-            coordinates = [[float(node.lon), float(node.lat)] for node in nodes]
-
             # Create GeoJSON feature
             feature = {
                 "type": "Feature",
@@ -312,12 +506,11 @@ def write_roads_to_geojson(roads: List[overpy.Way], output_file: str = "./data/r
                 },
             }
 
-            features.append(feature)
         except Exception as e:
             # Skip ways that can't be processed
             continue
 
-    return _write_features_to_geojson(features, output_file)
+        yield feature
 
 
 def write_signals_to_geojson(
@@ -336,8 +529,24 @@ def write_signals_to_geojson(
     Returns:
         Number of features written
     """
-    features = []
+    return _write_features_to_geojson(
+        _signal_features(signals_result, filter_node_ids), output_file
+    )
+
+
+def _signal_features(
+    signals_result: overpy.Result, filter_node_ids: Set[str] = None
+) -> Iterator[Dict]:
+    """
+    Yield GeoJSON Point features for traffic signal nodes.
 
+    Args:
+        signals_result: Overpass result containing nodes (traffic signals)
+        filter_node_ids: Optional set of node IDs to filter by
+
+    Yields:
+        GeoJSON feature dictionaries
+    """
     for node in signals_result.nodes:
         # Filter by node IDs if provided
         if filter_node_ids is not None and str(node.id) not in filter_node_ids:
@@ -360,9 +569,8 @@ def write_signals_to_geojson(
                 },
             }
 
-            features.append(feature)
         except Exception as e:
             # Skip nodes that can't be processed
             continue
 
-    return _write_features_to_geojson(features, output_file)
+        yield feature
@@ -24,8 +24,8 @@ def find_intersections(two_lane_roads: List[overpy.Way]) -> Dict[str, List[overp
 
     for way in two_lane_roads:
         try:
-            # Get node IDs from the way
-            node_ids = way.get_nodes(resolve_missing=True)
+            # Get node IDs from the way (no node lookups needed)
+            node_ids = way._node_ids or []
             for node_id in node_ids:
                 node_to_ways[str(node_id)].append(way)
         except Exception:
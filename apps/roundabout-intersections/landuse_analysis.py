@@ -4,11 +4,17 @@ Functions to analyze landuse types within intersection buffers.
 
 import overpy
 from typing import List, Dict, Any
+import numpy as np
+import shapely
 from shapely.geometry import Polygon, Point
-from shapely.ops import transform
-import pyproj
 import geopandas as gpd
-from geometry_utils import calculate_area_meters
+from geometry_utils import (
+    calculate_area_meters,
+    calculate_areas_meters,
+    get_member_coordinates,
+    get_way_coordinates,
+)
+from projected_workspace import ProjectedWorkspace
 import config
 
 
@@ -22,12 +28,10 @@ def parse_landuse_way(way: overpy.Way) -> Polygon:
     Returns:
         Shapely Polygon representing the landuse area
     """
-    nodes = way.get_nodes(resolve_missing=True)
-    if len(nodes) < 3:
+    coords = get_way_coordinates(way)
+    if len(coords) < 3:
         raise ValueError(f"Way {way.id} has fewer than 3 nodes")
 
-    coords = [(float(node.lon), float(node.lat)) for node in nodes]
-
     # Close the polygon if not already closed
     if coords[0] != coords[-1]:
         coords.append(coords[0])
@@ -45,22 +49,15 @@ def parse_landuse_relation(relation: overpy.Relation) -> Polygon:
     Returns:
         Shapely Polygon (may be a MultiPolygon internally)
     """
-    from shapely.geometry import MultiPolygon
-
     outer_ways = []
     inner_ways = []
 
     for member in relation.members:
-        if member.type == "way":
-            way = member.resolve()
-            if way is None:
+        if isinstance(member, overpy.RelationWay):
+            coords = get_member_coordinates(member)
+            if len(coords) < 3:
                 continue
 
-            nodes = way.get_nodes(resolve_missing=True)
-            if len(nodes) < 3:
-                continue
-
-            coords = [(float(node.lon), float(node.lat)) for node in nodes]
             if coords[0] != coords[-1]:
                 coords.append(coords[0])
 
@@ -71,8 +68,25 @@ def parse_landuse_relation(relation: overpy.Relation) -> Polygon:
             elif member.role == "inner":
                 inner_ways.append(polygon)
 
+    return _assemble_multipolygon(outer_ways, inner_ways, relation.id)
+
+
+def _assemble_multipolygon(outer_ways: List[Polygon], inner_ways: List[Polygon], relation_id) -> Polygon:
+    """
+    Combine the outer and inner rings of a multipolygon relation.
+
+    Args:
+        outer_ways: Polygons of the outer member ways
+        inner_ways: Polygons of the inner member ways (holes)
+        relation_id: Relation ID for error messages
+
+    Returns:
+        Shapely Polygon or MultiPolygon
+    """
+    from shapely.geometry import MultiPolygon
+
     if not outer_ways:
-        raise ValueError(f"Relation {relation.id} has no outer ways")
+        raise ValueError(f"Relation {relation_id} has no outer ways")
 
     # Combine outer polygons
     if len(outer_ways) == 1:
@@ -132,10 +146,10 @@ def create_landuse_geodataframe(result: overpy.Result) -> gpd.GeoDataFrame:
 
     if not polygons:
         # Return empty GeoDataFrame
-        return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+        return gpd.GeoDataFrame(geometry=[], crs=config.WGS84_CRS)
 
     gdf = gpd.GeoDataFrame(
-        {"landuse": landuse_types, "geometry": polygons}, crs="EPSG:4326"
+        {"landuse": landuse_types, "geometry": polygons}, crs=config.WGS84_CRS
     )
 
     return gdf
@@ -158,9 +172,9 @@ def analyze_buffer_landuse(
         return {"unknown": 100.0}
 
     # Ensure same CRS
-    if landuse_gdf.crs != buffer.crs:
+    if landuse_gdf.crs != config.WGS84_CRS:
         # Buffer should be in WGS84, ensure GDF is too
-        landuse_gdf = landuse_gdf.to_crs("EPSG:4326")
+        landuse_gdf = landuse_gdf.to_crs(config.WGS84_CRS)
 
     # Calculate total buffer area in square meters
     total_buffer_area = calculate_area_meters(buffer)
@@ -174,28 +188,60 @@ def analyze_buffer_landuse(
     if intersecting.empty:
         return {"unknown": 100.0}
 
-    # Calculate intersection area for each landuse type
-    landuse_areas: Dict[str, float] = {}
+    # Project every intersection to UTM in one call and sum areas per landuse type
+    intersections = _intersect_with_buffer(buffer, intersecting.geometry.values)
+    areas = calculate_areas_meters(intersections)
 
-    for idx, row in intersecting.iterrows():
-        landuse_type = row["landuse"]
-        landuse_poly = row["geometry"]
+    return _landuse_percentages(intersecting["landuse"], areas, total_buffer_area)
 
-        try:
-            # Calculate intersection
-            intersection = buffer.intersection(landuse_poly)
-            if intersection.is_empty:
-                continue
 
-            # Calculate area in square meters
-            area = calculate_area_meters(intersection)
+def _intersect_with_buffer(buffer: Polygon, landuse_polygons) -> List:
+    """
+    Intersect a buffer with many landuse polygons.
 
-            if landuse_type not in landuse_areas:
-                landuse_areas[landuse_type] = 0.0
-            landuse_areas[landuse_type] += area
-        except Exception:
-            # Skip if intersection calculation fails
+    Args:
+        buffer: Shapely Polygon representing the buffer
+        landuse_polygons: Array-like of landuse polygons in the buffer's CRS
+
+    Returns:
+        List of intersection geometries aligned with landuse_polygons
+    """
+    try:
+        return list(shapely.intersection(buffer, landuse_polygons))
+    except Exception:
+        # Fall back to per-polygon intersections if the batch fails
+        intersections = []
+        for landuse_poly in landuse_polygons:
+            try:
+                intersections.append(buffer.intersection(landuse_poly))
+            except Exception:
+                # Skip if intersection calculation fails
+                intersections.append(Polygon())
+        return intersections
+
+
+def _landuse_percentages(
+    landuse_types, areas, total_buffer_area: float
+) -> Dict[str, float]:
+    """
+    Convert per-polygon intersection areas into landuse percentages.
+
+    Args:
+        landuse_types: Iterable of landuse types
+        areas: Iterable of intersection areas in square meters, aligned with landuse_types
+        total_buffer_area: Total buffer area in square meters
+
+    Returns:
+        Dictionary mapping landuse types to their percentage of the buffer area
+    """
+    landuse_areas: Dict[str, float] = {}
+
+    for landuse_type, area in zip(landuse_types, areas):
+        if area <= 0:
             continue
+        if landuse_type not in landuse_areas:
+            landuse_areas[landuse_type] = 0.0
+        landuse_areas[landuse_type] += float(area)
 
     # Calculate percentages
     total_covered = sum(landuse_areas.values())
@@ -213,3 +259,53 @@ def analyze_buffer_landuse(
     percentages = {k: round(v, 2) for k, v in percentages.items()}
 
     return percentages
+
+
+def analyze_workspace_landuse(
+    workspace: ProjectedWorkspace,
+    landuse_gdf: gpd.GeoDataFrame,
+    radius_meters: float = config.BUFFER_RADIUS_METERS,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Analyze landuse around every signal of a projected workspace.
+
+    The landuse polygons are projected into the workspace's metric CRS once,
+    and buffers, intersections and areas are all computed in meters.
+
+    Args:
+        workspace: ProjectedWorkspace for the chunk
+        landuse_gdf: GeoDataFrame with landuse polygons
+        radius_meters: Buffer radius in meters
+
+    Returns:
+        Dictionary mapping signal node IDs to landuse percentage breakdowns
+    """
+    buffers = workspace.signal_buffers(radius_meters)
+    breakdowns = {signal_id: {"unknown": 100.0} for signal_id in workspace.signal_ids}
+
+    if landuse_gdf.empty or len(buffers) == 0:
+        return breakdowns
+
+    landuse_projected = landuse_gdf.to_crs(workspace.crs)
+    landuse_types = landuse_projected["landuse"].values
+    landuse_polygons = landuse_projected.geometry.values
+
+    # Find every (signal, landuse polygon) pair that intersects in one query
+    signal_indices, landuse_indices = landuse_projected.sindex.query(
+        buffers, predicate="intersects"
+    )
+
+    for signal_index in np.unique(signal_indices):
+        buffer = buffers[signal_index]
+        total_buffer_area = buffer.area
+        if total_buffer_area == 0:
+            continue
+
+        matches = landuse_indices[signal_indices == signal_index]
+        intersections = _intersect_with_buffer(buffer, landuse_polygons[matches])
+        areas = shapely.area(intersections)
+        breakdowns[workspace.signal_ids[signal_index]] = _landuse_percentages(
+            landuse_types[matches], areas, total_buffer_area
+        )
+
+    return breakdowns
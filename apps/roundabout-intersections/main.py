@@ -6,20 +6,42 @@ This script:
 2. Filters two-lane roads and traffic signals for each chunk
 3. Identifies traffic signals that intersect with two-lane roads
 4. Exports aggregated results as GeoJSON
+
+Chunks are processed one at a time by default. Setting
+config.CHUNK_FETCH_WORKERS above 1 fetches chunks concurrently under a
+shared rate limiter while fetched chunks are filtered in parallel. With
+config.DATA_SOURCE = "extract", chunks are cut from a local OSM extract
+instead of being queried from Overpass.
 """
 
-import json
+import argparse
+import asyncio
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Tuple, Union
+import numpy as np
 from shapely.geometry import Point
-import overpy
 import config
+from chunk_store import ChunkStore
 import overpass_queries
+from artifact_cache import ArtifactCache
+from async_overpass import AsyncOverpassQueries
+from endpoint_pool import EndpointPool
+from extract_index import open_extract_index
+from osm_extract import ExtractSource, OsmExtract
+from overpass_recording import OverpassRecording
+from rate_limiter import AsyncRateLimiter, RateLimiter
+from response_cache import ResponseCache
 import two_lane_filter
 import traffic_signal_filter
 import geometry_utils
+import geojson_stream
+import osm_changes
+import run_manifest
+import adaptive_chunking
+from stage_timings import stage
 
 # Configure logging
 logging.basicConfig(
@@ -27,160 +49,898 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Where chunk data comes from: the Overpass API or a local OSM extract
+DataSource = Union[overpass_queries.OverpassQueries, ExtractSource]
+
+
+def intersection_to_feature(intersection: Dict) -> Dict[str, Any]:
+    """
+    Convert an intersection record to a GeoJSON feature.
+
+    Args:
+        intersection: Intersection dictionary
 
-def export_to_geojson(intersections: List[Dict], output_file: str = "results.geojson"):
+    Returns:
+        GeoJSON Point feature
+    """
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [intersection["lon"], intersection["lat"]],
+        },
+        "properties": {
+            "intersection_id": intersection.get("node_id", "unknown"),
+            "roads": intersection.get("road_names", []),
+            "road_ids": intersection.get("road_ids", []),
+            "num_roads": intersection.get("num_roads", 0),
+        },
+    }
+
+
+def export_to_geojson(intersections: Iterable[Dict], output_file: str = "results.geojson"):
     """
     Export intersection results to GeoJSON format.
 
+    Features are streamed to the file as they are converted.
+
     Args:
-        intersections: List of intersection dictionaries
-        output_file: Output file path
+        intersections: Iterable of intersection dictionaries
+        output_file: Output file path (.ndjson/.geojsonl for newline-delimited GeoJSON)
     """
-    features = []
-
-    for intersection in intersections:
-        feature = {
-            "type": "Feature",
-            "geometry": {
-                "type": "Point",
-                "coordinates": [intersection["lon"], intersection["lat"]],
-            },
-            "properties": {
-                "intersection_id": intersection.get("node_id", "unknown"),
-                "roads": intersection.get("road_names", []),
-                "road_ids": intersection.get("road_ids", []),
-                "num_roads": intersection.get("num_roads", 0),
-            },
-        }
+    with geojson_stream.open_feature_writer(output_file) as writer:
+        writer.write_all(intersection_to_feature(intersection) for intersection in intersections)
 
-        features.append(feature)
+    logger.info(f"Exported {writer.count} intersections to {output_file}")
 
-    geojson = {"type": "FeatureCollection", "features": features}
 
-    with open(output_file, "w") as f:
-        json.dump(geojson, f, indent=2)
+def fetch_chunk(
+    overpass: DataSource,
+    chunk_bbox: List[float],
+    chunk_label: str,
+    query_delay: float = config.QUERY_DELAY,
+    combined: bool = config.COMBINED_CHUNK_QUERY,
+    artifacts: Optional[ArtifactCache] = None,
+) -> Optional[Tuple[ChunkStore, np.ndarray]]:
+    """
+    Query roads and traffic signals for one chunk.
 
-    logger.info(f"Exported {len(features)} intersections to {output_file}")
+    Args:
+        overpass: Overpass API client or OSM extract
+        chunk_bbox: Chunk bounding box [min_lon, min_lat, max_lon, max_lat]
+        chunk_label: Chunk label for logging (e.g. "chunk 3")
+        query_delay: Delay in seconds around each query
+        combined: Fetch roads and signals in a single round trip
+        artifacts: Optional cache to store the chunk data and two-lane roads in
+
+    Returns:
+        Tuple of (chunk store with roads and signals, two-lane road mask over
+        its ways), or None if the chunk has nothing to process
+
+    Raises:
+        Exception: If a query fails
+    """
+    if combined:
+        # Query roads and traffic signals in this chunk with one request
+        logger.info(f"  Querying roads and traffic signals from {chunk_label}...")
+        try:
+            store = overpass.query_roads_and_signals_store(chunk_bbox)
+            num_signals = int(np.count_nonzero(traffic_signal_filter.signal_node_mask(store, chunk_bbox)))
+            logger.info(f"  Found {store.num_ways} roads in {chunk_label}")
+            logger.info(f"  Found {num_signals} traffic signal nodes in {chunk_label}")
+            time.sleep(query_delay)  # Be respectful of the API
+        except Exception as e:
+            logger.error(f"  Error querying roads and traffic signals in {chunk_label}: {e}")
+            raise
+        if artifacts is not None:
+            artifacts.save_chunk_data(chunk_bbox, store)
+    else:
+        # Query all roads in this chunk
+        logger.info(f"  Querying roads from {chunk_label}...")
+        try:
+            store = overpass.query_all_roads_store(chunk_bbox)
+            logger.info(f"  Found {store.num_ways} roads in {chunk_label}")
+            time.sleep(query_delay)  # Be respectful of the API
+        except Exception as e:
+            logger.error(f"  Error querying roads in {chunk_label}: {e}")
+            raise
 
+    two_lane_mask = select_two_lane_roads(store, chunk_label, artifacts)
+    if two_lane_mask is None:
+        return None
 
-def main():
-    """Main analysis workflow."""
-    logger.info("Starting OSM intersection analysis for Phoenix metro")
+    if not combined:
+        # Query traffic signals in this chunk
+        logger.info(f"  Querying traffic signals from {chunk_label}...")
+        try:
+            time.sleep(query_delay)  # Be respectful of the API
+            signals_store = overpass.query_traffic_signals_store(chunk_bbox)
+            logger.info(f"  Found {signals_store.num_nodes} traffic signal nodes in {chunk_label}")
+        except Exception as e:
+            logger.error(f"  Error querying traffic signals in {chunk_label}: {e}")
+            raise
 
-    # Initialize Overpass API client with retry configuration
-    overpass = overpass_queries.OverpassQueries(
-        api_url=config.OVERPASS_API_URL,
-        max_retries=config.OVERPASS_MAX_RETRIES,
-        initial_delay=config.OVERPASS_INITIAL_DELAY,
-        max_delay=config.OVERPASS_MAX_DELAY,
-    )
+        # The signals store holds no ways, so the two-lane mask stays aligned
+        store = ChunkStore.concat([store, signals_store])
+        if artifacts is not None:
+            artifacts.save_chunk_data(chunk_bbox, store)
 
-    # Break bounding box into chunks
-    logger.info("Breaking bounding box into chunks...")
-    bbox_chunks = geometry_utils.break_bbox_into_chunks(config.PHOENIX_BBOX, chunk_size_miles=2.0)
-    logger.info(f"Created {len(bbox_chunks)} bounding box chunks")
+    return store, two_lane_mask
 
-    # Aggregate results from all chunks
-    all_intersecting_signals = []
 
-    # Data directory for saving chunk results
-    data_dir = Path("data/intersections")
-    data_dir.mkdir(exist_ok=True)
+def select_two_lane_roads(
+    store: ChunkStore, chunk_label: str, artifacts: Optional[ArtifactCache] = None
+) -> Optional[np.ndarray]:
+    """
+    Filter a chunk's roads to two-lane roads.
 
-    # Process each chunk: query, filter, and find intersecting signals
-    for i, chunk_bbox in enumerate(bbox_chunks):
-        logger.info(f"Processing chunk {i+1}/{len(bbox_chunks)}: {chunk_bbox}")
+    Args:
+        store: Chunk store with the chunk's roads
+        chunk_label: Chunk label for logging
+        artifacts: Optional cache of two-lane road sets
 
-        # Check if chunk results file already exists
-        if geometry_utils.check_bbox_file_exists(chunk_bbox, "intersections", str(data_dir)):
-            logger.info(f"  Chunk {i+1} results already exist, skipping...")
-            continue
+    Returns:
+        Two-lane road mask over the store's ways, or None if the chunk has
+        fewer than two two-lane roads
+    """
+    logger.info(f"  Filtering two-lane roads from {chunk_label}...")
+    with stage("two_lane_filter"):
+        if artifacts is not None:
+            two_lane_mask = artifacts.two_lane_mask(store, lambda: two_lane_filter.two_lane_way_mask(store))
+        else:
+            two_lane_mask = two_lane_filter.two_lane_way_mask(store)
+    num_two_lane = int(np.count_nonzero(two_lane_mask))
+    logger.info(f"  Found {num_two_lane} two-lane roads in {chunk_label}")
+
+    if num_two_lane < 2:
+        logger.warning(f"  Not enough two-lane roads in {chunk_label}, skipping...")
+        return None
+    return two_lane_mask
+
+
+async def fetch_chunk_async(
+    overpass: AsyncOverpassQueries,
+    chunk_bbox: List[float],
+    chunk_label: str,
+    combined: bool = config.COMBINED_CHUNK_QUERY,
+    artifacts: Optional[ArtifactCache] = None,
+) -> Optional[Tuple[ChunkStore, np.ndarray]]:
+    """
+    Query roads and traffic signals for one chunk with the async client.
 
-        # Query all roads in this chunk
-        logger.info(f"  Querying roads from chunk {i+1}...")
+    Same as fetch_chunk(), without the fixed delays: the client's rate
+    limiter paces the requests of all chunks in flight.
+
+    Args:
+        overpass: Async Overpass API client
+        chunk_bbox: Chunk bounding box [min_lon, min_lat, max_lon, max_lat]
+        chunk_label: Chunk label for logging (e.g. "chunk 3")
+        combined: Fetch roads and signals in a single round trip
+        artifacts: Optional cache to store the chunk data and two-lane roads in
+
+    Returns:
+        Tuple of (chunk store with roads and signals, two-lane road mask over
+        its ways), or None if the chunk has nothing to process
+
+    Raises:
+        Exception: If a query fails
+    """
+    if combined:
+        logger.info(f"  Querying roads and traffic signals from {chunk_label}...")
         try:
-            roads_result = overpass.query_all_roads(chunk_bbox)
-            logger.info(f"  Found {len(roads_result.ways)} roads in chunk {i+1}")
-            time.sleep(config.QUERY_DELAY)  # Be respectful of the API
+            store = await overpass.query_roads_and_signals_store(chunk_bbox)
+            logger.info(f"  Found {store.num_ways} roads in {chunk_label}")
         except Exception as e:
-            logger.error(f"  Error querying roads in chunk {i+1}: {e}")
-            continue
-
-        # Filter to two-lane roads for this chunk
-        logger.info(f"  Filtering two-lane roads from chunk {i+1}...")
-        two_lane_roads = two_lane_filter.filter_two_lane_roads(roads_result)
-        logger.info(f"  Found {len(two_lane_roads)} two-lane roads in chunk {i+1}")
+            logger.error(f"  Error querying roads and traffic signals in {chunk_label}: {e}")
+            raise
+        if artifacts is not None:
+            await asyncio.to_thread(artifacts.save_chunk_data, chunk_bbox, store)
+    else:
+        logger.info(f"  Querying roads from {chunk_label}...")
+        try:
+            store = await overpass.query_all_roads_store(chunk_bbox)
+            logger.info(f"  Found {store.num_ways} roads in {chunk_label}")
+        except Exception as e:
+            logger.error(f"  Error querying roads in {chunk_label}: {e}")
+            raise
 
-        if len(two_lane_roads) < 2:
-            logger.warning(f"  Not enough two-lane roads in chunk {i+1}, skipping...")
-            continue
+    two_lane_mask = await asyncio.to_thread(select_two_lane_roads, store, chunk_label, artifacts)
+    if two_lane_mask is None:
+        return None
 
-        # Query traffic signals in this chunk
-        logger.info(f"  Querying traffic signals from chunk {i+1}...")
+    if not combined:
+        logger.info(f"  Querying traffic signals from {chunk_label}...")
         try:
-            time.sleep(config.QUERY_DELAY)  # Be respectful of the API
-            signals_result = overpass.query_traffic_signals(chunk_bbox)
-            logger.info(f"  Found {len(signals_result.nodes)} traffic signal nodes in chunk {i+1}")
+            signals_store = await overpass.query_traffic_signals_store(chunk_bbox)
+            logger.info(f"  Found {signals_store.num_nodes} traffic signal nodes in {chunk_label}")
         except Exception as e:
-            logger.error(f"  Error querying traffic signals in chunk {i+1}: {e}")
+            logger.error(f"  Error querying traffic signals in {chunk_label}: {e}")
+            raise
+
+        # The signals store holds no ways, so the two-lane mask stays aligned
+        store = ChunkStore.concat([store, signals_store])
+        if artifacts is not None:
+            await asyncio.to_thread(artifacts.save_chunk_data, chunk_bbox, store)
+
+    return store, two_lane_mask
+
+
+def load_cached_chunk(
+    artifacts: Optional[ArtifactCache], chunk_bbox: List[float], chunk_label: str
+) -> Tuple[bool, Optional[Tuple[ChunkStore, np.ndarray]]]:
+    """
+    Rebuild the result of fetch_chunk() from cached chunk data.
+
+    Args:
+        artifacts: Optional artifact cache
+        chunk_bbox: Chunk bounding box
+        chunk_label: Chunk label for logging
+
+    Returns:
+        Tuple of (whether the chunk data was cached, fetch_chunk() result)
+    """
+    store = artifacts.load_chunk_data(chunk_bbox) if artifacts is not None else None
+    if store is None:
+        return False, None
+    logger.info(f"  Using cached data of {chunk_label}: {store.num_ways} roads")
+    two_lane_mask = select_two_lane_roads(store, chunk_label, artifacts)
+    return True, None if two_lane_mask is None else (store, two_lane_mask)
+
+
+def process_chunk(
+    chunk_key: str,
+    chunk_bbox: List[float],
+    store: ChunkStore,
+    two_lane_mask: np.ndarray,
+    data_dir: Path,
+    chunk_label: str,
+    artifacts: Optional[ArtifactCache] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Filter the traffic signals of one chunk and save its intersections.
+
+    Args:
+        chunk_key: Chunk key, naming the chunk's result file
+        chunk_bbox: Chunk bounding box [min_lon, min_lat, max_lon, max_lat]
+        store: Chunk store with the chunk's roads and traffic signals
+        two_lane_mask: Boolean mask over store ways selecting the two-lane roads
+        data_dir: Directory for chunk result files
+        chunk_label: Chunk label for logging (e.g. "chunk 3")
+        artifacts: Optional cache of road counts and records
+
+    Returns:
+        List of GeoJSON features for the chunk's intersections
+
+    Raises:
+        Exception: If filtering fails
+    """
+    # Filter traffic signals using spatial query against two-lane roads for this chunk
+    logger.info(f"  Filtering traffic signals using spatial query for {chunk_label}...")
+    try:
+        with stage("signal_filter"):
+
+            def count_roads() -> Dict[str, int]:
+                signal_mask = traffic_signal_filter.signal_node_mask(store, chunk_bbox)
+                return traffic_signal_filter.count_store_signal_roads(
+                    store, two_lane_mask, signal_mask, buffer_radius_meters=config.SIGNAL_BUFFER_RADIUS_METERS
+                )
+
+            road_counts = artifacts.road_counts(store, chunk_bbox, count_roads) if artifacts else count_roads()
+            signal_node_ids = traffic_signal_filter.select_eligible_signals(
+                road_counts, config.MIN_ROAD_INTERSECTIONS
+            )
+        logger.info(f"  Found {len(signal_node_ids)} eligible traffic signal nodes in {chunk_label}")
+
+        # Create intersection records from filtered signals for this chunk
+        with stage("intersection_records"):
+
+            def build_features() -> List[Dict[str, Any]]:
+                chunk_intersections = traffic_signal_filter.create_intersection_records_from_store(
+                    store, signal_node_ids
+                )
+                return [intersection_to_feature(intersection) for intersection in chunk_intersections]
+
+            features = artifacts.records(store, chunk_bbox, build_features) if artifacts else build_features()
+
+        # Save chunk intersections to GeoJSON file
+        filename = geometry_utils.create_chunk_filename(chunk_key, "intersections")
+        chunk_output_file = data_dir / filename
+        with stage("write_chunk"):
+            geometry_utils._write_features_to_geojson(features, str(chunk_output_file))
+        logger.info(f"  Saved {len(features)} intersections to {chunk_output_file}")
+        return features
+
+    except Exception as e:
+        logger.error(f"  Error filtering signals in {chunk_label}: {e}")
+        raise
+
+
+def build_endpoint_pool(limiter_factory: Callable[..., Any]) -> Optional[EndpointPool]:
+    """
+    Build the pool of Overpass mirrors configured in OVERPASS_ENDPOINTS.
+
+    Args:
+        limiter_factory: Rate limiter class for each endpoint (RateLimiter or AsyncRateLimiter)
+
+    Returns:
+        EndpointPool, or None if no mirrors are configured
+    """
+    if not config.OVERPASS_ENDPOINTS:
+        return None
+    return EndpointPool(
+        config.OVERPASS_ENDPOINTS,
+        limiter_factory,
+        failure_threshold=config.ENDPOINT_FAILURE_THRESHOLD,
+        open_seconds=config.ENDPOINT_OPEN_SECONDS,
+        backoff_delay=config.OVERPASS_INITIAL_DELAY,
+        max_backoff_delay=config.OVERPASS_MAX_DELAY,
+    )
+
+
+def log_endpoint_stats(endpoints: Optional[EndpointPool]):
+    """Log the request statistics of each pooled endpoint."""
+    if endpoints is None:
+        return
+    for stats in endpoints.stats():
+        logger.info(
+            f"Endpoint {stats['url']}: {stats['requests']} requests, {stats['failures']} failures "
+            f"({stats['throttles']} throttled), {stats['latency']}s latency, circuit {stats['state']}"
+        )
+
+
+def chunk_params_hash() -> str:
+    """
+    Hash the parameters that determine chunk results.
+
+    Chunks processed with a different hash are scheduled again.
+
+    Returns:
+        Hex digest of the filter parameters
+    """
+    params = {
+        "signal_buffer_radius_meters": config.SIGNAL_BUFFER_RADIUS_METERS,
+        "min_road_intersections": config.MIN_ROAD_INTERSECTIONS,
+        "two_lane_road_tags": config.TWO_LANE_ROAD_TAGS,
+        "two_lane_rules": two_lane_filter.rule_parameters(),
+    }
+    if config.DATA_SOURCE == "extract":
+        # Results from an extract reflect its snapshot, not the live database
+        params["osm_extract"] = config.OSM_EXTRACT_PATH
+    return run_manifest.compute_params_hash(params)
+
+
+def import_existing_chunk_files(
+    manifest: run_manifest.RunManifest,
+    chunks: List[Tuple[str, List[float]]],
+    data_dir: Path,
+    params_hash: str,
+):
+    """
+    Record chunk files written before the manifest existed as done.
+
+    Args:
+        manifest: Run manifest (freshly created)
+        chunks: List of (chunk key, bbox) tuples
+        data_dir: Directory holding chunk result files
+        params_hash: Hash of the current filter parameters
+    """
+    imported = 0
+    for chunk_key, _ in chunks:
+        filename = data_dir / geometry_utils.create_chunk_filename(chunk_key, "intersections")
+        if not filename.exists():
             continue
+        features = list(geojson_stream.iter_features(str(filename)))
+        manifest.mark_done(chunk_key, params_hash, features)
+        imported += 1
+
+    if imported:
+        logger.info(f"Imported {imported} existing chunk result files into the manifest")
+
+
+def fetch_and_record(
+    overpass: DataSource,
+    manifest: run_manifest.RunManifest,
+    chunk_key: str,
+    chunk_bbox: List[float],
+    chunk_label: str,
+    query_delay: float = config.QUERY_DELAY,
+    artifacts: Optional[ArtifactCache] = None,
+) -> Tuple[Optional[Tuple[ChunkStore, np.ndarray]], float, int]:
+    """
+    Fetch one chunk, recording the attempt in the manifest.
 
-        # Filter traffic signals using spatial query against two-lane roads for this chunk
-        logger.info(f"  Filtering traffic signals using spatial query for chunk {i+1}...")
+    Cached chunk data is used instead of querying when available.
+
+    Args:
+        overpass: Overpass API client or OSM extract
+        manifest: Run manifest
+        chunk_key: Chunk key
+        chunk_bbox: Chunk bounding box
+        chunk_label: Chunk label for logging
+        query_delay: Delay in seconds around each query
+        artifacts: Optional artifact cache
+
+    Returns:
+        Tuple of (fetch_chunk() result, start time, payload bytes)
+
+    Raises:
+        Exception: If fetching fails (the failure is recorded first)
+    """
+    manifest.mark_started(chunk_key)
+    started = time.monotonic()
+    overpass.take_bytes_received()
+    try:
+        with stage("fetch_chunk"):
+            cached, fetched = load_cached_chunk(artifacts, chunk_bbox, chunk_label)
+            if not cached:
+                fetched = fetch_chunk(overpass, chunk_bbox, chunk_label, query_delay, artifacts=artifacts)
+    except Exception as e:
+        manifest.mark_failed(chunk_key, str(e), time.monotonic() - started, overpass.take_bytes_received())
+        raise
+    return fetched, started, overpass.take_bytes_received()
+
+
+async def fetch_and_record_async(
+    overpass: AsyncOverpassQueries,
+    manifest: run_manifest.RunManifest,
+    chunk_key: str,
+    chunk_bbox: List[float],
+    chunk_label: str,
+    artifacts: Optional[ArtifactCache] = None,
+) -> Tuple[Optional[Tuple[ChunkStore, np.ndarray]], float, int]:
+    """
+    Fetch one chunk with the async client, recording the attempt in the manifest.
+
+    Cached chunk data is used instead of querying when available.
+
+    Args:
+        overpass: Async Overpass API client
+        manifest: Run manifest
+        chunk_key: Chunk key
+        chunk_bbox: Chunk bounding box
+        chunk_label: Chunk label for logging
+        artifacts: Optional artifact cache
+
+    Returns:
+        Tuple of (fetch_chunk_async() result, start time, payload bytes)
+
+    Raises:
+        Exception: If fetching fails (the failure is recorded first)
+    """
+    manifest.mark_started(chunk_key)
+    started = time.monotonic()
+    overpass.take_bytes_received()
+    try:
+        with stage("fetch_chunk"):
+            cached, fetched = await asyncio.to_thread(load_cached_chunk, artifacts, chunk_bbox, chunk_label)
+            if not cached:
+                fetched = await fetch_chunk_async(overpass, chunk_bbox, chunk_label, artifacts=artifacts)
+    except Exception as e:
+        manifest.mark_failed(chunk_key, str(e), time.monotonic() - started, overpass.take_bytes_received())
+        raise
+    return fetched, started, overpass.take_bytes_received()
+
+
+def process_and_record(
+    manifest: run_manifest.RunManifest,
+    params_hash: str,
+    chunk_key: str,
+    chunk_bbox: List[float],
+    fetched: Optional[Tuple[ChunkStore, np.ndarray]],
+    data_dir: Path,
+    chunk_label: str,
+    started: float,
+    payload_bytes: int,
+    artifacts: Optional[ArtifactCache] = None,
+):
+    """
+    Process one fetched chunk and record the outcome in the manifest.
+
+    Args:
+        manifest: Run manifest
+        params_hash: Hash of the current filter parameters
+        chunk_key: Chunk key
+        chunk_bbox: Chunk bounding box
+        fetched: Result of fetch_chunk(), None if the chunk has nothing to process
+        data_dir: Directory for chunk result files
+        chunk_label: Chunk label for logging
+        started: Monotonic time the chunk was started
+        payload_bytes: Raw response bytes fetched for the chunk
+        artifacts: Optional artifact cache
+    """
+    try:
+        features = []
+        road_ids = []
+        if fetched is not None:
+            store, two_lane_mask = fetched
+            features = process_chunk(
+                chunk_key, chunk_bbox, store, two_lane_mask, data_dir, chunk_label, artifacts
+            )
+            road_ids = store.way_ids[two_lane_mask]
+    except Exception as e:
+        manifest.mark_failed(chunk_key, str(e), time.monotonic() - started, payload_bytes)
+        return
+
+    with stage("record_chunk"):
+        manifest.mark_done(
+            chunk_key, params_hash, features, time.monotonic() - started, payload_bytes, road_ids
+        )
+
+
+def run_chunks_serial(
+    overpass: DataSource,
+    manifest: run_manifest.RunManifest,
+    params_hash: str,
+    chunks: List[Tuple[str, List[float]]],
+    data_dir: Path,
+    artifacts: Optional[ArtifactCache] = None,
+):
+    """
+    Fetch and process chunks one at a time.
+
+    Args:
+        overpass: Overpass API client or OSM extract
+        manifest: Run manifest
+        params_hash: Hash of the current filter parameters
+        chunks: List of (chunk key, bbox) tuples to process
+        data_dir: Directory for chunk result files
+        artifacts: Optional cache of per-chunk artifacts
+    """
+    for i, (chunk_key, chunk_bbox) in enumerate(chunks):
+        logger.info(f"Processing chunk {i+1}/{len(chunks)}: {chunk_bbox}")
+        chunk_label = f"chunk {i+1}"
+
+        # Fixed delays are only needed when the server's slot status can't pace requests
+        query_delay = config.QUERY_DELAY
+        if isinstance(overpass, ExtractSource) or overpass.uses_slot_status() or overpass.is_replaying():
+            query_delay = 0.0
         try:
-            signal_node_ids = traffic_signal_filter.filter_traffic_signals_by_spatial_query(
-                signals_result,
-                two_lane_roads,
-                buffer_radius_meters=2.0,
-                min_road_intersections=3,
+            fetched, started, payload_bytes = fetch_and_record(
+                overpass, manifest, chunk_key, chunk_bbox, chunk_label, query_delay, artifacts
+            )
+        except Exception:
+            continue
+
+        process_and_record(
+            manifest, params_hash, chunk_key, chunk_bbox, fetched, data_dir,
+            chunk_label, started, payload_bytes, artifacts,
+        )
+
+
+def run_chunks_concurrent(
+    overpass: overpass_queries.OverpassQueries,
+    manifest: run_manifest.RunManifest,
+    params_hash: str,
+    chunks: List[Tuple[str, List[float]]],
+    data_dir: Path,
+    fetch_workers: int = config.CHUNK_FETCH_WORKERS,
+    process_workers: int = config.CHUNK_PROCESS_WORKERS,
+    artifacts: Optional[ArtifactCache] = None,
+):
+    """
+    Fetch chunks on a worker pool and filter them as their results arrive.
+
+    All fetch workers share the client's rate limiter, so the fixed
+    QUERY_DELAY sleeps are not used in this mode.
+
+    Args:
+        overpass: Overpass API client (should have a rate limiter)
+        manifest: Run manifest
+        params_hash: Hash of the current filter parameters
+        chunks: List of (chunk key, bbox) tuples to process
+        data_dir: Directory for chunk result files
+        fetch_workers: Number of chunks fetched at the same time
+        process_workers: Number of threads filtering fetched chunks
+        artifacts: Optional cache of per-chunk artifacts
+    """
+    logger.info(
+        f"Fetching {len(chunks)} chunks with {fetch_workers} fetch workers "
+        f"and {process_workers} processing workers"
+    )
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            ThreadPoolExecutor(max_workers=process_workers) as process_pool:
+        fetch_futures = {
+            fetch_pool.submit(
+                fetch_and_record, overpass, manifest, chunk_key, chunk_bbox, f"chunk {i+1}", 0.0, artifacts
+            ): (i, chunk_key, chunk_bbox)
+            for i, (chunk_key, chunk_bbox) in enumerate(chunks)
+        }
+
+        process_futures = []
+        for future in as_completed(fetch_futures):
+            i, chunk_key, chunk_bbox = fetch_futures[future]
+            try:
+                fetched, started, payload_bytes = future.result()
+            except Exception:
+                continue
+
+            logger.info(f"Processing chunk {i+1}/{len(chunks)}: {chunk_bbox}")
+            process_futures.append(
+                process_pool.submit(
+                    process_and_record, manifest, params_hash, chunk_key, chunk_bbox, fetched,
+                    data_dir, f"chunk {i+1}", started, payload_bytes, artifacts,
+                )
             )
-            logger.info(f"  Found {len(signal_node_ids)} eligible traffic signal nodes in chunk {i+1}")
 
-            # Create intersection records from filtered signals for this chunk
-            chunk_intersections = traffic_signal_filter.create_intersection_records_from_signals(
-                signals_result, signal_node_ids
+        for future in as_completed(process_futures):
+            future.result()
+
+
+async def run_chunks_async(
+    manifest: run_manifest.RunManifest,
+    params_hash: str,
+    chunks: List[Tuple[str, List[float]]],
+    data_dir: Path,
+    cache: Optional[ResponseCache] = None,
+    recording: Optional[OverpassRecording] = None,
+    chunks_in_flight: int = config.ASYNC_CHUNKS_IN_FLIGHT,
+    process_workers: int = config.CHUNK_PROCESS_WORKERS,
+    artifacts: Optional[ArtifactCache] = None,
+):
+    """
+    Fetch chunks concurrently with the async client and filter them on a thread pool.
+
+    All chunk tasks share one rate limiter and one pool of keep-alive
+    connections; chunks waiting on backoff or a rate token don't hold a thread.
+
+    Args:
+        manifest: Run manifest
+        params_hash: Hash of the current filter parameters
+        chunks: List of (chunk key, bbox) tuples to process
+        data_dir: Directory for chunk result files
+        cache: Optional on-disk cache of raw responses
+        recording: Optional recording to save responses to or replay them from
+        chunks_in_flight: Maximum number of chunks being fetched at the same time
+        process_workers: Number of threads filtering fetched chunks
+        artifacts: Optional cache of per-chunk artifacts
+    """
+    logger.info(
+        f"Fetching {len(chunks)} chunks with the async client, {chunks_in_flight} in flight "
+        f"and {process_workers} processing workers"
+    )
+
+    rate_limiter = AsyncRateLimiter(
+        requests_per_second=config.OVERPASS_REQUESTS_PER_SECOND,
+        max_in_flight=config.OVERPASS_MAX_IN_FLIGHT,
+    )
+    endpoints = build_endpoint_pool(AsyncRateLimiter)
+    slots = asyncio.Semaphore(chunks_in_flight)
+    loop = asyncio.get_running_loop()
+
+    async with AsyncOverpassQueries(
+        api_url=config.OVERPASS_API_URL,
+        max_retries=config.OVERPASS_MAX_RETRIES,
+        initial_delay=config.OVERPASS_INITIAL_DELAY,
+        max_delay=config.OVERPASS_MAX_DELAY,
+        rate_limiter=rate_limiter,
+        cache=cache,
+        endpoints=endpoints,
+        recording=recording,
+    ) as overpass:
+        with ThreadPoolExecutor(max_workers=process_workers) as process_pool:
+
+            async def run_chunk(i: int, chunk_key: str, chunk_bbox: List[float]):
+                chunk_label = f"chunk {i+1}"
+                async with slots:
+                    try:
+                        fetched, started, payload_bytes = await fetch_and_record_async(
+                            overpass, manifest, chunk_key, chunk_bbox, chunk_label, artifacts
+                        )
+                    except Exception:
+                        return
+
+                logger.info(f"Processing chunk {i+1}/{len(chunks)}: {chunk_bbox}")
+                await loop.run_in_executor(
+                    process_pool, process_and_record, manifest, params_hash, chunk_key, chunk_bbox,
+                    fetched, data_dir, chunk_label, started, payload_bytes, artifacts,
+                )
+
+            await asyncio.gather(
+                *(run_chunk(i, chunk_key, chunk_bbox) for i, (chunk_key, chunk_bbox) in enumerate(chunks))
             )
 
-            # Save chunk intersections to GeoJSON file
-            filename = geometry_utils.create_bbox_hash_filename(chunk_bbox, "intersections")
-            chunk_output_file = data_dir / filename
-            export_to_geojson(chunk_intersections, str(chunk_output_file))
-            logger.info(f"  Saved {len(chunk_intersections)} intersections to {chunk_output_file}")
+    log_endpoint_stats(endpoints)
 
-        except Exception as e:
-            logger.error(f"  Error filtering signals in chunk {i+1}: {e}")
-            continue
 
-    # Aggregate and export results
-    logger.info(f"Total intersecting signals found across all chunks: {len(all_intersecting_signals)}")
-
-    # Combine all chunk results
-    for filename in data_dir.glob("*.geojson"):
-        with open(filename, "r") as f:
-            data = json.load(f)
-            all_intersecting_signals.extend(data["features"])
-
-    # Deduplicate based on properties.intersection_id
-    logger.info(f"Total intersecting signals found across all chunks: {len(all_intersecting_signals)}")
-    seen_ids = set()
-    unique_signals = []
-    for signal in all_intersecting_signals:
-        intersection_id = signal.get("properties", {}).get("intersection_id")
-        if intersection_id and intersection_id not in seen_ids:
-            seen_ids.add(intersection_id)
-            unique_signals.append(signal)
-
-    logger.info(f"After deduplication: {len(unique_signals)} unique intersections")
-
-    # Step 8: Export to GeoJSON
-    logger.info("Exporting results to GeoJSON...")
-    geojson = {"type": "FeatureCollection", "features": unique_signals}
-    with open("results.geojson", "w") as f:
-        json.dump(geojson, f, indent=2)
-    logger.info(f"Exported {len(unique_signals)} intersections to results.geojson")
+def aggregate_results(
+    manifest: run_manifest.RunManifest, chunk_keys: List[str], output_file: str
+) -> Tuple[int, int]:
+    """
+    Stream the stored results of the given chunks into one output, deduplicating by intersection_id.
+
+    Args:
+        manifest: Run manifest holding each chunk's result features
+        chunk_keys: Keys of the chunks covering the analysis area
+        output_file: Output file path
+
+    Returns:
+        Tuple of (features read, unique features written)
+    """
+    total = 0
+    with geojson_stream.open_feature_writer(output_file, dedup_key="intersection_id") as writer:
+        for feature in manifest.iter_features(chunk_keys):
+            total += 1
+            writer.write(feature)
+    return total, writer.count
+
+
+def main(change_files: Optional[Sequence[str]] = None):
+    """
+    Main analysis workflow.
+
+    Args:
+        change_files: Optional osmChange files. When given, the last run's
+            results are updated: only the chunks the changes touch are
+            processed again before the output is rewritten.
+    """
+    logger.info("Starting OSM intersection analysis for Phoenix metro")
+
+    # A local extract is CPU-bound and needs none of the network machinery
+    offline = config.DATA_SOURCE == "extract"
+    concurrent = config.CHUNK_FETCH_WORKERS > 1 and not offline
+
+    # Share one rate limiter between all fetch workers in concurrent mode
+    rate_limiter = None
+    if concurrent:
+        rate_limiter = RateLimiter(
+            requests_per_second=config.OVERPASS_REQUESTS_PER_SECOND,
+            max_in_flight=config.OVERPASS_MAX_IN_FLIGHT,
+        )
+
+    # Reuse raw responses across runs so filter changes don't re-download chunks.
+    # An update must see the changed data, so it always queries the server.
+    response_cache = None
+    if config.RESPONSE_CACHE_ENABLED and not offline and not change_files:
+        response_cache = ResponseCache(
+            config.RESPONSE_CACHE_DIR,
+            ttl_seconds=config.RESPONSE_CACHE_TTL_SECONDS,
+            max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+        )
+
+    # Balance requests over the configured mirrors, each with its own rate limit.
+    # The async run builds and reports its own pool.
+    endpoints = None if offline or config.ASYNC_CLIENT else build_endpoint_pool(RateLimiter)
+
+    # Save every response of the run, or answer every query from a saved run
+    recording = None
+    if config.OVERPASS_RECORDING_MODE and not offline:
+        recording = OverpassRecording(config.OVERPASS_RECORDING_DIR, config.OVERPASS_RECORDING_MODE)
+        logger.info(f"Overpass recording mode '{recording.mode}' using {recording.directory}")
+
+    # Keep each chunk's data, road sets, road counts and records, so a parameter
+    # change recomputes only the layers it affects. Recording needs every
+    # response to go through the client, so it bypasses the cache.
+    artifacts = None
+    if config.ARTIFACT_CACHE_ENABLED and recording is None:
+        artifacts = ArtifactCache(config.ARTIFACT_CACHE_DIR)
+
+    if offline:
+        # Cut every chunk out of the extract, through its tile index if configured
+        if config.OSM_EXTRACT_INDEX_DIR:
+            overpass = open_extract_index(config.OSM_EXTRACT_PATH, config.OSM_EXTRACT_INDEX_DIR)
+        else:
+            overpass = OsmExtract(config.OSM_EXTRACT_PATH)
+    else:
+        # Initialize Overpass API client with retry configuration
+        overpass = overpass_queries.OverpassQueries(
+            api_url=config.OVERPASS_API_URL,
+            max_retries=config.OVERPASS_MAX_RETRIES,
+            initial_delay=config.OVERPASS_INITIAL_DELAY,
+            max_delay=config.OVERPASS_MAX_DELAY,
+            rate_limiter=rate_limiter,
+            cache=response_cache,
+            endpoints=endpoints,
+            recording=recording,
+        )
+
+    # Data directory for saving chunk results
+    data_dir = Path(config.CHUNK_RESULTS_DIR)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    # Track chunk status in the manifest and schedule only unfinished chunks
+    manifest = run_manifest.RunManifest(config.MANIFEST_DB)
+    params_hash = chunk_params_hash()
+    if change_files:
+        # Keep the last run's layout and re-run only the chunks the changes touch
+        chunks = manifest.layout()
+        if not chunks:
+            logger.error(f"No previous run in {config.MANIFEST_DB} to update, run a full analysis first")
+            manifest.close()
+            return
+        with stage("osm_changes"):
+            changes = osm_changes.read_changes(change_files)
+            touched = osm_changes.touched_chunks(changes, chunks, manifest, overpass)
+        manifest.mark_pending(touched)
+        if artifacts is not None:
+            bboxes = dict(chunks)
+            for chunk_key in touched:
+                artifacts.discard_chunk_data(bboxes[chunk_key])
+        logger.info(
+            f"{len(changes)} changed elements in {len(change_files)} change files "
+            f"touch {len(touched)} of {len(chunks)} chunks"
+        )
+    else:
+        # Break bounding box into chunks
+        logger.info("Breaking bounding box into chunks...")
+        with stage("chunking"):
+            if config.CHUNKING_MODE == "tiles":
+                # Keyed by tile, so other bboxes and runs reuse the chunks
+                chunks = geometry_utils.break_bbox_into_tiles(config.PHOENIX_BBOX, config.CHUNK_TILE_ZOOM)
+            else:
+                if config.CHUNKING_MODE == "adaptive":
+                    bbox_chunks = adaptive_chunking.build_adaptive_chunks(
+                        config.PHOENIX_BBOX, overpass.count_chunk_elements
+                    )
+                else:
+                    bbox_chunks = geometry_utils.break_bbox_into_chunks(
+                        config.PHOENIX_BBOX, chunk_size_miles=config.CHUNK_SIZE_MILES
+                    )
+                chunks = [
+                    (geometry_utils.create_bbox_hash(chunk_bbox), chunk_bbox) for chunk_bbox in bbox_chunks
+                ]
+        logger.info(f"Created {len(chunks)} bounding box chunks")
+
+        is_new_manifest = manifest.is_empty()
+        manifest.register_chunks(chunks)
+        manifest.set_layout([key for key, _ in chunks])
+        if is_new_manifest:
+            import_existing_chunk_files(manifest, chunks, data_dir, params_hash)
+
+    chunks_to_run = manifest.chunks_to_run(chunks, params_hash)
+    logger.info(f"{len(chunks) - len(chunks_to_run)} chunks already done, {len(chunks_to_run)} to process")
+
+    # Process each chunk: query, filter, and find intersecting signals
+    if config.ASYNC_CLIENT and not offline:
+        asyncio.run(
+            run_chunks_async(
+                manifest, params_hash, chunks_to_run, data_dir, response_cache, recording, artifacts=artifacts
+            )
+        )
+    elif concurrent:
+        run_chunks_concurrent(overpass, manifest, params_hash, chunks_to_run, data_dir, artifacts=artifacts)
+    else:
+        run_chunks_serial(overpass, manifest, params_hash, chunks_to_run, data_dir, artifacts)
+
+    logger.info(f"Chunk status: {manifest.summary()}")
+    log_endpoint_stats(endpoints)
+
+    # Combine all chunk results, deduplicating based on properties.intersection_id
+    logger.info(f"Exporting results to {config.RESULTS_FILE}...")
+    with stage("aggregate"):
+        total, unique = aggregate_results(manifest, [key for key, _ in chunks], config.RESULTS_FILE)
+    logger.info(f"Total intersecting signals found across all chunks: {total}")
+    logger.info(f"After deduplication: {unique} unique intersections")
+    logger.info(f"Exported {unique} intersections to {config.RESULTS_FILE}")
+    manifest.close()
+
+    if recording is not None:
+        logger.info(f"Overpass recording: {recording.stats()}")
+
+    if response_cache is not None:
+        stats = response_cache.stats()
+        logger.info(
+            f"Response cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['evictions']} evictions, {stats['total_bytes']} bytes"
+        )
+
+    if artifacts is not None:
+        layers = ", ".join(
+            f"{layer} {counts['hits']}/{counts['hits'] + counts['misses']}"
+            for layer, counts in artifacts.stats().items()
+        )
+        logger.info(f"Artifact cache hits: {layers}")
 
     logger.info("Analysis complete!")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Find traffic signals at two-lane road intersections")
+    parser.add_argument(
+        "--changes",
+        nargs="+",
+        metavar="OSC",
+        help="Update the last run from osmChange files (.osc, .osc.gz, .osc.bz2), oldest first",
+    )
+    args = parser.parse_args()
+    main(change_files=args.changes)
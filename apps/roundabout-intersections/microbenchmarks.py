@@ -0,0 +1,295 @@
+"""
+Microbenchmarks of the hot per-chunk functions on synthetic OSM data.
+
+Usage:
+    python microbenchmarks.py --json micro.json
+    python microbenchmarks.py --sizes 100 1000 --functions is_two_lane_road create_buffer
+    python microbenchmarks.py --json new.json --compare micro.json
+
+Each function runs on synthetic_osm fixtures of every size (number of ways
+and signals). Throughput is the best of --repeat timed runs, in items per
+second; fast cases are called repeatedly per run to stay above timer
+noise. Peak memory comes from one extra run under tracemalloc, so it counts
+Python and NumPy allocations but not GEOS or PROJ internals. --compare exits
+with status 1 when a function got slower than a previous report by more than
+--tolerance.
+"""
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import shapely
+import config
+import synthetic_osm
+from geometry_utils import break_bbox_into_chunks, create_buffer
+from landuse_analysis import analyze_buffer_landuse, create_landuse_geodataframe
+from traffic_signal_filter import filter_traffic_signals_by_spatial_query
+from two_lane_filter import filter_two_lane_roads, is_two_lane_road
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+# Minimum duration of a timed run
+MIN_RUN_SECONDS = 0.2
+
+# analyze_buffer_landuse runs on this many buffers at every landuse size
+LANDUSE_BUFFERS = 50
+
+# Packages whose versions are stored with a report
+REPORTED_PACKAGES = ["numpy", "shapely", "geopandas", "pyproj", "overpy"]
+
+# A benchmark case: the function to time and the number of items it processes
+Case = Tuple[Callable[[], Any], int]
+
+
+class Fixtures:
+    """Synthetic results built once per size and shared by the benchmarks."""
+
+    def __init__(self):
+        self._roads: Dict[int, Any] = {}
+        self._landuse: Dict[int, Any] = {}
+
+    def roads(self, size: int):
+        """Roads and signals results with `size` ways and signals."""
+        if size not in self._roads:
+            self._roads[size] = synthetic_osm.road_network(size, size)
+        return self._roads[size]
+
+    def landuse(self, size: int):
+        """Landuse result with `size` ways and its GeoDataFrame."""
+        if size not in self._landuse:
+            result = synthetic_osm.landuse_areas(size)
+            self._landuse[size] = (result, create_landuse_geodataframe(result))
+        return self._landuse[size]
+
+    def clear(self):
+        """Drop every fixture."""
+        self._roads.clear()
+        self._landuse.clear()
+
+
+def _two_lane_case(fixtures: Fixtures, size: int) -> Case:
+    roads, _ = fixtures.roads(size)
+    ways = roads.ways
+    return (lambda: [is_two_lane_road(way) for way in ways]), len(ways)
+
+
+def _signal_filter_case(fixtures: Fixtures, size: int) -> Case:
+    roads, signals = fixtures.roads(size)
+    two_lane_roads = filter_two_lane_roads(roads)
+    return (
+        lambda: filter_traffic_signals_by_spatial_query(
+            signals, two_lane_roads, config.SIGNAL_BUFFER_RADIUS_METERS, config.MIN_ROAD_INTERSECTIONS
+        ),
+        len(signals.nodes),
+    )
+
+
+def _buffer_case(fixtures: Fixtures, size: int) -> Case:
+    _, signals = fixtures.roads(size)
+    points = [shapely.Point(float(node.lon), float(node.lat)) for node in signals.nodes]
+    return (lambda: [create_buffer(point) for point in points]), len(points)
+
+
+def _chunking_case(fixtures: Fixtures, size: int) -> Case:
+    # A square bbox of about `size` chunks of CHUNK_SIZE_MILES
+    side_meters = np.sqrt(size) * config.CHUNK_SIZE_MILES * 1609.34
+    min_lon, min_lat = config.PHOENIX_BBOX[:2]
+    bbox = [min_lon, min_lat, min_lon + side_meters / 93000, min_lat + side_meters / 111000]
+    chunks = len(break_bbox_into_chunks(bbox, config.CHUNK_SIZE_MILES))
+    return (lambda: break_bbox_into_chunks(bbox, config.CHUNK_SIZE_MILES)), chunks
+
+
+def _landuse_gdf_case(fixtures: Fixtures, size: int) -> Case:
+    result, landuse_gdf = fixtures.landuse(size)
+    return (lambda: create_landuse_geodataframe(result)), len(landuse_gdf)
+
+
+def _buffer_landuse_case(fixtures: Fixtures, size: int) -> Case:
+    _, landuse_gdf = fixtures.landuse(size)
+    min_lon, min_lat, max_lon, max_lat = synthetic_osm.landuse_extent(size)
+    rng = np.random.default_rng(0)
+    lons = rng.uniform(min_lon, max_lon, LANDUSE_BUFFERS)
+    lats = rng.uniform(min_lat, max_lat, LANDUSE_BUFFERS)
+    buffers = [create_buffer(shapely.Point(lon, lat)) for lon, lat in zip(lons, lats)]
+    return (lambda: [analyze_buffer_landuse(buffer, landuse_gdf) for buffer in buffers]), len(buffers)
+
+
+# Benchmarked functions: name -> (case builder, unit of the items)
+BENCHMARKS: Dict[str, Tuple[Callable[[Fixtures, int], Case], str]] = {
+    "is_two_lane_road": (_two_lane_case, "ways"),
+    "filter_traffic_signals_by_spatial_query": (_signal_filter_case, "signals"),
+    "create_buffer": (_buffer_case, "points"),
+    "break_bbox_into_chunks": (_chunking_case, "chunks"),
+    "create_landuse_geodataframe": (_landuse_gdf_case, "features"),
+    "analyze_buffer_landuse": (_buffer_landuse_case, "buffers"),
+}
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    Time a function and measure its peak memory.
+
+    A warm-up call sizes the timed runs: fast functions are called several
+    times per run so each run takes at least MIN_RUN_SECONDS.
+
+    Args:
+        func: Function to benchmark
+        repeat: Number of timed runs
+
+    Returns:
+        Dictionary with the min and median seconds per call of the timed
+        runs, the calls per run, and the peak traced memory in bytes
+    """
+    started = time.perf_counter()
+    func()
+    warm_up = time.perf_counter() - started
+    calls = max(1, math.ceil(MIN_RUN_SECONDS / max(warm_up, 1e-9)))
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            func()
+        times.append((time.perf_counter() - started) / calls)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds_min": min(times),
+        "seconds_median": statistics.median(times),
+        "calls_per_run": calls,
+        "peak_memory_bytes": peak,
+    }
+
+
+def run_benchmarks(functions: List[str], sizes: List[int], repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Run benchmarks for every function and size.
+
+    Args:
+        functions: Names from BENCHMARKS
+        sizes: Fixture sizes
+        repeat: Number of timed runs per case
+
+    Returns:
+        List of result dictionaries with function, size, items, unit,
+        seconds_min, seconds_median, calls_per_run, items_per_second and
+        peak_memory_bytes
+    """
+    results = []
+    for size in sizes:
+        fixtures = Fixtures()
+        for name in functions:
+            build_case, unit = BENCHMARKS[name]
+            func, items = build_case(fixtures, size)
+            stats = measure(func, repeat)
+            seconds = stats["seconds_min"]
+            result = {
+                "function": name,
+                "size": size,
+                "items": items,
+                "unit": unit,
+                **stats,
+                "items_per_second": items / seconds if seconds > 0 else None,
+            }
+            results.append(result)
+            print(
+                f"{name:<42}{size:>8}{items:>8} {unit:<9}"
+                f"{result['items_per_second'] or 0:>14,.0f}/s{stats['peak_memory_bytes'] / 1024**2:>10.1f} MB",
+                flush=True,
+            )
+        fixtures.clear()
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the interpreter and package versions a report was made with."""
+    versions = {}
+    for package in REPORTED_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": versions,
+    }
+
+
+def compare_reports(current: List[Dict[str, Any]], previous: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    Compare two reports case by case and print the throughput and memory ratios.
+
+    Args:
+        current: Results of this run
+        previous: Results of an earlier report
+        tolerance: Allowed relative throughput loss before a case counts as a regression
+
+    Returns:
+        Labels of the regressed cases, as "function[size]"
+    """
+    earlier = {(result["function"], result["size"]): result for result in previous}
+    regressions = []
+    print(f"\n{'function':<42}{'size':>8}{'speed':>10}{'memory':>10}")
+    for result in current:
+        before = earlier.get((result["function"], result["size"]))
+        if before is None or not before["items_per_second"] or not result["items_per_second"]:
+            continue
+        speed = result["items_per_second"] / before["items_per_second"]
+        memory = result["peak_memory_bytes"] / max(before["peak_memory_bytes"], 1)
+        regressed = speed < 1 - tolerance
+        print(
+            f"{result['function']:<42}{result['size']:>8}{speed:>9.2f}x{memory:>9.2f}x"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+        if regressed:
+            regressions.append(f"{result['function']}[{result['size']}]")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Fixture sizes")
+    parser.add_argument("--functions", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case")
+    parser.add_argument("--json", type=Path, help="Write the report as JSON")
+    parser.add_argument("--label", help="Name stored with the report, e.g. a version or commit")
+    parser.add_argument("--compare", type=Path, help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput loss (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    print(f"{'function':<42}{'size':>8}{'items':>8} {'unit':<9}{'throughput':>16}{'peak':>13}")
+    results = run_benchmarks(args.functions, args.sizes, args.repeat)
+    report = {"label": args.label, "environment": environment(), "repeat": args.repeat, "results": results}
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, indent=2))
+
+    if args.compare is not None:
+        previous = json.loads(args.compare.read_text())
+        regressions = compare_reports(results, previous["results"], args.tolerance)
+        if regressions:
+            print(f"Slower than {args.compare}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Chunks affected by OSM changes, for incremental updates of a finished run.
+
+Reads osmChange files (.osc, optionally .gz or .bz2 compressed, such as
+weekly replication diffs) and finds the chunks of the last run whose results
+can change:
+- chunks whose stored results contain a changed or deleted traffic signal
+- chunks whose two-lane roads include a changed or deleted way
+- chunks near the new location of a created or modified traffic signal
+- chunks near the new geometry of a created or modified way with a highway
+  or lanes tag
+New way geometries use the node coordinates in the change files and fetch
+the other nodes from the data source (Overpass only; with a local extract
+those ways are located through the stored results alone). Moving an
+untagged node of an unchanged road is not detected.
+"""
+
+import logging
+import math
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+from typing import Dict, List, Sequence, Set, Tuple
+import numpy as np
+import shapely
+from shapely import STRtree
+import config
+import run_manifest
+from chunk_store import ChunkStoreBuilder
+from osm_extract import ExtractSource, open_osm_xml
+from overpass_queries import MissingNodesError
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("create", "modify", "delete")
+
+# Meters per degree of latitude
+_METERS_PER_DEGREE = 111_320
+
+
+def _is_road_change(tags: Dict[str, str]) -> bool:
+    """Check whether a way version can affect which roads count at a signal."""
+    return "highway" in tags or any(key == "lanes" or key.startswith("lanes:") for key in tags)
+
+
+class OsmChanges:
+    """Pipeline-relevant changes of one or more osmChange files, later files winning."""
+
+    def __init__(self):
+        # New coordinates of created and modified nodes
+        self.node_coordinates: Dict[int, Tuple[float, float]] = {}
+        # Created or modified traffic signals
+        self.signal_node_ids: Set[int] = set()
+        # Every modified or deleted node and way, matched against the last run's results
+        self.changed_node_ids: Set[int] = set()
+        self.changed_way_ids: Set[int] = set()
+        # New node lists of created or modified highway/lanes ways
+        self.road_ways: Dict[int, Tuple[List[int], Dict[str, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.changed_node_ids | self.signal_node_ids) + len(self.changed_way_ids | set(self.road_ways))
+
+    def add_node(self, action: str, node_id: int, lon: float, lat: float, tags: Dict[str, str]):
+        """
+        Record a node change.
+
+        Args:
+            action: "create", "modify" or "delete"
+            node_id: OSM node id
+            lon: New longitude (NaN for deletions without coordinates)
+            lat: New latitude
+            tags: New tags
+        """
+        if action != "create":
+            self.changed_node_ids.add(node_id)
+        if action == "delete" or math.isnan(lon):
+            self.node_coordinates.pop(node_id, None)
+            self.signal_node_ids.discard(node_id)
+            return
+
+        self.node_coordinates[node_id] = (lon, lat)
+        if tags.get("highway") == "traffic_signals":
+            self.signal_node_ids.add(node_id)
+        else:
+            self.signal_node_ids.discard(node_id)
+
+    def add_way(self, action: str, way_id: int, node_ids: List[int], tags: Dict[str, str]):
+        """
+        Record a way change.
+
+        Args:
+            action: "create", "modify" or "delete"
+            way_id: OSM way id
+            node_ids: New node ids of the way
+            tags: New tags
+        """
+        if action != "create":
+            self.changed_way_ids.add(way_id)
+        if action != "delete" and _is_road_change(tags):
+            self.road_ways[way_id] = (node_ids, tags)
+        else:
+            self.road_ways.pop(way_id, None)
+
+
+def read_changes(paths: Sequence[str]) -> OsmChanges:
+    """
+    Read osmChange files in order.
+
+    Relation changes are ignored: the pipeline uses relations only for
+    landuse, which does not affect the intersection results.
+
+    Args:
+        paths: Paths of .osc files, optionally .gz or .bz2 compressed, oldest first
+
+    Returns:
+        OsmChanges with the combined changes
+    """
+    changes = OsmChanges()
+    for path in paths:
+        with open_osm_xml(Path(path)) as source:
+            action = None
+            events = ElementTree.iterparse(source, events=("start", "end"))
+            _, root = next(events)
+            for event, element in events:
+                if element.tag in ACTIONS:
+                    action = element.tag if event == "start" else None
+                    continue
+                if event != "end" or action is None or element.tag not in ("node", "way"):
+                    continue
+
+                tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+                element_id = int(element.get("id"))
+                if element.tag == "node":
+                    lon = float(element.get("lon", "nan"))
+                    lat = float(element.get("lat", "nan"))
+                    changes.add_node(action, element_id, lon, lat, tags)
+                else:
+                    node_ids = [int(nd.get("ref")) for nd in element.iter("nd")]
+                    changes.add_way(action, element_id, node_ids, tags)
+                # Drop parsed elements so memory stays flat
+                root.clear()
+    return changes
+
+
+def changed_geometries(changes: OsmChanges, data_source) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Locate the new traffic signals and road geometries of the changes.
+
+    Args:
+        changes: Changes read by read_changes()
+        data_source: Overpass client used to fetch way nodes missing from the
+            changes; ExtractSource instances are not asked
+
+    Returns:
+        Tuple of (signal points, road linestrings) as shapely geometry arrays
+    """
+    coordinates = [changes.node_coordinates[node_id] for node_id in sorted(changes.signal_node_ids)]
+    # Change sets without new signals are common, and shapely needs a (0, 2) array for them
+    signal_points = shapely.points(np.asarray(coordinates, dtype=np.float64).reshape(-1, 2))
+    if not changes.road_ways:
+        return signal_points, np.empty(0, dtype=object)
+
+    builder = ChunkStoreBuilder()
+    needed = {node_id for node_ids, _ in changes.road_ways.values() for node_id in node_ids}
+    for node_id in sorted(needed & changes.node_coordinates.keys()):
+        lon, lat = changes.node_coordinates[node_id]
+        builder.add_node(node_id, lon, lat, {})
+    for way_id, (node_ids, tags) in sorted(changes.road_ways.items()):
+        builder.add_way(way_id, node_ids, tags)
+    store = builder.build()
+
+    if not isinstance(data_source, ExtractSource):
+        try:
+            store = data_source.resolve_missing_store_nodes(store)
+        except MissingNodesError as e:
+            logger.warning(f"Could not fetch the nodes of changed roads: {e}")
+
+    way_rows, offsets, lons, lats = store.way_coordinates(np.arange(store.num_ways))
+    if len(way_rows) < store.num_ways:
+        logger.warning(
+            f"{store.num_ways - len(way_rows)} changed roads could not be located and are matched "
+            "through the last run's results only"
+        )
+    roads = shapely.linestrings(lons, lats, indices=np.repeat(np.arange(len(way_rows)), np.diff(offsets)))
+    return signal_points, np.asarray(roads, dtype=object).reshape(-1)
+
+
+def touched_chunks(
+    changes: OsmChanges,
+    chunks: List[Tuple[str, List[float]]],
+    manifest: run_manifest.RunManifest,
+    data_source,
+) -> List[str]:
+    """
+    Find the chunks whose results the changes can affect.
+
+    Roads are padded by SIGNAL_BUFFER_RADIUS_METERS, since they count for
+    signals in neighbouring chunks too.
+
+    Args:
+        changes: Changes read by read_changes()
+        chunks: (chunk key, bbox) tuples of the last run's layout
+        manifest: Run manifest with the last run's results and roads
+        data_source: Overpass client or extract, see changed_geometries()
+
+    Returns:
+        Keys of the touched chunks, in layout order
+    """
+    touched = manifest.chunks_with_features(changes.changed_node_ids)
+    touched |= manifest.chunks_with_roads(changes.changed_way_ids)
+
+    signal_points, roads = changed_geometries(changes, data_source)
+    if len(chunks) and (len(signal_points) or len(roads)):
+        boxes = shapely.box(*np.asarray([bbox for _, bbox in chunks], dtype=np.float64).T)
+        tree = STRtree(boxes)
+
+        # Pad by the radius in degrees of longitude, the wider of the two away from the equator
+        bounds = shapely.bounds(roads).reshape(-1, 4)
+        max_lat = np.abs(bounds[:, [1, 3]]).max(axis=1, initial=0.0)
+        pad = config.SIGNAL_BUFFER_RADIUS_METERS / (_METERS_PER_DEGREE * np.cos(np.radians(np.minimum(max_lat, 89.0))))
+        padded = shapely.buffer(roads, pad) if len(roads) else roads
+        areas = np.concatenate([signal_points, np.asarray(padded, dtype=object).reshape(-1)])
+        _, chunk_rows = tree.query(areas, predicate="intersects")
+        touched |= {chunks[row][0] for row in np.unique(chunk_rows)}
+
+    return [key for key, _ in chunks if key in touched]
@@ -0,0 +1,464 @@
+"""
+Local OSM extracts (.osm.pbf / .osm.xml) as an alternative to the Overpass API.
+
+The extract is read once in a single streaming pass. Only the elements the
+pipeline uses are kept, in one ChunkStore:
+- roads (TWO_LANE_ROAD_TAGS highway values)
+- traffic signal nodes
+- landuse ways and relations (LANDUSE_TAGS), with the member ways of the relations
+- the nodes of all kept ways
+Chunks are then cut out of that store with the same selection rules as the
+Overpass queries: a way belongs to a bbox when one of its segments intersects
+it, a relation when one of its member ways does, and ways come with all their
+nodes. OsmExtract answers the chunk queries of OverpassQueries, so main.py
+can use either as its data source.
+
+.osm, .osm.xml (optionally .gz or .bz2 compressed) files are parsed with the
+standard library. .pbf files need the optional `osmium` package.
+"""
+
+import bz2
+import gzip
+import logging
+import xml.etree.ElementTree as ElementTree
+from abc import ABC, abstractmethod
+from array import array
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Sequence, Tuple
+import numpy as np
+import overpy
+import shapely
+from shapely import STRtree
+import config
+from chunk_store import MEMBER_WAY, MISSING, ChunkStore, ChunkStoreBuilder, csr_take
+from overpass_json import keep_pipeline_tag
+from overpass_queries import split_roads_and_signals
+from stage_timings import stage
+
+logger = logging.getLogger(__name__)
+
+_COMPRESSED_OPENERS = {".gz": gzip.open, ".bz2": bz2.open}
+_PBF_MEMBER_TYPES = {"n": "node", "w": "way", "r": "relation"}
+_NO_ROWS = np.empty(0, dtype=np.int64)
+
+
+def _pipeline_tags(tags: Dict[str, str]) -> Dict[str, str]:
+    """Keep only the tags stored by the pipeline."""
+    return {key: value for key, value in tags.items() if keep_pipeline_tag(key)}
+
+
+class _ExtractCollector:
+    """Receives the elements of an extract in file order and keeps the ones the pipeline uses."""
+
+    def __init__(self, road_highways: Sequence[str], landuse_types: Sequence[str]):
+        self.road_highways = set(road_highways)
+        self.landuse_types = set(landuse_types)
+        self.builder = ChunkStoreBuilder()
+
+        # Coordinates of every node; which ones are needed is only known after the ways
+        self.node_ids = array("q")
+        self.node_lons = array("d")
+        self.node_lats = array("d")
+
+        # Untagged ways, kept until the relations show which are landuse members
+        self.other_way_ids = array("q")
+        self.other_way_offsets = array("q", [0])
+        self.other_way_node_ids = array("q")
+        self.member_way_ids = set()
+
+    def add_node(self, node_id: int, lon: float, lat: float, tags: Dict[str, str]):
+        self.node_ids.append(node_id)
+        self.node_lons.append(lon)
+        self.node_lats.append(lat)
+        if tags.get("highway") == "traffic_signals":
+            self.builder.add_node(node_id, lon, lat, _pipeline_tags(tags))
+
+    def add_way(self, way_id: int, node_ids: List[int], tags: Dict[str, str]):
+        if tags.get("highway") in self.road_highways or tags.get("landuse") in self.landuse_types:
+            self.builder.add_way(way_id, node_ids, _pipeline_tags(tags))
+        else:
+            self.other_way_ids.append(way_id)
+            self.other_way_node_ids.extend(node_ids)
+            self.other_way_offsets.append(len(self.other_way_node_ids))
+
+    def add_relation(self, relation_id: int, members: List[Tuple[str, int, str]], tags: Dict[str, str]):
+        if tags.get("landuse") not in self.landuse_types:
+            return
+        self.builder.add_relation(relation_id, members, _pipeline_tags(tags))
+        self.member_way_ids.update(ref for member_type, ref, _ in members if member_type == "way")
+
+    def build(self) -> ChunkStore:
+        """Build the store of kept elements and the nodes they reference."""
+        # Add the relation member ways that were not kept for their own tags
+        other_ids = np.frombuffer(self.other_way_ids, dtype=np.int64)
+        other_offsets = np.frombuffer(self.other_way_offsets, dtype=np.int64)
+        other_node_ids = np.frombuffer(self.other_way_node_ids, dtype=np.int64)
+        wanted = np.fromiter(self.member_way_ids, dtype=np.int64, count=len(self.member_way_ids))
+        for row in np.flatnonzero(np.isin(other_ids, wanted)):
+            start, end = other_offsets[row], other_offsets[row + 1]
+            self.builder.add_way(int(other_ids[row]), other_node_ids[start:end].tolist(), {})
+        elements = self.builder.build()
+
+        # Keep the coordinates of the nodes the ways reference
+        node_ids = np.frombuffer(self.node_ids, dtype=np.int64)
+        needed = np.isin(node_ids, elements.way_node_ids)
+        nodes = ChunkStore.from_nodes(
+            node_ids[needed],
+            np.frombuffer(self.node_lons, dtype=np.float64)[needed],
+            np.frombuffer(self.node_lats, dtype=np.float64)[needed],
+        )
+        # Signal nodes come first, so their tagged copies are kept
+        return ChunkStore.concat([elements, nodes])
+
+
+def open_osm_xml(path: Path) -> BinaryIO:
+    """Open an OSM XML file (extract or osmChange), decompressing .gz and .bz2 files."""
+    opener = _COMPRESSED_OPENERS.get(path.suffix, open)
+    return opener(path, "rb")
+
+
+def _read_xml(path: Path, collector: _ExtractCollector):
+    """Stream the elements of an .osm XML file into a collector."""
+    with open_osm_xml(path) as source:
+        events = ElementTree.iterparse(source, events=("start", "end"))
+        _, root = next(events)
+        for event, element in events:
+            if event != "end" or element.tag not in ("node", "way", "relation"):
+                continue
+
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            element_id = int(element.get("id"))
+            if element.tag == "node":
+                collector.add_node(element_id, float(element.get("lon")), float(element.get("lat")), tags)
+            elif element.tag == "way":
+                node_ids = [int(nd.get("ref")) for nd in element.iter("nd")]
+                collector.add_way(element_id, node_ids, tags)
+            else:
+                members = [
+                    (member.get("type"), int(member.get("ref")), member.get("role", ""))
+                    for member in element.iter("member")
+                ]
+                collector.add_relation(element_id, members, tags)
+            # Drop parsed elements so memory stays flat
+            root.clear()
+
+
+def _read_pbf(path: Path, collector: _ExtractCollector):
+    """Stream the elements of an .osm.pbf file into a collector."""
+    try:
+        import osmium
+    except ImportError as e:
+        raise ImportError(f"Reading {path} requires the osmium package (pip install osmium)") from e
+
+    class Handler(osmium.SimpleHandler):
+        def node(self, node):
+            if node.location.valid():
+                tags = {tag.k: tag.v for tag in node.tags} if len(node.tags) else {}
+                collector.add_node(node.id, node.location.lon, node.location.lat, tags)
+
+        def way(self, way):
+            tags = {tag.k: tag.v for tag in way.tags}
+            collector.add_way(way.id, [node.ref for node in way.nodes], tags)
+
+        def relation(self, relation):
+            tags = {tag.k: tag.v for tag in relation.tags}
+            if tags.get("landuse") in collector.landuse_types:
+                members = [
+                    (_PBF_MEMBER_TYPES[member.type], member.ref, member.role) for member in relation.members
+                ]
+                collector.add_relation(relation.id, members, tags)
+
+    Handler().apply_file(str(path))
+
+
+def load_extract(
+    path: str,
+    road_highways: Sequence[str] = tuple(config.TWO_LANE_ROAD_TAGS["highway"]),
+    landuse_types: Sequence[str] = tuple(config.LANDUSE_TAGS),
+) -> ChunkStore:
+    """
+    Read the roads, traffic signals and landuse of an OSM extract in one pass.
+
+    Args:
+        path: Path of an .osm.pbf, .osm or .osm.xml file (XML may be .gz or .bz2)
+        road_highways: Highway values of the roads to keep
+        landuse_types: Landuse values of the ways and relations to keep
+
+    Returns:
+        ChunkStore with the kept elements and their nodes
+
+    Raises:
+        ImportError: For .pbf files if osmium is not installed
+        ValueError: If the file type is not supported
+    """
+    path = Path(path)
+    suffixes = "".join(path.suffixes).lower()
+    collector = _ExtractCollector(road_highways, landuse_types)
+    if suffixes.endswith(".pbf"):
+        _read_pbf(path, collector)
+    elif any(suffixes.endswith(ext + comp) for ext in (".osm", ".xml") for comp in ("", ".gz", ".bz2")):
+        _read_xml(path, collector)
+    else:
+        raise ValueError(f"Unsupported OSM extract format: {path.name}")
+    return collector.build()
+
+
+def road_way_mask(store: ChunkStore) -> np.ndarray:
+    """
+    Select the roads of a store, as the Overpass road queries do.
+
+    Args:
+        store: Chunk store
+
+    Returns:
+        Boolean mask over the ways with a TWO_LANE_ROAD_TAGS highway value
+    """
+    mask = np.zeros(store.num_ways, dtype=bool)
+    for highway in config.TWO_LANE_ROAD_TAGS["highway"]:
+        mask |= store.way_tags.equals("highway", highway)
+    return mask
+
+
+def landuse_way_mask(store: ChunkStore) -> np.ndarray:
+    """
+    Select the landuse ways of a store, as the Overpass landuse query does.
+
+    Args:
+        store: Chunk store
+
+    Returns:
+        Boolean mask over the ways with a LANDUSE_TAGS landuse value
+    """
+    mask = np.zeros(store.num_ways, dtype=bool)
+    for landuse in config.LANDUSE_TAGS:
+        mask |= store.way_tags.equals("landuse", landuse)
+    return mask
+
+
+class ExtractSource(ABC):
+    """
+    Chunk queries of OverpassQueries answered from local OSM data.
+
+    Subclasses find the rows of the selected elements and cut chunk stores
+    out of their data; the query methods are shared.
+    """
+
+    @abstractmethod
+    def _roads_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        """Rows of the roads with a segment in the bbox."""
+
+    @abstractmethod
+    def _signals_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        """Rows of the traffic signal nodes in the bbox."""
+
+    @abstractmethod
+    def _landuse_in_bbox(self, bbox: List[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the landuse ways and of the landuse relations with a member way in the bbox."""
+
+    @abstractmethod
+    def _view(self, way_rows: np.ndarray, relation_rows: np.ndarray, node_rows: np.ndarray) -> ChunkStore:
+        """
+        Cut a chunk store out of the data, adding member ways and way nodes as `>` does.
+
+        Args:
+            way_rows: Selected ways
+            relation_rows: Selected relations
+            node_rows: Selected nodes besides the nodes of the ways
+
+        Returns:
+            ChunkStore with the selection
+        """
+
+    def take_bytes_received(self) -> int:
+        """Nothing is downloaded; kept for compatibility with OverpassQueries."""
+        return 0
+
+    def query_all_roads_store(self, bbox: List[float]) -> ChunkStore:
+        """
+        Select all roads and their nodes in the bounding box.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            ChunkStore with road ways and their nodes
+        """
+        return self._view(self._roads_in_bbox(bbox), _NO_ROWS, _NO_ROWS)
+
+    def query_traffic_signals_store(self, bbox: List[float]) -> ChunkStore:
+        """
+        Select all traffic signal nodes in the bounding box.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            ChunkStore with traffic signal nodes
+        """
+        return self._view(_NO_ROWS, _NO_ROWS, self._signals_in_bbox(bbox))
+
+    def query_roads_and_signals_store(self, bbox: List[float]) -> ChunkStore:
+        """
+        Select roads, their nodes and traffic signal nodes in the bounding box.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            ChunkStore with road ways, road nodes and traffic signal nodes
+        """
+        return self._view(self._roads_in_bbox(bbox), _NO_ROWS, self._signals_in_bbox(bbox))
+
+    def query_landuse_store(self, bbox: List[float]) -> ChunkStore:
+        """
+        Select landuse ways and relations in the bounding box.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            ChunkStore with landuse ways, relations, their member ways and nodes
+        """
+        way_rows, relation_rows = self._landuse_in_bbox(bbox)
+        return self._view(way_rows, relation_rows, _NO_ROWS)
+
+    def count_chunk_elements(self, bbox: List[float], timeout: int = 60) -> int:
+        """
+        Count the roads, road nodes and traffic signals in a bounding box.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+            timeout: Unused; kept for compatibility with OverpassQueries
+
+        Returns:
+            Total number of elements query_roads_and_signals_store() would return
+        """
+        store = self.query_roads_and_signals_store(bbox)
+        return store.num_nodes + store.num_ways
+
+    def query_all_roads(self, bbox: List[float]) -> overpy.Result:
+        """
+        Select all roads in the bounding box.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            overpy result with ways (roads) and nodes
+        """
+        return self.query_all_roads_store(bbox).to_overpy()
+
+    def query_traffic_signals(self, bbox: List[float]) -> overpy.Result:
+        """
+        Select all traffic signal nodes in the bounding box.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            overpy result with nodes (traffic signals)
+        """
+        return self.query_traffic_signals_store(bbox).to_overpy()
+
+    def query_roads_and_signals(self, bbox: List[float]) -> Tuple[overpy.Result, overpy.Result]:
+        """
+        Select roads, their nodes and traffic signal nodes in the bounding box.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            Tuple of (roads result with ways and nodes, traffic signals result with nodes)
+        """
+        return split_roads_and_signals(self.query_roads_and_signals_store(bbox).to_overpy(), bbox)
+
+    def query_landuse(self, bbox: List[float]) -> overpy.Result:
+        """
+        Select all landuse polygons in the bounding box.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            overpy result with landuse ways, relations and their nodes
+        """
+        return self.query_landuse_store(bbox).to_overpy()
+
+
+class OsmExtract(ExtractSource):
+    """Serve the chunk queries of OverpassQueries from a local OSM extract held in memory."""
+
+    def __init__(self, path: str):
+        """
+        Load and index the extract.
+
+        Args:
+            path: Path of an .osm.pbf, .osm or .osm.xml file
+        """
+        self.path = Path(path)
+        logger.info(f"Loading OSM extract {self.path}...")
+        with stage("load_extract"):
+            self.store = load_extract(str(self.path))
+        store = self.store
+        logger.info(
+            f"Loaded {store.num_nodes} nodes, {store.num_ways} ways and "
+            f"{store.num_relations} relations ({store.nbytes / 1024**2:.1f} MB)"
+        )
+
+        self._road_ways = road_way_mask(store)
+        self._landuse_ways = landuse_way_mask(store)
+        self._signal_nodes = store.node_tags.equals("highway", "traffic_signals")
+
+        # Spatial index over the segments of every way
+        way_rows, offsets, lons, lats = store.way_coordinates(np.arange(store.num_ways))
+        lines = shapely.linestrings(lons, lats, indices=np.repeat(np.arange(len(way_rows)), np.diff(offsets)))
+        self._tree_ways = way_rows
+        self._way_tree = STRtree(lines)
+
+        # Relation member ways, as (relation row, way row) pairs
+        member_rows = np.repeat(np.arange(store.num_relations), np.diff(store.relation_member_offsets))
+        is_way = store.relation_member_types == MEMBER_WAY
+        member_ways = store.way_index(store.relation_member_refs[is_way])
+        found = member_ways != MISSING
+        self._member_relations = member_rows[is_way][found]
+        self._member_ways = member_ways[found]
+
+    def _ways_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        """Rows of all ways with a segment in the bbox."""
+        return np.sort(self._tree_ways[self._way_tree.query(shapely.box(*bbox), predicate="intersects")])
+
+    def _roads_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        hits = self._ways_in_bbox(bbox)
+        return hits[self._road_ways[hits]]
+
+    def _signals_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        return np.flatnonzero(self._signal_nodes & self.store.nodes_in_bbox(bbox))
+
+    def _landuse_in_bbox(self, bbox: List[float]) -> Tuple[np.ndarray, np.ndarray]:
+        hits = self._ways_in_bbox(bbox)
+        relation_rows = np.unique(self._member_relations[np.isin(self._member_ways, hits)])
+        return hits[self._landuse_ways[hits]], relation_rows
+
+    def _view(self, way_rows: np.ndarray, relation_rows: np.ndarray, node_rows: np.ndarray) -> ChunkStore:
+        store = self.store
+        member_ways = self._member_ways[np.isin(self._member_relations, relation_rows)]
+        way_rows = np.union1d(way_rows, member_ways).astype(np.int64)
+        _, positions = csr_take(store.way_node_offsets, way_rows)
+        way_nodes = store.way_node_index[positions]
+        node_rows = np.union1d(node_rows, way_nodes[way_nodes != MISSING]).astype(np.int64)
+        return store.take(node_rows, way_rows, relation_rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the size of the loaded extract.
+
+        Returns:
+            Dictionary with path, nodes, ways, relations and bytes
+        """
+        return {
+            "path": str(self.path),
+            "nodes": self.store.num_nodes,
+            "ways": self.store.num_ways,
+            "relations": self.store.num_relations,
+            "bytes": self.store.nbytes,
+        }
@@ -0,0 +1,197 @@
+"""
+Streaming parser for Overpass `[out:json]` responses.
+
+Decodes the "elements" array one element at a time and feeds each element
+straight into a ChunkStoreBuilder, keeping only the tags the pipeline uses.
+Inline `out geom` coordinates of ways and relation members are stored with
+the ways, so no node lookups are needed to build their geometries.
+No overpy objects or Decimal coordinates are created. The raw body is
+decoded to text in bounded windows, so besides the body itself only the
+current window and the element being decoded are held in memory.
+"""
+
+import codecs
+import json
+import math
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import overpy
+import config
+from chunk_store import MISSING_NODE_ID, ChunkStore, ChunkStoreBuilder
+
+_ELEMENTS_START = re.compile(r'"elements"\s*:\s*\[')
+_REMARK = re.compile(r'"remark"\s*:\s*')
+_SEPARATORS = " \t\r\n,"
+
+# Bytes of the response decoded to text at a time
+_WINDOW_SIZE = 1 << 20
+
+
+def keep_pipeline_tag(key: str) -> bool:
+    """
+    Check whether a tag is used by the pipeline and should be stored.
+
+    Args:
+        key: Tag key
+
+    Returns:
+        True for the keys and key prefixes listed in config
+    """
+    return key in config.STORE_TAG_KEYS or key.startswith(tuple(config.STORE_TAG_PREFIXES))
+
+
+def _check_remark(remark: str):
+    """
+    Raise the overpy exception for a response remark, as overpy's JSON parser does.
+
+    Args:
+        remark: Remark message of the response
+
+    Raises:
+        overpy.exception.OverpassRuntimeError: For "runtime error:" remarks
+        overpy.exception.OverpassRuntimeRemark: For "runtime remark:" remarks
+        overpy.exception.OverpassUnknownError: For any other remark
+    """
+    remark = remark.strip()
+    if remark.startswith("runtime error:"):
+        raise overpy.exception.OverpassRuntimeError(msg=remark)
+    if remark.startswith("runtime remark:"):
+        raise overpy.exception.OverpassRuntimeRemark(msg=remark)
+    raise overpy.exception.OverpassUnknownError(msg=remark)
+
+
+def _decoded_windows(body: bytes, window_size: int) -> Iterator[str]:
+    """Decode UTF-8 bytes to text window by window, keeping characters split between windows intact."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    view = memoryview(body)
+    for start in range(0, len(view), window_size):
+        yield decoder.decode(view[start:start + window_size])
+    yield decoder.decode(b"", final=True)
+
+
+def iter_elements(body: bytes, window_size: int = _WINDOW_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Decode the elements of an Overpass JSON response one at a time.
+
+    The body is decoded to text one window at a time; the text buffer only
+    holds the current window and the element being decoded. A remark after
+    the elements (e.g. a runtime error) is raised once all elements have been
+    yielded.
+
+    Args:
+        body: Raw response body
+        window_size: Number of bytes decoded to text at a time
+
+    Yields:
+        Element dictionaries
+    """
+    decoder = json.JSONDecoder()
+    windows = _decoded_windows(body, window_size)
+    buffer = ""
+
+    # Find the start of the elements array
+    while True:
+        match = _ELEMENTS_START.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        window = next(windows, None)
+        if window is None:
+            raise overpy.exception.OverpassUnknownError(msg="Response has no elements array")
+        buffer += window
+
+    pos = 0
+    while True:
+        # Skip whitespace and separators between elements
+        while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            break
+
+        try:
+            if pos >= len(buffer):
+                raise ValueError("need more data")
+            element, pos = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            # The element continues in the next window
+            window = next(windows, None)
+            if window is None:
+                raise ValueError("Unexpected end of Overpass response")
+            buffer = buffer[pos:] + window
+            pos = 0
+            continue
+        yield element
+
+    # Only the remark and closing brackets follow the elements
+    tail = buffer[pos:] + "".join(windows)
+    remark = _REMARK.search(tail)
+    if remark is not None:
+        message, _ = decoder.raw_decode(tail, remark.end())
+        _check_remark(message)
+
+
+def parse_json_into_store(
+    body: bytes, keep_tag: Callable[[str], bool] = keep_pipeline_tag
+) -> ChunkStore:
+    """
+    Parse an Overpass JSON response into a chunk store.
+
+    Args:
+        body: Raw response body
+        keep_tag: Predicate selecting the tag keys to store
+
+    Returns:
+        ChunkStore with the response's nodes, ways and relations
+    """
+    builder = ChunkStoreBuilder()
+    way_ids = set()
+    member_geometries = {}
+
+    for element in iter_elements(body):
+        element_type = element.get("type")
+        tags = element.get("tags")
+        if tags:
+            tags = {key: value for key, value in tags.items() if keep_tag(key)}
+        else:
+            tags = {}
+
+        if element_type == "node":
+            builder.add_node(element["id"], element["lon"], element["lat"], tags)
+        elif element_type == "way":
+            way_ids.add(element["id"])
+            lons, lats = _inline_coordinates(element.get("geometry"))
+            builder.add_way(element["id"], element.get("nodes", []), tags, lons, lats)
+        elif element_type == "relation":
+            members = []
+            for member in element.get("members", []):
+                members.append((member["type"], member["ref"], member.get("role", "")))
+                if member["type"] == "way" and member.get("geometry"):
+                    member_geometries.setdefault(member["ref"], member["geometry"])
+            builder.add_relation(element["id"], members, tags)
+
+    # With `out geom`, relation member ways are only present as inline geometry
+    for way_id, geometry in member_geometries.items():
+        if way_id in way_ids:
+            continue
+        lons, lats = _inline_coordinates(geometry)
+        builder.add_way(way_id, [MISSING_NODE_ID] * len(lons), {}, lons, lats)
+
+    return builder.build()
+
+
+def _inline_coordinates(geometry: Optional[List[Optional[Dict[str, float]]]]) -> Tuple[Optional[list], Optional[list]]:
+    """
+    Split an inline `out geom` geometry into longitude and latitude lists.
+
+    Args:
+        geometry: List of {"lat", "lon"} points (None entries for points the
+            server clipped, which the chunk queries avoid), or None
+
+    Returns:
+        Tuple of (longitudes, latitudes) with NaN for clipped points, or (None, None)
+    """
+    if not geometry:
+        return None, None
+    lons = [point["lon"] if point else math.nan for point in geometry]
+    lats = [point["lat"] if point else math.nan for point in geometry]
+    return lons, lats
@@ -2,17 +2,207 @@
 Overpass API query functions for OSM data.
 """
 
+import functools
+import json
 import overpy
-from typing import List, Dict, Any
+import re
+import threading
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.request import urlopen
 import time
 import logging
 import config
+from chunk_store import ChunkStore
+import overpass_json
+import two_lane_filter
+from geometry_utils import split_bbox_into_quadrants
+from endpoint_pool import EndpointPool, Endpoint
+import overpass_status
+from overpass_recording import OverpassRecording, RecordingMissError
+from overpass_status import SlotScheduler
+import stage_timings
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
+_ERROR_MSG_PATTERN = re.compile(rb"<p>(?P<msg><strong\s.*?)</p>")
+_TAG_PATTERN = re.compile(rb"<[^>]*?>")
+_SETTINGS_START = re.compile(r"^(\s*)\[")
+
+
+class OverpassQueryTooLarge(Exception):
+    """Raised when the server rejects a query because its area holds too much data."""
+
+    def __init__(self, query_name: str, error: Exception):
+        super().__init__(f"{query_name} rejected as too large: {error}")
+        self.query_name = query_name
+        self.error = error
+
+
+class OverpassRateLimited(overpy.exception.OverpassTooManyRequests):
+    """429 response, with the wait the server asked for in its Retry-After header."""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__()
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        if self.retry_after is None:
+            return "Too many requests"
+        return f"Too many requests (retry after {self.retry_after:.0f} seconds)"
+
+
+class MissingNodesError(Exception):
+    """Raised in strict mode when a response references nodes it does not contain."""
+
+    def __init__(self, node_ids: List[int]):
+        sample = ", ".join(str(node_id) for node_id in node_ids[:10])
+        super().__init__(f"Response is missing {len(node_ids)} referenced nodes (e.g. {sample})")
+        self.node_ids = node_ids
+
+
+def _extract_error_messages(body: bytes) -> List[str]:
+    """
+    Extract error messages from an Overpass HTML error page.
+
+    Args:
+        body: Raw response body
+
+    Returns:
+        List of error messages
+    """
+    msgs = []
+    for match in _ERROR_MSG_PATTERN.finditer(body):
+        msgs.append(_TAG_PATTERN.sub(b"", match.group("msg")).decode("utf-8", errors="replace"))
+    return msgs
+
+
+def is_server_load_error(error: Exception) -> bool:
+    """
+    Check whether an error means the server is overloaded or rate limiting us.
+
+    Args:
+        error: Exception raised by a query
+
+    Returns:
+        True for 429 responses and rate limit or server load messages
+    """
+    if isinstance(error, overpy.exception.OverpassTooManyRequests):
+        return True
+    error_msg = str(error).lower()
+    return "too many requests" in error_msg or "rate limit" in error_msg or "server load" in error_msg
+
+
+def check_response_status(
+    query: str, status: int, body: bytes, content_type: str, retry_after: Optional[str] = None
+) -> Tuple[bytes, str]:
+    """
+    Map an Overpass HTTP response to its body or to the matching overpy exception.
+
+    Args:
+        query: Overpass QL query string that was sent
+        status: HTTP status code
+        body: Raw response body
+        content_type: Content-Type header value
+        retry_after: Retry-After header value, if any
+
+    Returns:
+        Tuple of (raw response body, content type without parameters)
+
+    Raises:
+        overpy.exception.OverPyException: If the server returned an error status
+    """
+    if status == 200:
+        return body, content_type.split(";")[0].strip()
+    if status == 400:
+        raise overpy.exception.OverpassBadRequest(query, msgs=_extract_error_messages(body))
+    if status == 429:
+        raise OverpassRateLimited(overpass_status.parse_retry_after(retry_after))
+    if status == 504:
+        raise overpy.exception.OverpassGatewayTimeout()
+    raise overpy.exception.OverpassUnknownHTTPStatusCode(status)
+
+
+# The client logic shared by the sync and async clients (retries, bbox splits,
+# endpoint choice, caching, missing nodes) is written as plans: generators that
+# yield the effects below and receive each effect's result. Each client drives
+# plans with its own transport and sleeping: OverpassQueries blocks the calling
+# thread, AsyncOverpassQueries awaits.
+Plan = Generator[Any, Any, Any]
+
+
+class Sleep:
+    """Plan effect: wait for a number of seconds."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+
+class Blocking:
+    """Plan effect: call a function that blocks on disk or the CPU (cache, recording, parsing)."""
+
+    def __init__(self, function: Callable[..., Any], *args: Any):
+        self.function = function
+        self.args = args
+
+
+class Acquire:
+    """Plan effect: take a request slot and rate token; the plan calls release() itself."""
+
+    def __init__(self, rate_limiter: Any):
+        self.rate_limiter = rate_limiter
+
+
+class Send:
+    """Plan effect: send a query to an endpoint, returning (body, content type)."""
+
+    def __init__(self, query: str, url: Optional[str] = None):
+        self.query = query
+        self.url = url
+
+
+def advance(plan: Plan, value: Any = None, error: Optional[Exception] = None) -> Tuple[bool, Any]:
+    """
+    Resume a plan with the result or the exception of its last effect.
+
+    Args:
+        plan: Plan generator
+        value: Result of the last effect (None to start the plan)
+        error: Exception raised by the last effect, thrown into the plan
+
+    Returns:
+        Tuple of (whether the plan finished, its next effect or its return value)
+    """
+    try:
+        return False, plan.throw(error) if error is not None else plan.send(value)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+def driven(plan_method: Callable[..., Plan]) -> Callable[..., Any]:
+    """
+    Expose a plan method as a client method run by the client's _run().
+
+    The method returns the plan's result in the sync client and a coroutine
+    in the async client.
+    """
+
+    @functools.wraps(plan_method)
+    def method(self, *args, **kwargs):
+        return self._run(plan_method(self, *args, **kwargs))
+
+    return method
+
 
 class OverpassQueries:
-    """Handle Overpass API queries for OSM data."""
+    """
+    Handle Overpass API queries for OSM data.
+
+    The query methods are plans (see driven()); _run() performs their effects
+    in the calling thread.
+    """
 
     def __init__(
         self,
@@ -20,6 +210,17 @@ class OverpassQueries:
         max_retries: int = 5,
         initial_delay: float = 5.0,
         max_delay: float = 300.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        max_split_depth: int = config.OVERPASS_MAX_SPLIT_DEPTH,
+        streaming_json: bool = config.STREAMING_JSON_PARSER,
+        inline_geometry: bool = config.INLINE_GEOMETRY,
+        quadtile_order: bool = config.QUADTILE_ORDER,
+        strict_nodes: bool = config.STRICT_NODE_RESOLUTION,
+        node_batch_size: int = config.MISSING_NODE_BATCH_SIZE,
+        endpoints: Optional[EndpointPool] = None,
+        slot_status: bool = config.OVERPASS_SLOT_STATUS,
+        recording: Optional[OverpassRecording] = None,
     ):
         """
         Initialize Overpass API client.
@@ -29,94 +230,721 @@ class OverpassQueries:
             max_retries: Maximum number of retry attempts
             initial_delay: Initial delay in seconds before first retry
             max_delay: Maximum delay in seconds between retries
+            rate_limiter: Optional rate limiter shared by all clients of the endpoint
+            cache: Optional on-disk cache of raw responses
+            max_split_depth: How many times a bbox may be split into quadrants
+                after the server rejects it as too large
+            streaming_json: Request JSON for chunk store queries and parse it
+                incrementally instead of building an overpy result first
+            inline_geometry: Fetch road and landuse coordinates inline with
+                `out geom` (as JSON) instead of recursing down to their nodes
+            quadtile_order: Sort query output by quadtile (`qt`)
+            strict_nodes: Raise MissingNodesError when a response references
+                nodes it does not contain instead of fetching them
+            node_batch_size: Maximum number of missing nodes fetched per request
+            endpoints: Optional pool of endpoints to balance requests over; replaces
+                api_url and rate_limiter, and failed endpoints fail over instead of sleeping
+            slot_status: Start requests when the server's /api/status reports a
+                free slot, and honor Retry-After headers
+            recording: Optional recording that saves every response, or in
+                replay mode answers every query without network access
         """
+        if endpoints is not None:
+            # Mirrors serve the same data, so cached responses are keyed by the first one
+            api_url = endpoints.primary_url
+        self.api_url = api_url
         self.api = overpy.Overpass(url=api_url)
         self.max_retries = max_retries
         self.initial_delay = initial_delay
         self.max_delay = max_delay
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.max_split_depth = max_split_depth
+        self.streaming_json = streaming_json
+        self.inline_geometry = inline_geometry
+        self.quadtile_order = quadtile_order
+        self.strict_nodes = strict_nodes
+        self.node_batch_size = node_batch_size
+        self.endpoints = endpoints
+        self.slot_status = slot_status
+        self.recording = recording
+
+        # Slot schedulers by endpoint URL
+        self._slot_schedulers: Dict[str, SlotScheduler] = {}
+        self._slot_schedulers_lock = threading.Lock()
+
+        # Smallest bbox area (square degrees) rejected as too large, per query name
+        self._rejected_areas: Dict[str, float] = {}
+
+        # Raw response bytes received, counted per thread so concurrent chunks don't mix
+        self._thread_stats = threading.local()
+
+    def take_bytes_received(self) -> int:
+        """
+        Get and reset the raw response bytes received by the calling thread.
 
-    def _query_with_retry(self, query: str, query_name: str = "query") -> overpy.Result:
+        Returns:
+            Number of response bytes (cached or fetched) since the last call
+        """
+        received = getattr(self._thread_stats, "bytes_received", 0)
+        self._thread_stats.bytes_received = 0
+        return received
+
+    def _count_bytes(self, body: bytes):
+        """Add a response body to the calling thread's byte counter."""
+        self._thread_stats.bytes_received = getattr(self._thread_stats, "bytes_received", 0) + len(body)
+
+    def _fetch_raw(self, query: str, url: Optional[str] = None) -> Tuple[bytes, str]:
+        """
+        Send a query to the Overpass API and return the raw response.
+
+        Args:
+            query: Overpass QL query string
+            url: Endpoint URL (defaults to api_url)
+
+        Returns:
+            Tuple of (raw response body, content type)
+
+        Raises:
+            overpy.exception.OverPyException: If the server returns an error status
+        """
+        url = url or self.api_url
+        self._wait_for_slot(url)
+        try:
+            response = urlopen(url, query.encode("utf-8"))
+        except HTTPError as e:
+            response = e
+
+        with response:
+            body = response.read()
+            status = response.code
+            content_type = response.headers.get("Content-Type", "")
+            retry_after = response.headers.get("Retry-After")
+
+        try:
+            response = check_response_status(query, status, body, content_type, retry_after)
+        except OverpassRateLimited as e:
+            self._note_throttled(url, e)
+            raise
+        self._note_accepted(url)
+        return response
+
+    def _slot_scheduler(self, url: str) -> Optional[SlotScheduler]:
+        """Get the slot scheduler of an endpoint, or None if slot scheduling is off."""
+        if not self.slot_status:
+            return None
+        with self._slot_schedulers_lock:
+            if url not in self._slot_schedulers:
+                self._slot_schedulers[url] = SlotScheduler(
+                    overpass_status.status_url_for(url),
+                    poll_interval=config.OVERPASS_STATUS_POLL_SECONDS,
+                    max_status_age=config.OVERPASS_STATUS_MAX_AGE_SECONDS,
+                    backoff_delay=self.initial_delay,
+                    max_backoff_delay=self.max_delay,
+                )
+            return self._slot_schedulers[url]
+
+    def is_replaying(self) -> bool:
+        """Check whether queries are answered from a recording."""
+        return self.recording is not None and self.recording.replaying
+
+    def uses_slot_status(self, url: Optional[str] = None) -> bool:
+        """
+        Check whether requests to an endpoint are paced by its status page.
+
+        Args:
+            url: Endpoint URL (defaults to api_url)
+
+        Returns:
+            True if fixed delays between requests are unnecessary
+        """
+        scheduler = self._slot_scheduler(url or self.api_url)
+        return scheduler is not None and scheduler.enabled
+
+    def _note_throttled(self, url: str, error: Exception):
+        """Tell an endpoint's slot scheduler that a request was rejected for load."""
+        scheduler = self._slot_scheduler(url)
+        if scheduler is not None:
+            scheduler.note_throttled(getattr(error, "retry_after", None))
+
+    def _note_accepted(self, url: str):
+        """Tell an endpoint's slot scheduler that a request was accepted."""
+        scheduler = self._slot_scheduler(url)
+        if scheduler is not None:
+            scheduler.note_success()
+
+    def _wait_for_slot(self, url: str):
+        """
+        Block until the endpoint's status page reports a free query slot.
+
+        Args:
+            url: Endpoint URL
+        """
+        scheduler = self._slot_scheduler(url)
+        if scheduler is None:
+            return
+
+        while True:
+            reserved, wait = scheduler.reserve()
+            if reserved:
+                return
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            try:
+                with urlopen(scheduler.status_url, timeout=config.OVERPASS_STATUS_TIMEOUT_SECONDS) as response:
+                    text = response.read().decode("utf-8", errors="replace")
+                scheduler.update(overpass_status.parse_status(text))
+            except Exception as e:
+                scheduler.disable(e)
+
+    def _parse_response(self, body: bytes, content_type: str) -> overpy.Result:
+        """
+        Parse a raw Overpass response into an overpy result.
+
+        Args:
+            body: Raw response body
+            content_type: Response content type
+
+        Returns:
+            Overpass result
+        """
+        if content_type == "application/json":
+            return self.api.parse_json(body)
+        if content_type == "application/osm3s+xml":
+            return self.api.parse_xml(body)
+        raise overpy.exception.OverpassUnknownContentType(content_type)
+
+    def _parse_store(self, body: bytes, content_type: str) -> ChunkStore:
+        """
+        Parse a raw Overpass response into a compact chunk store.
+
+        JSON responses are decoded element by element straight into the
+        store. Other responses go through overpy, and the intermediate result
+        is dropped as soon as the store is built.
+
+        Args:
+            body: Raw response body
+            content_type: Response content type
+
+        Returns:
+            ChunkStore holding the response's elements
+        """
+        if self.streaming_json and content_type == "application/json":
+            return overpass_json.parse_json_into_store(body)
+        return ChunkStore.from_overpy(self._parse_response(body, content_type))
+
+    def _geometry_query(self, build_query: Callable[..., str]) -> Callable[[List[float]], str]:
+        """
+        Apply the client's output mode to a query builder that outputs ways.
+
+        Inline geometry is only parsed from JSON (overpy's XML parser drops
+        way node coordinates), so inline geometry queries request JSON.
+
+        Args:
+            build_query: Query builder accepting inline_geometry and quadtile_order
+
+        Returns:
+            Function building the query for a bbox
+        """
+        if self.inline_geometry:
+            return with_json_output(
+                functools.partial(build_query, inline_geometry=True, quadtile_order=self.quadtile_order)
+            )
+        if self.quadtile_order:
+            return functools.partial(build_query, quadtile_order=True)
+        return build_query
+
+    def _parse_count(self, body: bytes, content_type: str) -> int:
+        """
+        Parse the response of an `out count;` query.
+
+        Args:
+            body: Raw response body (JSON)
+            content_type: Response content type
+
+        Returns:
+            Total number of elements counted by the server
+        """
+        if content_type != "application/json":
+            raise overpy.exception.OverpassUnknownContentType(content_type)
+
+        data = json.loads(body)
+        remark = data.get("remark", "").strip()
+        if remark.startswith("runtime error:"):
+            raise overpy.exception.OverpassRuntimeError(msg=remark)
+
+        for element in data.get("elements", []):
+            if element.get("type") == "count":
+                return int(element.get("tags", {}).get("total", 0))
+        return 0
+
+    def _run(self, plan: Plan) -> Any:
+        """
+        Drive a plan to completion, performing its effects in the calling thread.
+
+        Args:
+            plan: Generator returned by a plan method
+
+        Returns:
+            The plan's return value
+        """
+        try:
+            finished, step = advance(plan)
+            while not finished:
+                try:
+                    value = self._perform(step)
+                except Exception as e:
+                    finished, step = advance(plan, error=e)
+                else:
+                    finished, step = advance(plan, value)
+            return step
+        finally:
+            # Runs the plan's cleanup (endpoint and rate limiter releases) if it was interrupted
+            plan.close()
+
+    def _perform(self, effect: Any) -> Any:
+        """
+        Perform one effect of a plan, blocking the calling thread.
+
+        Args:
+            effect: Sleep, Blocking, Acquire or Send
+
+        Returns:
+            The effect's result
+        """
+        if isinstance(effect, Sleep):
+            time.sleep(effect.seconds)
+            return None
+        if isinstance(effect, Blocking):
+            return effect.function(*effect.args)
+        if isinstance(effect, Acquire):
+            effect.rate_limiter.acquire()
+            return None
+        return self._fetch_raw(effect.query, effect.url)
+
+    def _execute(self, query: str, parse: Optional[Callable[[bytes, str], Any]] = None) -> Plan:
+        """
+        Send a single query, using the response cache and rate limiter if configured.
+
+        Args:
+            query: Overpass QL query string
+            parse: Function parsing (body, content_type); defaults to an overpy result
+
+        Returns:
+            Parsed response (an Overpass result by default)
+
+        Raises:
+            RecordingMissError: In replay mode, if the query was not recorded
+        """
+        if parse is None:
+            parse = self._parse_response
+
+        if self.is_replaying():
+            with stage_timings.stage("overpass_request"):
+                body, content_type = yield Blocking(self.recording.load, query)
+            self._count_bytes(body)
+            with stage_timings.stage("parse"):
+                return (yield Blocking(parse, body, content_type))
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(query, self.api_url)
+            cached = yield Blocking(self.cache.get, cache_key)
+            if cached is not None:
+                logger.debug("Using cached Overpass response")
+                self._count_bytes(cached[0])
+                with stage_timings.stage("parse"):
+                    result = yield Blocking(parse, *cached)
+                if self.recording is not None:
+                    yield Blocking(self.recording.save, query, *cached)
+                return result
+
+        if self.endpoints is None:
+            with stage_timings.stage("overpass_request"):
+                body, content_type = yield from self._send_limited(query, self.rate_limiter)
+            result = yield from self._parse_fetched(body, content_type, parse)
+        else:
+            endpoint = yield from self._choose_endpoint()
+            try:
+                with stage_timings.stage("overpass_request"):
+                    body, content_type, latency = yield from self._fetch_from_endpoint(endpoint, query)
+                # Load errors can arrive as remarks in a 200 response, so the
+                # endpoint's outcome is only known once the body is parsed
+                try:
+                    result = yield from self._parse_fetched(body, content_type, parse, endpoint.url)
+                except Exception as e:
+                    if is_server_load_error(e):
+                        self.endpoints.record_failure(
+                            endpoint, throttled=True, retry_after=getattr(e, "retry_after", None)
+                        )
+                    else:
+                        self.endpoints.record_success(endpoint, latency)
+                    raise
+                self.endpoints.record_success(endpoint, latency)
+            finally:
+                self.endpoints.release(endpoint)
+
+        if cache_key is not None:
+            yield Blocking(self.cache.put, cache_key, body, content_type)
+        if self.recording is not None:
+            yield Blocking(self.recording.save, query, body, content_type)
+        return result
+
+    def _send_limited(self, query: str, rate_limiter: Any, url: Optional[str] = None) -> Plan:
+        """
+        Send a query under an optional rate limiter.
+
+        Args:
+            query: Overpass QL query string
+            rate_limiter: RateLimiter or AsyncRateLimiter matching the client, or None
+            url: Endpoint URL (defaults to api_url)
+
+        Returns:
+            Tuple of (raw response body, content type)
+        """
+        if rate_limiter is None:
+            return (yield Send(query, url))
+        yield Acquire(rate_limiter)
+        try:
+            return (yield Send(query, url))
+        finally:
+            rate_limiter.release()
+
+    def _choose_endpoint(self) -> Plan:
+        """Reserve the healthiest endpoint, waiting while all of them back off."""
+        endpoint, wait = self.endpoints.choose()
+        while endpoint is None:
+            logger.info(f"All Overpass endpoints are backing off; waiting {wait:.1f} seconds...")
+            yield Sleep(wait)
+            endpoint, wait = self.endpoints.choose()
+        return endpoint
+
+    def _fetch_from_endpoint(self, endpoint: Endpoint, query: str) -> Plan:
+        """
+        Send a query to a reserved endpoint under its rate limit.
+
+        Failed requests are recorded on the endpoint here; a response is only
+        recorded as a success by the caller once it has been parsed.
+
+        Args:
+            endpoint: Endpoint reserved with _choose_endpoint()
+            query: Overpass QL query string
+
+        Returns:
+            Tuple of (raw response body, content type, response time in seconds)
+        """
+        yield Acquire(endpoint.rate_limiter)
+        try:
+            started = time.monotonic()
+            try:
+                body, content_type = yield Send(query, endpoint.url)
+            except overpy.exception.OverpassBadRequest:
+                # The query is at fault, not the endpoint
+                self.endpoints.record_success(endpoint, time.monotonic() - started)
+                raise
+            except Exception as e:
+                self.endpoints.record_failure(
+                    endpoint,
+                    throttled=is_server_load_error(e),
+                    retry_after=getattr(e, "retry_after", None),
+                )
+                raise
+        finally:
+            endpoint.rate_limiter.release()
+        return body, content_type, time.monotonic() - started
+
+    def _parse_fetched(
+        self, body: bytes, content_type: str, parse: Callable[[bytes, str], Any], url: Optional[str] = None
+    ) -> Plan:
+        """
+        Parse a fetched response, noting load errors reported in its body.
+
+        Args:
+            body: Raw response body
+            content_type: Response content type
+            parse: Function parsing (body, content_type)
+            url: Endpoint URL the response came from (defaults to api_url)
+
+        Returns:
+            Parsed response
+        """
+        self._count_bytes(body)
+        # Parse before caching so error remarks are never stored
+        try:
+            with stage_timings.stage("parse"):
+                return (yield Blocking(parse, body, content_type))
+        except Exception as e:
+            if is_server_load_error(e):
+                self._note_throttled(url or self.api_url, e)
+            raise
+
+    def _query_with_retry(
+        self,
+        query: str,
+        query_name: str = "query",
+        parse: Optional[Callable[[bytes, str], Any]] = None,
+    ) -> Plan:
         """
         Execute an Overpass query with retry logic and exponential backoff.
 
         Args:
             query: Overpass QL query string
             query_name: Name of the query for logging purposes
+            parse: Optional function parsing (body, content_type) instead of overpy
 
         Returns:
-            Overpass result
+            Parsed response (an Overpass result by default)
 
         Raises:
             Exception: If query fails after all retries
         """
         delay = self.initial_delay
-        last_exception = None
 
         for attempt in range(self.max_retries):
             try:
                 logger.info(f"Executing {query_name} (attempt {attempt + 1}/{self.max_retries})...")
-                result = self.api.query(query)
+                result = yield from self._execute(query, parse)
                 if attempt > 0:
                     logger.info(f"{query_name} succeeded after {attempt + 1} attempts")
                 return result
-            except overpy.exception.OverpassTooManyRequests as e:
-                last_exception = e
-                if attempt < self.max_retries - 1:
-                    logger.warning(
-                        f"Server load too high for {query_name}. "
-                        f"Retrying in {delay:.1f} seconds..."
-                    )
-                    time.sleep(delay)
-                    # Exponential backoff with jitter
-                    delay = min(delay * 2, self.max_delay)
-                else:
-                    logger.error(f"{query_name} failed after {self.max_retries} attempts")
-            except overpy.exception.OverpassRuntimeError as e:
-                error_msg = str(e).lower()
-                if "too many requests" in error_msg or "rate limit" in error_msg or "server load" in error_msg:
-                    last_exception = e
-                    if attempt < self.max_retries - 1:
-                        logger.warning(
-                            f"Rate limit/server load error for {query_name}. "
-                            f"Retrying in {delay:.1f} seconds..."
-                        )
-                        time.sleep(delay)
-                        delay = min(delay * 2, self.max_delay)
-                    else:
-                        logger.error(f"{query_name} failed after {self.max_retries} attempts")
-                else:
-                    # Non-retryable error
-                    logger.error(f"Non-retryable error in {query_name}: {e}")
-                    raise
             except Exception as e:
-                error_msg = str(e).lower()
-                if "too many requests" in error_msg or "rate limit" in error_msg or "server load" in error_msg:
-                    last_exception = e
-                    if attempt < self.max_retries - 1:
-                        logger.warning(
-                            f"Rate limit/server load error for {query_name}. "
-                            f"Retrying in {delay:.1f} seconds..."
-                        )
-                        time.sleep(delay)
-                        delay = min(delay * 2, self.max_delay)
-                    else:
-                        logger.error(f"{query_name} failed after {self.max_retries} attempts")
-                else:
-                    # Unknown error, but might be retryable
-                    logger.warning(f"Error in {query_name} (attempt {attempt + 1}): {e}")
-                    if attempt < self.max_retries - 1:
-                        time.sleep(delay)
-                        delay = min(delay * 2, self.max_delay)
-                    else:
-                        raise
+                wait = self._retry_delay(e, query_name, attempt, delay)
+            yield Sleep(wait)
+            # Exponential backoff
+            delay = min(delay * 2, self.max_delay)
+
+    def _retry_delay(self, error: Exception, query_name: str, attempt: int, delay: float) -> float:
+        """
+        Decide whether a failed attempt is retried and how long to wait first.
+
+        Args:
+            error: Exception raised by the attempt
+            query_name: Name of the query for logging purposes
+            attempt: Zero-based number of the failed attempt
+            delay: Current backoff delay in seconds
 
-        # If we get here, all retries failed
-        raise Exception(
-            f"{query_name} failed after {self.max_retries} attempts. "
-            f"Last error: {last_exception}"
-        ) from last_exception
+        Returns:
+            Seconds to wait before the next attempt
 
-    def query_roads_with_lanes(self, bbox: List[float]) -> overpy.Result:
+        Raises:
+            OverpassQueryTooLarge: If the server rejected the query's size
+            Exception: The error itself if it is not retryable, or a summary
+                error once all retries are used up
+        """
+        last_attempt = attempt >= self.max_retries - 1
+        server_load = is_server_load_error(error)
+
+        if isinstance(error, RecordingMissError):
+            # Replays have no network to fall back on
+            raise error
+
+        if isinstance(error, overpy.exception.OverpassRuntimeError) and is_size_error(error):
+            # Retrying at the same size would fail the same way
+            raise OverpassQueryTooLarge(query_name, error) from error
+
+        if server_load:
+            if last_attempt:
+                logger.error(f"{query_name} failed after {self.max_retries} attempts")
+                raise Exception(
+                    f"{query_name} failed after {self.max_retries} attempts. "
+                    f"Last error: {error}"
+                ) from error
+            if self.endpoints is not None:
+                return self._failover_delay(query_name)
+            if self.uses_slot_status():
+                # The next attempt waits for the Retry-After time or a free slot
+                logger.warning(f"Rate limit/server load error for {query_name}. Waiting for a free slot...")
+                return 0.0
+            retry_after = getattr(error, "retry_after", None)
+            if retry_after is not None:
+                delay = retry_after
+            logger.warning(
+                f"Rate limit/server load error for {query_name}. "
+                f"Retrying in {delay:.1f} seconds..."
+            )
+            return delay
+
+        if isinstance(error, overpy.exception.OverpassRuntimeError):
+            # Non-retryable error
+            logger.error(f"Non-retryable error in {query_name}: {error}")
+            raise error
+
+        # Unknown error, but might be retryable
+        logger.warning(f"Error in {query_name} (attempt {attempt + 1}): {error}")
+        if last_attempt:
+            raise error
+        if self.endpoints is not None:
+            return self._failover_delay(query_name)
+        return delay
+
+    def _failover_delay(self, query_name: str) -> float:
+        """
+        Get the wait before retrying on the endpoint pool.
+
+        The failed endpoint backs off on its own, so the retry goes to another
+        endpoint straight away if one is available.
+
+        Args:
+            query_name: Name of the query for logging purposes
+
+        Returns:
+            Seconds until an endpoint can take the retry
+        """
+        wait = self.endpoints.wait_time()
+        if wait == 0:
+            logger.warning(f"Retrying {query_name} on another endpoint...")
+        else:
+            logger.warning(f"All endpoints are backing off; retrying {query_name} in {wait:.1f} seconds...")
+        return wait
+
+    def _query_bbox(
+        self,
+        bbox: List[float],
+        build_query: Callable[[List[float]], str],
+        query_name: str,
+        depth: int = 0,
+        parse: Optional[Callable[[bytes, str], Any]] = None,
+        merge: Optional[Callable[[List[Any]], Any]] = None,
+    ) -> Plan:
+        """
+        Execute a bbox query, splitting the bbox into quadrants if it is too large.
+
+        When the server rejects a query with a timeout or out-of-memory error,
+        the bbox is split into four quadrants that are queried separately and
+        merged. Bboxes at least as large as one already rejected for the same
+        query are split straight away instead of being sent again.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+            build_query: Function building the Overpass QL query for a bbox
+            query_name: Name of the query for logging purposes
+            depth: Current split depth
+            parse: Optional function parsing (body, content_type) instead of overpy
+            merge: Function merging the parsed results of the quadrants
+                (defaults to merge_results() for overpy results)
+
+        Returns:
+            Parsed result (an Overpass result by default) covering the whole bbox
+        """
+        area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+        rejected_area = self._rejected_areas.get(query_name)
+        known_too_large = rejected_area is not None and area >= rejected_area
+
+        if not known_too_large or depth >= self.max_split_depth:
+            try:
+                return (yield from self._query_with_retry(build_query(bbox), query_name, parse=parse))
+            except OverpassQueryTooLarge as e:
+                if depth >= self.max_split_depth:
+                    logger.error(f"{query_name} still too large at split depth {depth}: {bbox}")
+                    raise
+                if rejected_area is None or area < rejected_area:
+                    self._rejected_areas[query_name] = area
+                logger.warning(f"{e}; splitting {bbox} into quadrants...")
+
+        results = []
+        for quadrant in split_bbox_into_quadrants(bbox):
+            results.append((yield from self._query_bbox(quadrant, build_query, query_name, depth + 1, parse, merge)))
+        if merge is None:
+            return merge_results(results, self.api)
+        return merge(results)
+
+    def _query_bbox_store(
+        self, bbox: List[float], build_query: Callable[[List[float]], str], query_name: str
+    ) -> Plan:
+        """
+        Execute a bbox query into a chunk store, splitting the bbox if it is too large.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+            build_query: Function building the Overpass QL query for a bbox
+            query_name: Name of the query for logging purposes
+
+        Returns:
+            ChunkStore covering the whole bbox
+        """
+        if self.streaming_json:
+            build_query = with_json_output(build_query)
+        store = yield from self._query_bbox(
+            bbox, build_query, query_name, parse=self._parse_store, merge=ChunkStore.concat
+        )
+        return (yield from self._resolve_missing_store_nodes(store))
+
+    def _fetch_nodes(self, node_ids: List[int], parse: Callable[[bytes, str], Any], json_output: bool) -> Plan:
+        """
+        Fetch nodes by id in batches of node_batch_size, one rate-limited request per batch.
+
+        Args:
+            node_ids: Ids of the nodes to fetch
+            parse: Function parsing (body, content_type)
+            json_output: Request JSON output
+
+        Returns:
+            List of parsed results, one per batch
+        """
+        results = []
+        for start in range(0, len(node_ids), self.node_batch_size):
+            batch = node_ids[start:start + self.node_batch_size]
+            query = build_nodes_query(batch, json_output)
+            results.append((yield from self._query_with_retry(query, "fetch_missing_nodes", parse=parse)))
+        return results
+
+    def _resolve_missing_nodes(self, result: overpy.Result) -> Plan:
+        """
+        Fetch the nodes referenced by a result's ways but missing from it.
+
+        All missing nodes of the result are fetched together in batched,
+        rate-limited requests, so later get_nodes() calls never need to
+        resolve nodes one way at a time.
+
+        Args:
+            result: Overpass result, expanded in place
+
+        Returns:
+            The same result, with the missing nodes added
+
+        Raises:
+            MissingNodesError: In strict mode, if any referenced node is missing
+        """
+        missing = find_missing_node_ids(result)
+        if not missing:
+            return result
+        if self.strict_nodes:
+            raise MissingNodesError(missing)
+
+        logger.info(f"  Fetching {len(missing)} missing nodes...")
+        for nodes_result in (yield from self._fetch_nodes(missing, self._parse_response, json_output=False)):
+            result.expand(nodes_result)
+        return result
+
+    def _resolve_missing_store_nodes(self, store: ChunkStore) -> Plan:
+        """
+        Fetch the nodes referenced by a chunk store's ways but missing from it.
+
+        Args:
+            store: Chunk store
+
+        Returns:
+            Chunk store including the missing nodes
+
+        Raises:
+            MissingNodesError: In strict mode, if any referenced node is missing
+        """
+        missing = store.missing_node_ids().tolist()
+        if not missing:
+            return store
+        if self.strict_nodes:
+            raise MissingNodesError(missing)
+
+        logger.info(f"  Fetching {len(missing)} missing nodes...")
+        node_stores = yield from self._fetch_nodes(missing, self._parse_store, json_output=self.streaming_json)
+        return ChunkStore.concat([store] + node_stores)
+
+    resolve_missing_nodes = driven(_resolve_missing_nodes)
+    resolve_missing_store_nodes = driven(_resolve_missing_store_nodes)
+
+    @driven
+    def query_roads_with_lanes(self, bbox: List[float]) -> Plan:
         """
         Query all roads with lane information in the bounding box.
 
@@ -126,20 +954,13 @@ class OverpassQueries:
         Returns:
             Overpass result with ways (roads)
         """
-        query = f"""
-        [bbox:{bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]}];
-        (
-          way["highway"]["lanes"];
-          way["highway"]["lanes:forward"];
-          way["highway"]["lanes:backward"];
-          way["highway"~"^(primary|secondary|tertiary|residential|unclassified|service)$"];
-        );
-        (._;>;);
-        out body;
-        """
-        return self._query_with_retry(query, "query_roads_with_lanes")
+        result = yield from self._query_bbox(
+            bbox, self._geometry_query(build_roads_with_lanes_query), "query_roads_with_lanes"
+        )
+        return (yield from self._resolve_missing_nodes(result))
 
-    def query_all_roads(self, bbox: List[float]) -> overpy.Result:
+    @driven
+    def query_all_roads(self, bbox: List[float]) -> Plan:
         """
         Query all roads in the bounding box (for intersection detection).
 
@@ -149,17 +970,95 @@ class OverpassQueries:
         Returns:
             Overpass result with ways (roads) and nodes
         """
-        query = f"""
-        [bbox:{bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]}];
-        (
-          way["highway"~"^(primary|secondary|tertiary|residential|unclassified|service)$"];
-        );
-        (._;>;);
-        out body;
+        result = yield from self._query_bbox(bbox, self._geometry_query(build_all_roads_query), "query_all_roads")
+        return (yield from self._resolve_missing_nodes(result))
+
+    @driven
+    def query_roads_and_signals(self, bbox: List[float]) -> Plan:
+        """
+        Query roads, their nodes and traffic signal nodes in a single request.
+
+        The roads and signals are collected into named result sets and returned
+        together, then split back into the views returned by query_all_roads()
+        and query_traffic_signals().
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            Tuple of (roads result with ways and nodes, traffic signals result with nodes)
+        """
+        result = yield from self._query_bbox(
+            bbox, self._geometry_query(build_roads_and_signals_query), "query_roads_and_signals"
+        )
+        return split_roads_and_signals((yield from self._resolve_missing_nodes(result)), bbox)
+
+    @driven
+    def query_roads_and_signals_store(self, bbox: List[float]) -> Plan:
+        """
+        Query roads, their nodes and traffic signal nodes in a single request into a chunk store.
+
+        Same request as query_roads_and_signals(). Road nodes outside the bbox
+        are included; select signals with traffic_signal_filter.signal_node_mask().
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            ChunkStore with road ways, road nodes and traffic signal nodes
+        """
+        return (yield from self._query_bbox_store(
+            bbox, self._geometry_query(build_roads_and_signals_query), "query_roads_and_signals"
+        ))
+
+    @driven
+    def query_all_roads_store(self, bbox: List[float]) -> Plan:
+        """
+        Query all roads and their nodes in the bounding box into a chunk store.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            ChunkStore with road ways and their nodes
+        """
+        return (yield from self._query_bbox_store(
+            bbox, self._geometry_query(build_all_roads_query), "query_all_roads"
+        ))
+
+    @driven
+    def query_traffic_signals_store(self, bbox: List[float]) -> Plan:
+        """
+        Query all traffic signal nodes in the bounding box into a chunk store.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+        Returns:
+            ChunkStore with traffic signal nodes
+        """
+        return (yield from self._query_bbox_store(bbox, build_traffic_signals_query, "query_traffic_signals"))
+
+    @driven
+    def count_chunk_elements(self, bbox: List[float], timeout: int = 60) -> Plan:
         """
-        return self._query_with_retry(query, "query_all_roads")
+        Count the roads, road nodes and traffic signals in a bounding box.
 
-    def query_traffic_signals(self, bbox: List[float]) -> overpy.Result:
+        Uses `out count;`, so the server only returns totals. This is a cheap
+        probe of how large a full chunk query would be.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+            timeout: Server-side query timeout in seconds
+
+        Returns:
+            Total number of elements a roads and signals query would return
+        """
+        query = build_count_query(bbox, timeout)
+        return (yield from self._query_with_retry(query, "count_chunk_elements", parse=self._parse_count))
+
+    @driven
+    def query_traffic_signals(self, bbox: List[float]) -> Plan:
         """
         Query all traffic signal nodes in the bounding box.
 
@@ -169,16 +1068,10 @@ class OverpassQueries:
         Returns:
             Overpass result with nodes (traffic signals)
         """
-        query = f"""
-        [bbox:{bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]}];
-        (
-          node["highway"="traffic_signals"];
-        );
-        out body;
-        """
-        return self._query_with_retry(query, "query_traffic_signals")
+        return (yield from self._query_bbox(bbox, build_traffic_signals_query, "query_traffic_signals"))
 
-    def query_landuse(self, bbox: List[float]) -> overpy.Result:
+    @driven
+    def query_landuse(self, bbox: List[float]) -> Plan:
         """
         Query all landuse polygons in the bounding box.
 
@@ -188,19 +1081,26 @@ class OverpassQueries:
         Returns:
             Overpass result with ways (landuse polygons)
         """
-        landuse_tags = "|".join(config.LANDUSE_TAGS)
-        query = f"""
-        [bbox:{bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]}];
-        (
-          way["landuse"~"^({landuse_tags})$"];
-          relation["landuse"~"^({landuse_tags})$"];
-        );
-        (._;>;);
-        out body;
+        result = yield from self._query_bbox(bbox, self._geometry_query(build_landuse_query), "query_landuse")
+        return (yield from self._resolve_missing_nodes(result))
+
+    @driven
+    def query_landuse_store(self, bbox: List[float]) -> Plan:
         """
-        return self._query_with_retry(query, "query_landuse")
+        Query all landuse polygons in the bounding box into a chunk store.
+
+        Args:
+            bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
 
-    def query_intersection_nodes(self, bbox: List[float]) -> overpy.Result:
+        Returns:
+            ChunkStore with landuse ways, relations and their geometry
+        """
+        return (yield from self._query_bbox_store(
+            bbox, self._geometry_query(build_landuse_query), "query_landuse"
+        ))
+
+    @driven
+    def query_intersection_nodes(self, bbox: List[float]) -> Plan:
         """
         Query nodes that are part of multiple roads (potential intersections).
 
@@ -210,12 +1110,303 @@ class OverpassQueries:
         Returns:
             Overpass result with nodes and ways
         """
-        query = f"""
-        [bbox:{bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]}];
+        result = yield from self._query_bbox(bbox, build_all_roads_query, "query_intersection_nodes")
+        return (yield from self._resolve_missing_nodes(result))
+
+
+def _bbox_setting(bbox: List[float]) -> str:
+    """
+    Format a bbox as an Overpass global bbox setting (south, west, north, east).
+
+    Args:
+        bbox: Bounding box [min_lon, min_lat, max_lon, max_lat]
+
+    Returns:
+        Overpass QL setting string
+    """
+    return f"[bbox:{bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]}]"
+
+
+def with_json_output(build_query: Callable[[List[float]], str]) -> Callable[[List[float]], str]:
+    """
+    Wrap a query builder so its query requests JSON output.
+
+    Adds `[out:json]` to the leading settings statement of the query.
+
+    Args:
+        build_query: Function building an Overpass QL query for a bbox
+
+    Returns:
+        Function building the same query with JSON output
+    """
+
+    def build_json_query(bbox: List[float]) -> str:
+        query = build_query(bbox)
+        if "[out:json]" in query:
+            return query
+        return _SETTINGS_START.sub(r"\1[out:json][", query, count=1)
+
+    return build_json_query
+
+
+# `out geom` clips coordinates to the global bbox, leaving null points where a
+# way leaves the chunk. An explicit bbox on the out statement takes precedence,
+# so the world bbox returns every way's full geometry.
+_UNCLIPPED_GEOM = "geom(-90,-180,90,180)"
+
+
+def _output_statements(inline_geometry: bool, quadtile_order: bool) -> str:
+    """
+    Build the output statements for the ways (and relations) in the default set.
+
+    Args:
+        inline_geometry: Output coordinates inline with `out geom` instead of
+            recursing down to the member nodes
+        quadtile_order: Sort the output by quadtile (`qt`) instead of by id
+
+    Returns:
+        Overpass QL output statements
+    """
+    order = " qt" if quadtile_order else ""
+    if inline_geometry:
+        return f"out {_UNCLIPPED_GEOM}{order};"
+    return f"""(._;>;);
+        out body{order};"""
+
+
+def build_roads_with_lanes_query(
+    bbox: List[float], inline_geometry: bool = False, quadtile_order: bool = False
+) -> str:
+    """Build the query for roads with lane information in a bbox."""
+    return f"""
+        {_bbox_setting(bbox)};
         (
+          way["highway"]["lanes"];
+          way["highway"]["lanes:forward"];
+          way["highway"]["lanes:backward"];
           way["highway"~"^(primary|secondary|tertiary|residential|unclassified|service)$"];
         );
-        (._;>;);
+        {_output_statements(inline_geometry, quadtile_order)}
+        """
+
+
+def _road_statements(two_lane_only: bool) -> List[str]:
+    """
+    Build the way statements selecting the roads of a query.
+
+    Args:
+        two_lane_only: Push the two-lane rule set down to the server
+
+    Returns:
+        List of Overpass QL way statements, to be combined in a union
+    """
+    if two_lane_only:
+        return two_lane_filter.build_two_lane_overpass_filters(config.TWO_LANE_ROAD_TAGS["highway"])
+    return ['way["highway"~"^(primary|secondary|tertiary|residential|unclassified|service)$"]']
+
+
+def _select_roads(two_lane_only: bool) -> str:
+    """Build the statement storing the roads of a query in the .roads set."""
+    statements = _road_statements(two_lane_only)
+    if len(statements) == 1:
+        return f"{statements[0]}->.roads;"
+    union = "".join(f"\n          {statement};" for statement in statements)
+    return f"({union}\n        )->.roads;"
+
+
+def build_all_roads_query(
+    bbox: List[float],
+    two_lane_only: bool = config.TWO_LANE_PUSHDOWN,
+    inline_geometry: bool = False,
+    quadtile_order: bool = False,
+) -> str:
+    """Build the query for all roads (or two-lane candidates only) and their nodes in a bbox."""
+    union = "".join(f"\n          {statement};" for statement in _road_statements(two_lane_only))
+    return f"""
+        {_bbox_setting(bbox)};
+        ({union}
+        );
+        {_output_statements(inline_geometry, quadtile_order)}
+        """
+
+
+def build_roads_and_signals_query(
+    bbox: List[float],
+    two_lane_only: bool = config.TWO_LANE_PUSHDOWN,
+    inline_geometry: bool = False,
+    quadtile_order: bool = False,
+) -> str:
+    """
+    Build the combined query for roads, their nodes and traffic signals in a bbox.
+
+    Road nodes come from recursing down the roads, which the global bbox does
+    not clip, so roads crossing the chunk edge keep their outside nodes.
+    """
+    order = " qt" if quadtile_order else ""
+    if inline_geometry:
+        # Road coordinates come inline, so only the signal nodes are output
+        return f"""
+        {_bbox_setting(bbox)};
+        {_select_roads(two_lane_only)}
+        node["highway"="traffic_signals"]->.signals;
+        .roads out {_UNCLIPPED_GEOM}{order};
+        .signals out body{order};
+        """
+
+    return f"""
+        {_bbox_setting(bbox)};
+        {_select_roads(two_lane_only)}
+        node["highway"="traffic_signals"]->.signals;
+        .roads > ->.road_nodes;
+        (.road_nodes; .signals;)->.all_nodes;
+        .roads out body{order};
+        .all_nodes out body{order};
+        """
+
+
+def build_count_query(
+    bbox: List[float], timeout: int = 60, two_lane_only: bool = config.TWO_LANE_PUSHDOWN
+) -> str:
+    """Build the `out count` probe for roads, all their nodes and signals in a bbox."""
+    return f"""
+        [out:json][timeout:{timeout}]{_bbox_setting(bbox)};
+        {_select_roads(two_lane_only)}
+        node["highway"="traffic_signals"]->.signals;
+        (.roads; .roads >; .signals;);
+        out count;
+        """
+
+
+def build_nodes_query(node_ids: List[int], json_output: bool = False) -> str:
+    """Build the query for nodes by id."""
+    ids = ",".join(str(node_id) for node_id in node_ids)
+    settings = "[out:json];" if json_output else ""
+    return f"""
+        {settings}
+        node(id:{ids});
         out body;
         """
-        return self._query_with_retry(query, "query_intersection_nodes")
+
+
+def build_traffic_signals_query(bbox: List[float]) -> str:
+    """Build the query for traffic signal nodes in a bbox."""
+    return f"""
+        {_bbox_setting(bbox)};
+        (
+          node["highway"="traffic_signals"];
+        );
+        out body;
+        """
+
+
+def build_landuse_query(
+    bbox: List[float], inline_geometry: bool = False, quadtile_order: bool = False
+) -> str:
+    """Build the query for landuse ways, relations and their members in a bbox."""
+    landuse_tags = "|".join(config.LANDUSE_TAGS)
+    return f"""
+        {_bbox_setting(bbox)};
+        (
+          way["landuse"~"^({landuse_tags})$"];
+          relation["landuse"~"^({landuse_tags})$"];
+        );
+        {_output_statements(inline_geometry, quadtile_order)}
+        """
+
+
+def merge_results(results: List[overpy.Result], api: Optional[overpy.Overpass] = None) -> overpy.Result:
+    """
+    Merge several Overpass results, dropping duplicate elements.
+
+    Args:
+        results: Overpass results to merge
+        api: Overpass API object for the merged result
+
+    Returns:
+        Overpass result holding the elements of all results
+    """
+    merged = overpy.Result(api=api)
+    for result in results:
+        merged.expand(result)
+    return merged
+
+
+def find_missing_node_ids(result: overpy.Result) -> List[int]:
+    """
+    Find the nodes referenced by a result's ways that the result does not contain.
+
+    Ways with inline `out geom` coordinates are skipped, as they need no node lookups.
+
+    Args:
+        result: Overpass result
+
+    Returns:
+        Sorted list of missing node ids
+    """
+    present = set(result.node_ids)
+    missing = set()
+    for way in result.ways:
+        if way.attributes.get("geometry"):
+            continue
+        missing.update(node_id for node_id in way._node_ids or [] if node_id not in present)
+    return sorted(missing)
+
+
+def split_roads_and_signals(
+    result: overpy.Result, bbox: List[float]
+) -> Tuple[overpy.Result, overpy.Result]:
+    """
+    Split a combined roads and signals result into separate views.
+
+    The roads view holds every way and the nodes those ways reference. The
+    signals view holds the traffic signal nodes inside the bounding box. The
+    recursion down the roads also returns road nodes outside the bbox, which
+    the global bbox does not clip; signals among them are left out, as they
+    would be by query_traffic_signals().
+
+    Args:
+        result: Overpass result from a combined roads and signals query
+        bbox: Bounding box [min_lon, min_lat, max_lon, max_lat] of the query
+
+    Returns:
+        Tuple of (roads result, traffic signals result)
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+
+    road_node_ids = set()
+    for way in result.ways:
+        road_node_ids.update(way._node_ids or [])
+
+    road_elements = list(result.ways)
+    signal_elements = []
+    for node in result.nodes:
+        if node.id in road_node_ids:
+            road_elements.append(node)
+
+        if node.tags.get("highway") != "traffic_signals":
+            continue
+        if min_lon <= float(node.lon) <= max_lon and min_lat <= float(node.lat) <= max_lat:
+            signal_elements.append(node)
+
+    roads_result = overpy.Result(elements=road_elements, api=result.api)
+    signals_result = overpy.Result(elements=signal_elements, api=result.api)
+    return roads_result, signals_result
+
+
+def is_size_error(error: Exception) -> bool:
+    """
+    Check whether an Overpass error means the query area was too large.
+
+    Args:
+        error: Exception raised by a query
+
+    Returns:
+        True for server-side query timeouts and out-of-memory runtime errors
+    """
+    if isinstance(error, OverpassQueryTooLarge):
+        return True
+    if not isinstance(error, overpy.exception.OverpassError):
+        return False
+
+    error_msg = str(error).lower()
+    return "timed out" in error_msg or "out of memory" in error_msg
@@ -0,0 +1,131 @@
+"""
+Record and replay of raw Overpass API responses.
+
+In record mode every response a run receives (fetched or served from the
+response cache) is saved under the recording directory, keyed by a hash
+of the normalized query. In replay mode queries are answered only from
+the recording, so a run is repeatable and needs no network.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+from response_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class RecordingMissError(Exception):
+    """Raised in replay mode for a query that is not in the recording."""
+
+    def __init__(self, query: str, directory: Path):
+        super().__init__(f"Query not in recording {directory}: {normalize_query(query)[:200]}")
+        self.query = query
+
+
+class OverpassRecording:
+    """Directory of recorded Overpass responses."""
+
+    def __init__(self, directory: str, mode: str):
+        """
+        Initialize the recording.
+
+        Args:
+            directory: Recording directory
+            mode: RECORD to save responses, REPLAY to serve them
+
+        Raises:
+            ValueError: For an unknown mode
+            FileNotFoundError: If a recording to replay does not exist
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown recording mode: {mode}")
+
+        self.directory = Path(directory)
+        self.mode = mode
+        if mode == RECORD:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        elif not self.directory.is_dir():
+            raise FileNotFoundError(f"Recording {self.directory} does not exist")
+
+        self.saved = 0
+        self.replayed = 0
+
+    @property
+    def replaying(self) -> bool:
+        """Whether responses are served from the recording."""
+        return self.mode == REPLAY
+
+    @staticmethod
+    def make_key(query: str) -> str:
+        """
+        Build the key of a query; the endpoint is ignored so recordings replay against any mirror.
+
+        Args:
+            query: Overpass QL query string
+
+        Returns:
+            Hex digest identifying the query
+        """
+        return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+    def save(self, query: str, body: bytes, content_type: str):
+        """
+        Save a response.
+
+        Args:
+            query: Overpass QL query string
+            body: Raw response body
+            content_type: Response content type
+        """
+        key = self.make_key(query)
+        meta = {
+            "query": normalize_query(query),
+            "content_type": content_type,
+            "bytes": len(body),
+            "recorded_at": time.time(),
+        }
+        for suffix, data in ((".body", body), (".json", json.dumps(meta).encode("utf-8"))):
+            path = self.directory / f"{key}{suffix}"
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{id(data)}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        self.saved += 1
+
+    def load(self, query: str) -> Tuple[bytes, str]:
+        """
+        Load a recorded response.
+
+        Args:
+            query: Overpass QL query string
+
+        Returns:
+            Tuple of (raw response body, content type)
+
+        Raises:
+            RecordingMissError: If the query was not recorded
+        """
+        key = self.make_key(query)
+        try:
+            meta = json.loads((self.directory / f"{key}.json").read_text())
+            body = (self.directory / f"{key}.body").read_bytes()
+        except FileNotFoundError:
+            raise RecordingMissError(query, self.directory) from None
+        self.replayed += 1
+        return body, meta["content_type"]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get recording statistics.
+
+        Returns:
+            Dictionary with saved and replayed response counts
+        """
+        return {"saved": self.saved, "replayed": self.replayed}
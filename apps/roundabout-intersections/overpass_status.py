@@ -0,0 +1,261 @@
+"""
+Request scheduling from the Overpass `/api/status` slot information.
+
+An Overpass server grants each client a fixed number of query slots. Its
+status page lists the free slots and when each busy slot frees up, e.g.
+
+    Rate limit: 2
+    Slot available after: 2024-05-01T12:00:07Z, in 4 seconds.
+    Slot available after: 2024-05-01T12:00:21Z, in 18 seconds.
+
+SlotScheduler starts a request right away while a slot is free and
+otherwise waits exactly until the next slot frees up. Retry-After headers of
+429 responses push the next request back the same way. A request rejected
+while the status page shows free slots points at general server load, and
+only then does the scheduler fall back to exponential backoff.
+"""
+
+import email.utils
+import logging
+import re
+import threading
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_RATE_LIMIT = re.compile(r"^Rate limit:\s*(\d+)", re.MULTILINE)
+_SLOTS_AVAILABLE = re.compile(r"^(\d+) slots? available now", re.MULTILINE)
+_SLOT_AFTER = re.compile(r"^Slot available after:.*?in (-?\d+) seconds?", re.MULTILINE)
+
+# Wait while another thread refreshes the status
+_REFRESH_WAIT_SECONDS = 0.1
+
+
+class ServerStatus:
+    """Slot information from an Overpass status page."""
+
+    def __init__(self, rate_limit: int, slots_available: int, slot_waits: List[float]):
+        """
+        Initialize the status.
+
+        Args:
+            rate_limit: Number of slots of this client (0 means no limit)
+            slots_available: Slots free right now
+            slot_waits: Seconds until each busy slot frees up
+        """
+        self.rate_limit = rate_limit
+        self.slots_available = slots_available
+        self.slot_waits = slot_waits
+
+
+def parse_status(text: str) -> ServerStatus:
+    """
+    Parse an Overpass `/api/status` page.
+
+    Args:
+        text: Status page text
+
+    Returns:
+        ServerStatus
+
+    Raises:
+        ValueError: If the text is not an Overpass status page
+    """
+    rate_limit = _RATE_LIMIT.search(text)
+    if rate_limit is None:
+        raise ValueError("Not an Overpass status page")
+
+    available = _SLOTS_AVAILABLE.search(text)
+    waits = [max(0.0, float(seconds)) for seconds in _SLOT_AFTER.findall(text)]
+    return ServerStatus(int(rate_limit.group(1)), int(available.group(1)) if available else 0, waits)
+
+
+def status_url_for(api_url: str) -> Optional[str]:
+    """
+    Derive the status page URL of an interpreter endpoint.
+
+    Args:
+        api_url: Interpreter URL (e.g. https://overpass-api.de/api/interpreter)
+
+    Returns:
+        Status URL, or None if the URL does not end in /interpreter
+    """
+    base, sep, tail = api_url.rstrip("/").rpartition("/")
+    if not sep or tail != "interpreter":
+        return None
+    return f"{base}/status"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given in seconds or as an HTTP date.
+
+    Args:
+        value: Header value, or None
+
+    Returns:
+        Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class SlotScheduler:
+    """Track the free query slots of one Overpass server."""
+
+    def __init__(
+        self,
+        status_url: Optional[str],
+        poll_interval: float = 1.0,
+        max_status_age: float = 30.0,
+        backoff_delay: float = 5.0,
+        max_backoff_delay: float = 300.0,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            status_url: Status page URL (None disables slot scheduling)
+            poll_interval: Wait between status checks while all slots are busy
+                and the server gives no time for the next free slot
+            max_status_age: Seconds after which known free slots are checked again
+            backoff_delay: Initial backoff after rejections the status does not explain
+            max_backoff_delay: Maximum backoff
+        """
+        self.status_url = status_url
+        self.poll_interval = poll_interval
+        self.max_status_age = max_status_age
+        self.backoff_delay = backoff_delay
+        self.max_backoff_delay = max_backoff_delay
+        self.enabled = status_url is not None
+
+        # Rejections since the last success that the slot status did not explain,
+        # and whether the latest one still has to be backed off
+        self._unexplained_throttles = 0
+        self._backoff_pending = False
+
+        self._available = 0
+        self._next_slot_at: Optional[float] = None
+        self._refreshed_at: Optional[float] = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def reserve(self) -> Tuple[bool, float]:
+        """
+        Try to take a free slot for the next request.
+
+        Returns:
+            Tuple of (reserved, wait). When not reserved, wait is the number
+            of seconds to wait before trying again, or 0.0 if the caller must
+            fetch the status page and pass it to update() first
+        """
+        with self._lock:
+            if not self.enabled:
+                return True, 0.0
+
+            now = time.monotonic()
+            stale = self._refreshed_at is None or now - self._refreshed_at > self.max_status_age
+            if not stale and self._available > 0:
+                self._available -= 1
+                return True, 0.0
+            if not stale and self._next_slot_at is not None and now < self._next_slot_at:
+                return False, self._next_slot_at - now
+            if self._refreshing:
+                return False, _REFRESH_WAIT_SECONDS
+
+            self._refreshing = True
+            return False, 0.0
+
+    def update(self, status: ServerStatus):
+        """
+        Store a freshly fetched status.
+
+        Args:
+            status: Parsed status page
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refreshing = False
+            self._refreshed_at = now
+            if status.rate_limit == 0:
+                logger.info(f"{self.status_url} reports no rate limit; slot scheduling disabled")
+                self.enabled = False
+                return
+
+            self._available = status.slots_available
+            if status.slots_available == 0:
+                # Busy slots explain the rejection
+                self._unexplained_throttles = 0
+                self._backoff_pending = False
+
+            if status.slots_available > 0 and self._backoff_pending:
+                # Rejected despite free slots: the server as a whole is overloaded
+                backoff = min(
+                    self.backoff_delay * 2 ** (self._unexplained_throttles - 1), self.max_backoff_delay
+                )
+                logger.info(f"Server rejected a request with free slots; backing off {backoff:.1f} seconds")
+                self._backoff_pending = False
+                self._available = 0
+                self._next_slot_at = now + backoff
+            elif status.slots_available > 0:
+                self._next_slot_at = None
+            elif status.slot_waits:
+                self._next_slot_at = now + min(status.slot_waits)
+            else:
+                # Every slot is held by a running query
+                self._next_slot_at = now + self.poll_interval
+
+            if status.slots_available == 0:
+                logger.info(f"No free Overpass slot; next slot in {self._next_slot_at - now:.1f} seconds")
+
+    def cancel_refresh(self):
+        """Give up a status refresh claimed by reserve() without a result."""
+        with self._lock:
+            self._refreshing = False
+
+    def disable(self, error: Exception):
+        """
+        Stop slot scheduling after the status page could not be used.
+
+        Args:
+            error: Error raised while fetching or parsing the status page
+        """
+        with self._lock:
+            self._refreshing = False
+            if self.enabled:
+                logger.warning(f"Overpass status page {self.status_url} unusable ({error}); using backoff only")
+            self.enabled = False
+
+    def note_throttled(self, retry_after: Optional[float] = None):
+        """
+        Record a rejected request so the next one waits for a free slot.
+
+        Args:
+            retry_after: Seconds the server asked to wait, if known
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._available = 0
+            if retry_after is not None:
+                self._refreshed_at = now
+                self._next_slot_at = now + retry_after
+            else:
+                # Check the status page before the next request
+                self._unexplained_throttles += 1
+                self._backoff_pending = True
+                self._refreshed_at = None
+
+    def note_success(self):
+        """Record an accepted request, ending any load backoff."""
+        with self._lock:
+            self._unexplained_throttles = 0
+            self._backoff_pending = False
@@ -0,0 +1,202 @@
+"""
+Chunk-level workspace holding road and signal geometries in the local metric CRS.
+
+All coordinates of a chunk are projected to UTM once, so distance tests run
+directly in meters without per-signal reprojection or buffer polygons.
+"""
+
+import logging
+from typing import List, Optional
+import numpy as np
+import overpy
+import shapely
+from shapely.strtree import STRtree
+import config
+import projection
+from chunk_store import ChunkStore
+from geometry_utils import get_way_coordinates
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectedWorkspace:
+    """Road lines and traffic signal points of one chunk, projected to meters."""
+
+    def __init__(
+        self,
+        road_ids: List[str],
+        road_lines: np.ndarray,
+        signal_ids: List[str],
+        signal_lons: np.ndarray,
+        signal_lats: np.ndarray,
+        crs: str = config.UTM_CRS,
+    ):
+        """
+        Initialize the workspace from already projected geometries.
+
+        Args:
+            road_ids: OSM way IDs aligned with road_lines
+            road_lines: Array of LineStrings in the metric CRS
+            signal_ids: OSM node IDs aligned with the signal coordinates
+            signal_lons: Signal longitudes (WGS84), kept for output
+            signal_lats: Signal latitudes (WGS84), kept for output
+            crs: Metric CRS the geometries are projected to
+        """
+        self.crs = crs
+        self.road_ids = road_ids
+        self.road_lines = road_lines
+        self.signal_ids = signal_ids
+        self.signal_lons = np.asarray(signal_lons, dtype=np.float64)
+        self.signal_lats = np.asarray(signal_lats, dtype=np.float64)
+
+        xs, ys = projection.transform_coords(
+            self.signal_lons, self.signal_lats, config.WGS84_CRS, crs
+        )
+        self.signal_points = shapely.points(xs, ys)
+        self._road_tree: Optional[STRtree] = None
+
+    @classmethod
+    def from_overpy(
+        cls,
+        signals_result: overpy.Result,
+        two_lane_roads: List[overpy.Way],
+        crs: str = config.UTM_CRS,
+    ) -> "ProjectedWorkspace":
+        """
+        Build a workspace from Overpass results, projecting every coordinate once.
+
+        Args:
+            signals_result: Overpass result containing traffic signal nodes
+            two_lane_roads: List of OSM way objects (two-lane roads)
+            crs: Metric CRS to project to (default: local UTM zone)
+
+        Returns:
+            ProjectedWorkspace for the chunk
+        """
+        road_ids = []
+        lengths = []
+        lons = []
+        lats = []
+        for way in two_lane_roads:
+            try:
+                coords = get_way_coordinates(way)
+                if len(coords) < 2:
+                    continue
+                way_lons = [lon for lon, _ in coords]
+                way_lats = [lat for _, lat in coords]
+            except Exception as e:
+                logger.debug(f"Error converting way {way.id} to LineString: {e}")
+                continue
+
+            road_ids.append(str(way.id))
+            lengths.append(len(coords))
+            lons.extend(way_lons)
+            lats.extend(way_lats)
+
+        # Project all road vertices in one call and assemble LineStrings
+        if road_ids:
+            xs, ys = projection.transform_coords(lons, lats, config.WGS84_CRS, crs)
+            indices = np.repeat(np.arange(len(road_ids)), lengths)
+            road_lines = shapely.linestrings(xs, ys, indices=indices)
+        else:
+            road_lines = np.empty(0, dtype=object)
+
+        signal_ids = []
+        signal_lons = []
+        signal_lats = []
+        for node in signals_result.nodes:
+            if node.tags.get("highway") != "traffic_signals":
+                continue
+
+            try:
+                lon, lat = float(node.lon), float(node.lat)
+            except Exception as e:
+                logger.warning(f"Error processing signal node {node.id}: {e}")
+                continue
+
+            signal_ids.append(str(node.id))
+            signal_lons.append(lon)
+            signal_lats.append(lat)
+
+        return cls(road_ids, road_lines, signal_ids, signal_lons, signal_lats, crs)
+
+    @classmethod
+    def from_store(
+        cls,
+        store: ChunkStore,
+        road_mask: np.ndarray,
+        signal_mask: np.ndarray,
+        crs: str = config.UTM_CRS,
+    ) -> "ProjectedWorkspace":
+        """
+        Build a workspace from a chunk store, projecting every coordinate once.
+
+        Args:
+            store: Chunk store holding the roads and signals
+            road_mask: Boolean mask over store ways selecting the roads
+            signal_mask: Boolean mask over store nodes selecting the signals
+            crs: Metric CRS to project to (default: local UTM zone)
+
+        Returns:
+            ProjectedWorkspace for the chunk
+        """
+        way_indices, offsets, lons, lats = store.way_coordinates(np.flatnonzero(road_mask))
+        road_ids = [str(way_id) for way_id in store.way_ids[way_indices]]
+
+        # Project all road vertices in one call and assemble LineStrings
+        if road_ids:
+            xs, ys = projection.transform_coords(lons, lats, config.WGS84_CRS, crs)
+            indices = np.repeat(np.arange(len(road_ids)), np.diff(offsets))
+            road_lines = shapely.linestrings(xs, ys, indices=indices)
+        else:
+            road_lines = np.empty(0, dtype=object)
+
+        signal_indices = np.flatnonzero(signal_mask)
+        signal_ids = [str(node_id) for node_id in store.node_ids[signal_indices]]
+        return cls(
+            road_ids,
+            road_lines,
+            signal_ids,
+            store.node_lons[signal_indices],
+            store.node_lats[signal_indices],
+            crs,
+        )
+
+    @property
+    def road_tree(self) -> STRtree:
+        """STRtree over the projected road lines, built on first use."""
+        if self._road_tree is None:
+            self._road_tree = STRtree(self.road_lines)
+        return self._road_tree
+
+    def count_roads_within(self, distance_meters: float) -> np.ndarray:
+        """
+        Count the road lines within a distance of each signal.
+
+        Args:
+            distance_meters: Distance threshold in meters
+
+        Returns:
+            Array of road counts aligned with signal_ids
+        """
+        counts = np.zeros(len(self.signal_ids), dtype=np.int64)
+        if len(self.signal_ids) == 0 or len(self.road_lines) == 0:
+            return counts
+
+        signal_indices, _ = self.road_tree.query(
+            self.signal_points, predicate="dwithin", distance=distance_meters
+        )
+        counts += np.bincount(signal_indices, minlength=len(self.signal_ids))
+        return counts
+
+    def signal_buffers(self, radius_meters: float = config.BUFFER_RADIUS_METERS) -> np.ndarray:
+        """
+        Create buffers around every signal in the metric CRS.
+
+        Args:
+            radius_meters: Buffer radius in meters
+
+        Returns:
+            Array of Polygons in the metric CRS aligned with signal_ids
+        """
+        return shapely.buffer(self.signal_points, radius_meters)
@@ -0,0 +1,129 @@
+"""
+Coordinate projection helpers with cached transformers.
+
+Building a pyproj Transformer is expensive, so transformers are created once
+per CRS pair and reused. Coordinates are transformed as whole arrays in a
+single call instead of point by point.
+"""
+
+import threading
+from typing import Dict, Tuple
+import numpy as np
+import pyproj
+import shapely
+import config
+
+# pyproj transformers should not be shared across threads, so each thread
+# keeps its own cache of transformers keyed by (from_crs, to_crs)
+_local = threading.local()
+
+
+def get_transformer(
+    from_crs: str = config.WGS84_CRS, to_crs: str = config.UTM_CRS
+) -> pyproj.Transformer:
+    """
+    Get a cached transformer between two coordinate reference systems.
+
+    Args:
+        from_crs: Source CRS (default: WGS84)
+        to_crs: Target CRS (default: local UTM zone)
+
+    Returns:
+        pyproj Transformer using (x, y) / (lon, lat) axis order
+    """
+    cache: Dict[Tuple[str, str], pyproj.Transformer] = getattr(_local, "transformers", None)
+    if cache is None:
+        cache = _local.transformers = {}
+
+    key = (from_crs, to_crs)
+    transformer = cache.get(key)
+    if transformer is None:
+        transformer = pyproj.Transformer.from_crs(from_crs, to_crs, always_xy=True)
+        cache[key] = transformer
+    return transformer
+
+
+def transform_coords(
+    xs, ys, from_crs: str = config.WGS84_CRS, to_crs: str = config.UTM_CRS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Transform arrays of coordinates in one call.
+
+    Args:
+        xs: Array-like of x coordinates (longitudes for WGS84)
+        ys: Array-like of y coordinates (latitudes for WGS84)
+        from_crs: Source CRS (default: WGS84)
+        to_crs: Target CRS (default: local UTM zone)
+
+    Returns:
+        Tuple of (x, y) float64 arrays in the target CRS
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    return get_transformer(from_crs, to_crs).transform(xs, ys)
+
+
+def _coords_transformer(from_crs: str, to_crs: str):
+    """
+    Build a shapely.transform callback that projects an (N, 2) coordinate array.
+
+    Args:
+        from_crs: Source CRS
+        to_crs: Target CRS
+
+    Returns:
+        Function mapping an (N, 2) array to an (N, 2) array
+    """
+    transformer = get_transformer(from_crs, to_crs)
+
+    def _transform(coords: np.ndarray) -> np.ndarray:
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([x, y])
+
+    return _transform
+
+
+def transform_geometries(
+    geometries, from_crs: str = config.WGS84_CRS, to_crs: str = config.UTM_CRS
+):
+    """
+    Transform one geometry or an array of geometries between CRSs.
+
+    All coordinates of all geometries are gathered into a single array and
+    projected with one transformer call.
+
+    Args:
+        geometries: Shapely geometry or array-like of geometries
+        from_crs: Source CRS (default: WGS84)
+        to_crs: Target CRS (default: local UTM zone)
+
+    Returns:
+        Transformed geometry, or array of geometries if an array was given
+    """
+    return shapely.transform(geometries, _coords_transformer(from_crs, to_crs))
+
+
+def to_utm(geometries):
+    """
+    Project WGS84 geometries into the local UTM zone.
+
+    Args:
+        geometries: Shapely geometry or array-like of geometries in WGS84
+
+    Returns:
+        Geometry or array of geometries in UTM coordinates (meters)
+    """
+    return transform_geometries(geometries, config.WGS84_CRS, config.UTM_CRS)
+
+
+def to_wgs84(geometries):
+    """
+    Project local UTM geometries back to WGS84.
+
+    Args:
+        geometries: Shapely geometry or array-like of geometries in UTM
+
+    Returns:
+        Geometry or array of geometries in WGS84 (lon, lat)
+    """
+    return transform_geometries(geometries, config.UTM_CRS, config.WGS84_CRS)
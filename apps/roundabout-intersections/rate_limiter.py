@@ -0,0 +1,150 @@
+"""
+Token bucket rate limiters for Overpass API requests, for threads and for asyncio tasks.
+"""
+
+import asyncio
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Limit request rate and the number of requests in flight across threads."""
+
+    def __init__(
+        self,
+        requests_per_second: float = 1.0,
+        max_in_flight: int = 1,
+        burst: int = 1,
+    ):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            requests_per_second: Sustained request rate (tokens added per second)
+            max_in_flight: Maximum number of requests running at the same time
+            burst: Maximum number of tokens that can accumulate while idle
+        """
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.requests_per_second = requests_per_second
+        self.max_in_flight = max_in_flight
+        self.burst = max(1, burst)
+
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def _refill(self):
+        """Add tokens for the time elapsed since the last refill. Caller holds the lock."""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.requests_per_second)
+        self._last_refill = now
+
+    def _take_token(self):
+        """Block until a token is available and consume it."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.requests_per_second
+            time.sleep(wait)
+
+    def acquire(self):
+        """Block until a request slot and a rate token are both available."""
+        self._in_flight.acquire()
+        try:
+            self._take_token()
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+    def release(self):
+        """Release the request slot taken by acquire()."""
+        self._in_flight.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class AsyncRateLimiter:
+    """Limit request rate and the number of requests in flight across asyncio tasks."""
+
+    def __init__(
+        self,
+        requests_per_second: float = 1.0,
+        max_in_flight: int = 1,
+        burst: int = 1,
+    ):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            requests_per_second: Sustained request rate (tokens added per second)
+            max_in_flight: Maximum number of requests running at the same time
+            burst: Maximum number of tokens that can accumulate while idle
+        """
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.requests_per_second = requests_per_second
+        self.max_in_flight = max_in_flight
+        self.burst = max(1, burst)
+
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._in_flight = asyncio.BoundedSemaphore(max_in_flight)
+
+    def _refill(self):
+        """Add tokens for the time elapsed since the last refill."""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.requests_per_second)
+        self._last_refill = now
+
+    async def _take_token(self):
+        """Wait until a token is available and consume it, serving waiters in order."""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1.0:
+                await asyncio.sleep((1.0 - self._tokens) / self.requests_per_second)
+                self._refill()
+            self._tokens -= 1.0
+
+    async def acquire(self):
+        """Wait until a request slot and a rate token are both available."""
+        await self._in_flight.acquire()
+        try:
+            await self._take_token()
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+    def release(self):
+        """Release the request slot taken by acquire()."""
+        self._in_flight.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
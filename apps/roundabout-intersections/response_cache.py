@@ -0,0 +1,185 @@
+"""
+On-disk cache of raw Overpass API responses.
+
+Responses are keyed by a hash of the normalized query text and the endpoint
+URL, expire after a TTL, and the least recently used entries are evicted once
+the cache grows beyond its maximum size.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize Overpass QL text so formatting differences share a cache entry.
+
+    Args:
+        query: Overpass QL query string
+
+    Returns:
+        Query with whitespace collapsed and trimmed
+    """
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class ResponseCache:
+    """Persistent, size-bounded LRU cache of raw Overpass responses."""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_bytes: int = 2 * 1024**3,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding cached responses
+            ttl_seconds: Age in seconds after which a response is treated as missing
+            max_bytes: Maximum total size of cached responses in bytes
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._total_bytes = sum(path.stat().st_size for path in self.cache_dir.glob("*.cache"))
+
+    @staticmethod
+    def make_key(query: str, endpoint: str) -> str:
+        """
+        Build the cache key for a query sent to an endpoint.
+
+        Args:
+            query: Overpass QL query string
+            endpoint: Overpass API endpoint URL
+
+        Returns:
+            Hex digest identifying the request
+        """
+        text = f"{endpoint}\n{normalize_query(query)}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.cache"
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            Tuple of (raw response body, content type), or None on a miss
+        """
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "rb") as f:
+                    header = json.loads(f.readline())
+                    body = f.read()
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+
+            if time.time() - header.get("created", 0) > self.ttl_seconds:
+                self._remove(path)
+                self.misses += 1
+                return None
+
+            # Touch the entry so eviction treats it as recently used
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+            self.hits += 1
+            return body, header.get("content_type", "")
+
+    def put(self, key: str, body: bytes, content_type: str):
+        """
+        Store a raw response, evicting least recently used entries if needed.
+
+        Args:
+            key: Cache key from make_key()
+            body: Raw response body
+            content_type: Response content type
+        """
+        path = self._path(key)
+        header = json.dumps({"created": time.time(), "content_type": content_type})
+        data = header.encode("utf-8") + b"\n" + body
+
+        if len(data) > self.max_bytes:
+            logger.debug(f"Response of {len(data)} bytes exceeds cache size, not caching")
+            return
+
+        with self._lock:
+            if path.exists():
+                self._remove(path)
+
+            tmp_path = path.with_suffix(f".tmp{threading.get_ident()}")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data)
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path: Path):
+        """Delete a cache entry and update the size total. Caller holds the lock."""
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            self._total_bytes -= size
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Remove least recently used entries until under max_bytes. Caller holds the lock."""
+        entries = []
+        for path in self.cache_dir.glob("*.cache"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+
+        for _, path in sorted(entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with hits, misses, evictions and total size in bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "total_bytes": self._total_bytes,
+            }
@@ -0,0 +1,389 @@
+"""
+SQLite-backed manifest of chunk processing for resumable, incremental runs.
+
+Tracks each chunk's status, attempts, last error, parameters hash, duration,
+payload size and result count, and stores each chunk's result features so
+the final output can be aggregated without re-reading every chunk file.
+The ids of each chunk's two-lane roads and the chunk layout of the last run
+are kept too, so OSM changes can be mapped back to the chunks they affect.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Chunk statuses
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_key TEXT PRIMARY KEY,
+    bbox TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    params_hash TEXT,
+    started_at REAL,
+    finished_at REAL,
+    duration_s REAL,
+    payload_bytes INTEGER,
+    result_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS features (
+    chunk_key TEXT NOT NULL,
+    intersection_id TEXT NOT NULL,
+    feature TEXT NOT NULL,
+    PRIMARY KEY (chunk_key, intersection_id)
+);
+CREATE INDEX IF NOT EXISTS features_intersection ON features (intersection_id);
+CREATE TABLE IF NOT EXISTS chunk_roads (
+    chunk_key TEXT NOT NULL,
+    way_id INTEGER NOT NULL,
+    PRIMARY KEY (chunk_key, way_id)
+);
+CREATE INDEX IF NOT EXISTS chunk_roads_way ON chunk_roads (way_id);
+CREATE TABLE IF NOT EXISTS layout (
+    position INTEGER PRIMARY KEY,
+    chunk_key TEXT NOT NULL
+);
+"""
+
+# Ids per query when looking up many ids, below SQLite's variable limit
+_LOOKUP_BATCH_SIZE = 500
+
+
+def compute_params_hash(params: Dict[str, Any]) -> str:
+    """
+    Hash the parameters that determine a chunk's results.
+
+    Args:
+        params: JSON-serializable parameters
+
+    Returns:
+        Hex digest of the parameters
+    """
+    text = json.dumps(params, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class RunManifest:
+    """Per-chunk bookkeeping for a run, stored in a SQLite database."""
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the manifest database.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        # Shared between fetch/process worker threads, serialized by the lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def is_empty(self) -> bool:
+        """
+        Check whether the manifest has no chunks yet.
+
+        Returns:
+            True if no chunks are registered
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM chunks LIMIT 1").fetchone()
+        return row is None
+
+    def register_chunks(self, chunks: Iterable[Tuple[str, List[float]]]):
+        """
+        Add chunks to the manifest as pending, keeping existing records.
+
+        Args:
+            chunks: Iterable of (chunk key, bbox) tuples
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunks (chunk_key, bbox) VALUES (?, ?)",
+                [(key, json.dumps(bbox)) for key, bbox in chunks],
+            )
+
+    def get_status(self, chunk_key: str) -> Optional[str]:
+        """
+        Get the status of a chunk.
+
+        Args:
+            chunk_key: Chunk key
+
+        Returns:
+            Status string, or None if the chunk is not registered
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM chunks WHERE chunk_key = ?", (chunk_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def chunks_to_run(
+        self, chunks: Iterable[Tuple[str, List[float]]], params_hash: str
+    ) -> List[Tuple[str, List[float]]]:
+        """
+        Select the chunks that still need processing.
+
+        A chunk needs processing unless it is done with the current parameters.
+        Chunks left "running" by an interrupted run are picked up again.
+
+        Args:
+            chunks: Iterable of (chunk key, bbox) tuples, in processing order
+            params_hash: Hash of the current processing parameters
+
+        Returns:
+            List of (chunk key, bbox) tuples to process
+        """
+        with self._lock:
+            done = {
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT chunk_key FROM chunks WHERE status = ? AND params_hash = ?",
+                    (DONE, params_hash),
+                )
+            }
+        return [(key, bbox) for key, bbox in chunks if key not in done]
+
+    def mark_started(self, chunk_key: str):
+        """
+        Record the start of an attempt on a chunk.
+
+        Args:
+            chunk_key: Chunk key
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE chunks SET status = ?, attempts = attempts + 1, started_at = ? "
+                "WHERE chunk_key = ?",
+                (RUNNING, time.time(), chunk_key),
+            )
+
+    def mark_done(
+        self,
+        chunk_key: str,
+        params_hash: str,
+        features: List[Dict[str, Any]],
+        duration_s: Optional[float] = None,
+        payload_bytes: Optional[int] = None,
+        road_ids: Optional[Iterable[int]] = None,
+    ):
+        """
+        Record a successful chunk and replace its stored result features.
+
+        Args:
+            chunk_key: Chunk key
+            params_hash: Hash of the parameters the chunk was processed with
+            features: GeoJSON features produced by the chunk
+            duration_s: Processing time in seconds
+            payload_bytes: Size of the raw responses fetched for the chunk
+            road_ids: Way ids of the chunk's two-lane roads, replacing the stored ones if given
+        """
+        rows = []
+        for feature in features:
+            intersection_id = feature.get("properties", {}).get("intersection_id")
+            if intersection_id:
+                rows.append((chunk_key, str(intersection_id), json.dumps(feature, separators=(",", ":"))))
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM features WHERE chunk_key = ?", (chunk_key,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO features (chunk_key, intersection_id, feature) VALUES (?, ?, ?)",
+                rows,
+            )
+            if road_ids is not None:
+                self._conn.execute("DELETE FROM chunk_roads WHERE chunk_key = ?", (chunk_key,))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO chunk_roads (chunk_key, way_id) VALUES (?, ?)",
+                    [(chunk_key, int(way_id)) for way_id in road_ids],
+                )
+            self._conn.execute(
+                "UPDATE chunks SET status = ?, error = NULL, params_hash = ?, finished_at = ?, "
+                "duration_s = ?, payload_bytes = ?, result_count = ? WHERE chunk_key = ?",
+                (DONE, params_hash, time.time(), duration_s, payload_bytes, len(features), chunk_key),
+            )
+
+    def mark_failed(
+        self,
+        chunk_key: str,
+        error: str,
+        duration_s: Optional[float] = None,
+        payload_bytes: Optional[int] = None,
+    ):
+        """
+        Record a failed chunk attempt.
+
+        Args:
+            chunk_key: Chunk key
+            error: Error message
+            duration_s: Time spent on the attempt in seconds
+            payload_bytes: Size of the raw responses fetched before the failure
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE chunks SET status = ?, error = ?, finished_at = ?, duration_s = ?, "
+                "payload_bytes = ? WHERE chunk_key = ?",
+                (FAILED, error, time.time(), duration_s, payload_bytes, chunk_key),
+            )
+
+    def mark_pending(self, chunk_keys: Iterable[str]):
+        """
+        Reset chunks to pending so the next run processes them again.
+
+        Args:
+            chunk_keys: Chunk keys to reset
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE chunks SET status = ? WHERE chunk_key = ?",
+                [(PENDING, key) for key in chunk_keys],
+            )
+
+    def set_layout(self, chunk_keys: Iterable[str]):
+        """
+        Store the chunk layout of the current run, replacing the previous one.
+
+        Args:
+            chunk_keys: Keys of the chunks covering the analysis area, in processing order
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM layout")
+            self._conn.executemany(
+                "INSERT INTO layout (position, chunk_key) VALUES (?, ?)", enumerate(chunk_keys)
+            )
+
+    def layout(self) -> List[Tuple[str, List[float]]]:
+        """
+        Get the chunk layout stored by the last run.
+
+        Returns:
+            List of (chunk key, bbox) tuples in processing order, empty if no layout is stored
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT layout.chunk_key, chunks.bbox FROM layout "
+                "JOIN chunks ON chunks.chunk_key = layout.chunk_key ORDER BY layout.position"
+            ).fetchall()
+        return [(key, json.loads(bbox)) for key, bbox in rows]
+
+    def _chunks_matching(self, query: str, values: Iterable[Any]) -> Set[str]:
+        """Run a chunk_key query with an `IN ({})` placeholder over batches of values."""
+        values = list(values)
+        keys: Set[str] = set()
+        with self._lock:
+            for start in range(0, len(values), _LOOKUP_BATCH_SIZE):
+                batch = values[start:start + _LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                keys.update(row[0] for row in self._conn.execute(query.format(placeholders), batch))
+        return keys
+
+    def chunks_with_features(self, intersection_ids: Iterable[str]) -> Set[str]:
+        """
+        Find the chunks whose stored results contain any of the given intersections.
+
+        Args:
+            intersection_ids: Intersection ids (signal node ids)
+
+        Returns:
+            Set of chunk keys
+        """
+        return self._chunks_matching(
+            "SELECT DISTINCT chunk_key FROM features WHERE intersection_id IN ({})",
+            (str(intersection_id) for intersection_id in intersection_ids),
+        )
+
+    def chunks_with_roads(self, way_ids: Iterable[int]) -> Set[str]:
+        """
+        Find the chunks whose two-lane roads include any of the given ways.
+
+        Args:
+            way_ids: OSM way ids
+
+        Returns:
+            Set of chunk keys
+        """
+        return self._chunks_matching(
+            "SELECT DISTINCT chunk_key FROM chunk_roads WHERE way_id IN ({})",
+            (int(way_id) for way_id in way_ids),
+        )
+
+    def iter_features(
+        self, chunk_keys: Optional[Iterable[str]] = None, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream stored result features, ordered by chunk key.
+
+        Args:
+            chunk_keys: Optional chunk keys to restrict to (e.g. the current run's chunks)
+            batch_size: Number of rows read from the database at a time
+
+        Yields:
+            GeoJSON feature dictionaries
+        """
+        if chunk_keys is None:
+            yield from self._page_features(batch_size)
+            return
+        # Each chunk's features are one range of the primary key, so a run over
+        # a few chunks of a large manifest reads only those rows
+        for chunk_key in sorted(set(chunk_keys)):
+            yield from self._page_features(batch_size, chunk_key)
+
+    def _page_features(self, batch_size: int, chunk_key: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream stored features in primary key order, optionally of one chunk only.
+
+        Args:
+            batch_size: Number of rows read from the database at a time
+            chunk_key: Optional chunk key to restrict to
+
+        Yields:
+            GeoJSON feature dictionaries
+        """
+        if chunk_key is None:
+            where = "(chunk_key, intersection_id) > (?, ?)"
+            last = ("", "")
+        else:
+            where = "chunk_key = ? AND intersection_id > ?"
+            last = (chunk_key, "")
+        while True:
+            # Page through the table so only one batch is held in memory
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT chunk_key, intersection_id, feature FROM features WHERE {where} "
+                    "ORDER BY chunk_key, intersection_id LIMIT ?",
+                    (*last, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+
+            for _, _, feature in rows:
+                yield json.loads(feature)
+            last = (rows[-1][0], rows[-1][1])
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Count chunks by status.
+
+        Returns:
+            Dictionary mapping status to number of chunks
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM chunks GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
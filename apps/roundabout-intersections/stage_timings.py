@@ -0,0 +1,71 @@
+"""
+Wall-clock timing of pipeline stages.
+
+Stages are timed with `with stage_timings.stage("name"):` anywhere in the
+pipeline and accumulated in one process-wide registry, which the benchmark
+command resets before a run and reads afterwards. Times of a stage are
+summed over all chunks, so stages running concurrently can add up to more
+than the run's wall-clock time.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimings:
+    """Thread-safe totals of time spent per stage."""
+
+    def __init__(self):
+        self._seconds: Dict[str, float] = {}
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        """
+        Add one timed call of a stage.
+
+        Args:
+            name: Stage name
+            seconds: Time spent in seconds
+        """
+        with self._lock:
+            self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+            self._calls[name] = self._calls.get(name, 0) + 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one call of a stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def reset(self):
+        """Forget all recorded times."""
+        with self._lock:
+            self._seconds.clear()
+            self._calls.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get the recorded times.
+
+        Returns:
+            Dictionary mapping stage names to {"seconds", "calls"}
+        """
+        with self._lock:
+            return {
+                name: {"seconds": self._seconds[name], "calls": self._calls[name]}
+                for name in self._seconds
+            }
+
+
+TIMINGS = StageTimings()
+
+
+def stage(name: str):
+    """Time the enclosed block as one call of a stage in the process-wide registry."""
+    return TIMINGS.stage(name)
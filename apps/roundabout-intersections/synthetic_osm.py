@@ -0,0 +1,217 @@
+"""
+Synthetic OSM data shaped like Overpass results, for benchmarks.
+
+Roads form a regular street grid in the Phoenix area: every block edge is
+a way between two grid nodes, so four roads meet at each inner grid node.
+Traffic signals sit on grid nodes (where the spatial filter keeps them) or
+mid-block (where it drops them). Landuse is a grid of parcels sharing their
+corner nodes, plus multipolygon relations with an inner ring. Tags are
+drawn from a fixed mix with a seeded generator, so every size is
+reproducible.
+"""
+
+import math
+import random
+from decimal import Decimal
+from typing import Dict, List, Tuple
+import overpy
+import config
+
+# Grid spacing of about 100 meters in the Phoenix area
+GRID_SPACING_LAT = 0.0009
+GRID_SPACING_LON = 0.00108
+
+# Road tag mix: (tags, weight). Covers every branch of is_two_lane_road.
+ROAD_TAG_MIX = [
+    ({"highway": "residential", "lanes": "2"}, 8),
+    ({"highway": "tertiary", "lanes": "3", "lanes:forward": "2"}, 3),
+    ({"highway": "secondary", "lanes": "4", "lanes:backward": "3"}, 2),
+    ({"highway": "secondary", "lanes": "4", "lanes:forward": "2", "lanes:backward": "2"}, 2),
+    ({"highway": "primary", "lanes": "6"}, 1),
+    ({"highway": "service", "lanes": "2"}, 1),
+    ({"highway": "residential"}, 2),
+    ({"highway": "unclassified", "lanes": "two"}, 1),
+]
+
+LANDUSE_TYPES = ["residential", "commercial", "industrial", "retail", "park"]
+
+# Share of traffic signals placed on grid nodes
+SIGNALS_AT_JUNCTIONS = 0.5
+
+# Id ranges of the generated elements
+_SIGNAL_ID_OFFSET = 10_000_000
+_RELATION_WAY_ID_OFFSET = 20_000_000
+
+
+def _grid_size(cells: int) -> int:
+    """Side length of the smallest square grid with at least `cells` cells."""
+    return max(2, math.ceil(math.sqrt(cells)))
+
+
+def _decimal(value: float) -> Decimal:
+    """Coordinate as overpy parses it from a response."""
+    return Decimal(f"{value:.7f}")
+
+
+def _grid_coordinate(row: int, col: int) -> Tuple[float, float]:
+    """(lon, lat) of a grid node, starting at the south-west of PHOENIX_BBOX."""
+    return (
+        config.PHOENIX_BBOX[0] + col * GRID_SPACING_LON,
+        config.PHOENIX_BBOX[1] + row * GRID_SPACING_LAT,
+    )
+
+
+def _grid_nodes(result: overpy.Result, size: int) -> Dict[Tuple[int, int], int]:
+    """
+    Add an untagged size x size grid of nodes to a result.
+
+    Returns:
+        Dictionary mapping (row, col) to node id
+    """
+    node_ids = {}
+    for row in range(size):
+        for col in range(size):
+            node_id = row * size + col + 1
+            lon, lat = _grid_coordinate(row, col)
+            node = overpy.Node(
+                node_id=node_id, lat=_decimal(lat), lon=_decimal(lon), tags={}, attributes={}, result=result
+            )
+            result.append(node)
+            node_ids[(row, col)] = node_id
+    return node_ids
+
+
+def road_network(num_ways: int, num_signals: int, seed: int = 0) -> Tuple[overpy.Result, overpy.Result]:
+    """
+    Build a street grid with traffic signals.
+
+    Args:
+        num_ways: Number of road ways
+        num_signals: Number of traffic signal nodes
+        seed: Seed of the tag and signal placement generator
+
+    Returns:
+        Tuple of (roads result with ways and their nodes, signals result)
+    """
+    rng = random.Random(seed)
+    # A size x size grid has 2 * size * (size - 1) block edges
+    size = 2
+    while 2 * size * (size - 1) < num_ways:
+        size += 1
+
+    roads = overpy.Result()
+    node_ids = _grid_nodes(roads, size)
+    tag_sets = [tags for tags, _ in ROAD_TAG_MIX]
+    weights = [weight for _, weight in ROAD_TAG_MIX]
+
+    way_id = 1
+    for row in range(size):
+        for col in range(size):
+            for next_row, next_col in ((row, col + 1), (row + 1, col)):
+                if way_id > num_ways or (next_row, next_col) not in node_ids:
+                    continue
+                tags = dict(rng.choices(tag_sets, weights)[0])
+                way = overpy.Way(
+                    way_id=way_id,
+                    node_ids=[node_ids[(row, col)], node_ids[(next_row, next_col)]],
+                    tags=tags,
+                    attributes={},
+                    result=roads,
+                )
+                roads.append(way)
+                way_id += 1
+
+    signals = overpy.Result()
+    for i in range(num_signals):
+        row, col = rng.randrange(size), rng.randrange(size)
+        lon, lat = _grid_coordinate(row, col)
+        if rng.random() >= SIGNALS_AT_JUNCTIONS:
+            # Mid-block, far from any other road
+            lon += GRID_SPACING_LON / 2
+            lat += GRID_SPACING_LAT / 2
+        signals.append(
+            overpy.Node(
+                node_id=_SIGNAL_ID_OFFSET + i,
+                lat=_decimal(lat),
+                lon=_decimal(lon),
+                tags={"highway": "traffic_signals"},
+                attributes={},
+                result=signals,
+            )
+        )
+
+    return roads, signals
+
+
+def landuse_areas(num_ways: int, seed: int = 0) -> overpy.Result:
+    """
+    Build landuse parcels and multipolygon relations.
+
+    Every cell of a square grid is a closed landuse way. One relation per
+    ten ways covers a 3 x 3 block of cells with the middle cell as its
+    inner ring.
+
+    Args:
+        num_ways: Number of landuse ways
+        seed: Seed of the landuse type generator
+
+    Returns:
+        Overpass result with landuse ways, relations and their nodes
+    """
+    rng = random.Random(seed)
+    cells = _grid_size(num_ways)
+    result = overpy.Result()
+    node_ids = _grid_nodes(result, cells + 1)
+
+    def ring(corners: List[Tuple[int, int]]) -> List[int]:
+        return [node_ids[corner] for corner in corners + corners[:1]]
+
+    for i in range(num_ways):
+        row, col = divmod(i, cells)
+        corners = [(row, col), (row, col + 1), (row + 1, col + 1), (row + 1, col)]
+        result.append(
+            overpy.Way(
+                way_id=i + 1,
+                node_ids=ring(corners),
+                tags={"landuse": rng.choice(LANDUSE_TYPES)},
+                attributes={},
+                result=result,
+            )
+        )
+
+    blocks = [(row, col) for row in range(0, cells - 2, 3) for col in range(0, cells - 2, 3)]
+    for i, (row, col) in enumerate(blocks[: num_ways // 10]):
+        outer_id = _RELATION_WAY_ID_OFFSET + 2 * i
+        inner_id = outer_id + 1
+        outer = [(row, col), (row, col + 3), (row + 3, col + 3), (row + 3, col)]
+        inner = [(row + 1, col + 1), (row + 1, col + 2), (row + 2, col + 2), (row + 2, col + 1)]
+        result.append(overpy.Way(way_id=outer_id, node_ids=ring(outer), tags={}, attributes={}, result=result))
+        result.append(overpy.Way(way_id=inner_id, node_ids=ring(inner), tags={}, attributes={}, result=result))
+        result.append(
+            overpy.Relation(
+                rel_id=i + 1,
+                members=[
+                    overpy.RelationWay(ref=outer_id, role="outer", result=result),
+                    overpy.RelationWay(ref=inner_id, role="inner", result=result),
+                ],
+                tags={"type": "multipolygon", "landuse": rng.choice(LANDUSE_TYPES)},
+                attributes={},
+                result=result,
+            )
+        )
+
+    return result
+
+
+def landuse_extent(num_ways: int) -> List[float]:
+    """
+    Bounding box covered by landuse_areas(num_ways).
+
+    Returns:
+        Bounding box [min_lon, min_lat, max_lon, max_lat]
+    """
+    cells = _grid_size(num_ways)
+    rows = math.ceil(num_ways / cells)
+    min_lon, min_lat = _grid_coordinate(0, 0)
+    max_lon, max_lat = _grid_coordinate(rows, cells)
+    return [min_lon, min_lat, max_lon, max_lat]
@@ -0,0 +1,118 @@
+"""
+Shared fixtures: a local stand-in for the Overpass API.
+
+The server answers each POSTed query with its response from an
+OverpassRecording, over keep-alive HTTP/1.1, so the sync and async clients
+can be tested without network access.
+"""
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from overpass_recording import REPLAY, OverpassRecording, RecordingMissError
+
+
+class _OverpassHandler(BaseHTTPRequestHandler):
+    """Serve recorded responses; one handler instance per connection."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        query = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        with self.server.lock:
+            self.server.queries.append(query)
+        self.server.received.set()
+
+        if self.server.hold_responses:
+            self.server.release.wait(5)
+
+        with self.server.lock:
+            throttled = self.server.throttle_next > 0
+            if throttled:
+                self.server.throttle_next -= 1
+        if throttled:
+            self._respond(429, b"Too many requests", "text/plain", {"Retry-After": "0"})
+            return
+
+        try:
+            body, content_type = self.server.recording.load(query)
+        except RecordingMissError:
+            self._respond(400, b"<p><strong>Error</strong>: not recorded</p>", "text/html")
+            return
+        self._respond(200, body, content_type)
+
+    def _respond(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.server.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+
+        if self.server.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(body), 100):
+                chunk = body[start:start + 100]
+                self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+
+class OverpassServer(ThreadingHTTPServer):
+    """Local Overpass stand-in serving a recording."""
+
+    daemon_threads = True
+
+    def __init__(self, recording: OverpassRecording):
+        super().__init__(("127.0.0.1", 0), _OverpassHandler)
+        self.recording = recording
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.queries = []
+        # Response options the tests switch on
+        self.gzip = False
+        self.chunked = False
+        self.throttle_next = 0
+        self.hold_responses = False
+        self.received = threading.Event()
+        self.release = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/interpreter"
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response (cancellation tests) are expected
+        pass
+
+
+@pytest.fixture
+def overpass_server(tmp_path):
+    """Start a local Overpass server; tests save() the responses it serves into server.recording."""
+    (tmp_path / "recording").mkdir()
+    recording = OverpassRecording(str(tmp_path / "recording"), REPLAY)
+    server = OverpassServer(recording)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.release.set()
+        server.shutdown()
+        server.server_close()
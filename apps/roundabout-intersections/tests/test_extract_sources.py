@@ -0,0 +1,69 @@
+"""Tests that the in-memory extract and the tile index answer chunk queries alike."""
+
+from pathlib import Path
+import numpy as np
+import pytest
+from extract_index import open_extract_index
+from osm_extract import OsmExtract
+
+FIXTURE = Path(__file__).parent / "fixtures" / "small.osm"
+
+BBOXES = {
+    "everything": [-112.07, 33.43, -112.03, 33.47],
+    "west_half": [-112.07, 33.43, -112.05, 33.47],
+    # Crosses a segment of way 100 but holds none of its nodes
+    "segment_only": [-112.056, 33.449, -112.054, 33.451],
+    # Crosses the outer way of landuse relation 300
+    "relation_edge": [-112.034, 33.440, -112.030, 33.443],
+    "empty": [-112.10, 33.50, -112.09, 33.51],
+}
+
+
+@pytest.fixture(scope="module")
+def sources(tmp_path_factory):
+    index_dir = tmp_path_factory.mktemp("index") / "small.index"
+    # Small tiles, so the bboxes span several of them
+    return OsmExtract(str(FIXTURE)), open_extract_index(str(FIXTURE), str(index_dir), tile_degrees=0.01)
+
+
+def element_ids(store):
+    return (
+        sorted(store.way_ids.tolist()),
+        sorted(store.node_ids.tolist()),
+        sorted(store.relation_ids.tolist()),
+    )
+
+
+@pytest.mark.parametrize("name", sorted(BBOXES))
+def test_sources_agree(sources, name):
+    extract, index = sources
+    bbox = BBOXES[name]
+    for query in ("query_all_roads_store", "query_traffic_signals_store", "query_landuse_store"):
+        assert element_ids(getattr(index, query)(bbox)) == element_ids(getattr(extract, query)(bbox)), query
+    assert index.count_chunk_elements(bbox) == extract.count_chunk_elements(bbox)
+
+
+def test_roads_and_signals(sources):
+    extract, index = sources
+    for source in (extract, index):
+        store = source.query_roads_and_signals_store(BBOXES["everything"])
+        # The footway is not a road and the landuse ways are not queried
+        assert sorted(store.way_ids.tolist()) == [100, 101, 102]
+        assert {2, 10} <= set(store.node_ids.tolist())
+
+
+def test_segment_selection(sources):
+    extract, index = sources
+    for source in (extract, index):
+        store = source.query_all_roads_store(BBOXES["segment_only"])
+        assert store.way_ids.tolist() == [100]
+        # Ways come with all their nodes
+        assert sorted(store.node_ids.tolist()) == [1, 2, 3]
+
+
+def test_relation_members(sources):
+    extract, index = sources
+    for source in (extract, index):
+        store = source.query_landuse_store(BBOXES["relation_edge"])
+        assert store.relation_ids.tolist() == [300]
+        assert np.isin([15, 16, 17], store.node_ids).all()
@@ -0,0 +1,16 @@
+"""Tests for the run parameters of main."""
+
+import main
+import two_lane_filter
+
+
+def test_params_hash_changes_with_two_lane_rules(monkeypatch):
+    baseline = main.chunk_params_hash()
+    assert main.chunk_params_hash() == baseline
+
+    monkeypatch.setattr(two_lane_filter, "TWO_LANE_RULES_VERSION", two_lane_filter.TWO_LANE_RULES_VERSION + 1)
+    assert main.chunk_params_hash() != baseline
+
+    monkeypatch.undo()
+    monkeypatch.setattr(two_lane_filter, "MAX_LANES", two_lane_filter.MAX_LANES + 1)
+    assert main.chunk_params_hash() != baseline
@@ -0,0 +1,78 @@
+"""Tests for finding the chunks touched by osmChange files."""
+
+import pytest
+import overpass_queries
+import osm_changes
+import run_manifest
+
+# Two side by side chunks of the last run
+CHUNKS = [
+    ("west", [-112.10, 33.40, -112.05, 33.45]),
+    ("east", [-112.05, 33.40, -112.00, 33.45]),
+]
+
+
+def write_osc(path, body: str) -> str:
+    path.write_text(f'<?xml version="1.0" encoding="UTF-8"?>\n<osmChange version="0.6">{body}</osmChange>')
+    return str(path)
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = run_manifest.RunManifest(str(tmp_path / "manifest.sqlite"))
+    manifest.register_chunks(CHUNKS)
+    manifest.set_layout([key for key, _ in CHUNKS])
+    feature = {"type": "Feature", "properties": {"intersection_id": "101"}, "geometry": None}
+    manifest.mark_done("west", "params", [feature], road_ids=[201])
+    yield manifest
+    manifest.close()
+
+
+@pytest.fixture
+def overpass():
+    # Every node the tests need is in the change files, so nothing is fetched
+    return overpass_queries.OverpassQueries(api_url="http://127.0.0.1:9/api/interpreter")
+
+
+def test_deletion_only_changes(tmp_path, manifest, overpass):
+    path = write_osc(tmp_path / "delete.osc", """
+        <delete>
+          <node id="101" version="3"/>
+          <way id="201" version="2"/>
+        </delete>""")
+
+    changes = osm_changes.read_changes([path])
+    signal_points, roads = osm_changes.changed_geometries(changes, overpass)
+    assert len(signal_points) == 0
+    assert len(roads) == 0
+    assert osm_changes.touched_chunks(changes, CHUNKS, manifest, overpass) == ["west"]
+
+
+def test_road_only_changes(tmp_path, manifest, overpass):
+    path = write_osc(tmp_path / "roads.osc", """
+        <create>
+          <node id="-1" lat="33.42" lon="-112.03"/>
+          <node id="-2" lat="33.43" lon="-112.02"/>
+          <way id="-3">
+            <nd ref="-1"/><nd ref="-2"/>
+            <tag k="highway" v="residential"/><tag k="lanes" v="2"/>
+          </way>
+        </create>""")
+
+    changes = osm_changes.read_changes([path])
+    signal_points, roads = osm_changes.changed_geometries(changes, overpass)
+    assert len(signal_points) == 0
+    assert len(roads) == 1
+    assert osm_changes.touched_chunks(changes, CHUNKS, manifest, overpass) == ["east"]
+
+
+def test_new_signal_touches_its_chunk(tmp_path, manifest, overpass):
+    path = write_osc(tmp_path / "signal.osc", """
+        <modify>
+          <node id="102" version="4" lat="33.41" lon="-112.01">
+            <tag k="highway" v="traffic_signals"/>
+          </node>
+        </modify>""")
+
+    changes = osm_changes.read_changes([path])
+    assert osm_changes.touched_chunks(changes, CHUNKS, manifest, overpass) == ["east"]
@@ -0,0 +1,171 @@
+"""Tests for the sync and async Overpass clients against the local stand-in server."""
+
+import asyncio
+import json
+
+import pytest
+
+from async_overpass import AsyncOverpassQueries
+from endpoint_pool import OPEN, EndpointPool
+from overpass_queries import OverpassQueries, build_roads_and_signals_query, with_json_output
+from rate_limiter import AsyncRateLimiter, RateLimiter
+
+BBOXES = [
+    [-112.10, 33.40, -112.09, 33.41],
+    [-112.09, 33.40, -112.08, 33.41],
+    [-112.08, 33.40, -112.07, 33.41],
+]
+
+CLIENT_OPTIONS = {
+    "max_retries": 2,
+    "initial_delay": 0.01,
+    "streaming_json": True,
+    "inline_geometry": False,
+    "quadtile_order": False,
+    "slot_status": False,
+}
+
+
+def roads_and_signals_response(bbox, first_id):
+    """Build a response with one road of three nodes, the middle one a traffic signal."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lat = (min_lat + max_lat) / 2
+    node_ids = [first_id, first_id + 1, first_id + 2]
+    elements = [
+        {"type": "node", "id": node_id, "lat": lat, "lon": min_lon + (max_lon - min_lon) * (i + 1) / 4}
+        for i, node_id in enumerate(node_ids)
+    ]
+    elements[1]["tags"] = {"highway": "traffic_signals", "name": "Straße ✓"}
+    elements.append(
+        {"type": "way", "id": first_id, "nodes": node_ids, "tags": {"highway": "residential", "lanes": "2"}}
+    )
+    return json.dumps({"version": 0.6, "elements": elements}).encode("utf-8")
+
+
+@pytest.fixture
+def recorded_server(overpass_server):
+    """Local server with the roads and signals response of each of BBOXES recorded."""
+    for i, bbox in enumerate(BBOXES):
+        query = with_json_output(build_roads_and_signals_query)(bbox)
+        overpass_server.recording.save(query, roads_and_signals_response(bbox, 1000 * (i + 1)), "application/json")
+    return overpass_server
+
+
+def store_ids(store):
+    return sorted(store.way_ids.tolist()), sorted(store.node_ids.tolist())
+
+
+def query_async(server, bboxes, **options):
+    """Run the async client's roads and signals query for bboxes, one after another."""
+
+    async def run():
+        async with AsyncOverpassQueries(api_url=server.url, **{**CLIENT_OPTIONS, **options}) as client:
+            stores = [await client.query_roads_and_signals_store(bbox) for bbox in bboxes]
+            return stores, client.pool
+
+    return asyncio.run(run())
+
+
+def test_sync_and_async_clients_agree(recorded_server):
+    sync_client = OverpassQueries(api_url=recorded_server.url, **CLIENT_OPTIONS)
+    sync_stores = [sync_client.query_roads_and_signals_store(bbox) for bbox in BBOXES]
+    async_stores, _ = query_async(recorded_server, BBOXES)
+
+    assert [store_ids(store) for store in async_stores] == [store_ids(store) for store in sync_stores]
+    assert store_ids(sync_stores[0]) == ([1000], [1000, 1001, 1002])
+
+
+def test_async_client_reuses_keep_alive_connection(recorded_server):
+    stores, pool = query_async(recorded_server, BBOXES)
+
+    assert [store.num_ways for store in stores] == [1, 1, 1]
+    assert pool.connections_opened == 1
+    assert pool.requests_sent == 3
+    assert recorded_server.connections == 1
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+@pytest.mark.parametrize("gzip", [False, True])
+def test_async_client_decodes_chunked_and_gzip_bodies(recorded_server, chunked, gzip):
+    recorded_server.chunked = chunked
+    recorded_server.gzip = gzip
+
+    stores, pool = query_async(recorded_server, BBOXES)
+
+    assert [store_ids(store)[0] for store in stores] == [[1000], [2000], [3000]]
+    # A chunked body is read to its end, so the connection stays reusable
+    assert pool.connections_opened == 1
+
+
+@pytest.mark.parametrize("client_type", ["sync", "async"])
+def test_clients_retry_after_rate_limiting(recorded_server, client_type):
+    recorded_server.throttle_next = 1
+
+    if client_type == "sync":
+        client = OverpassQueries(api_url=recorded_server.url, **CLIENT_OPTIONS)
+        store = client.query_roads_and_signals_store(BBOXES[0])
+    else:
+        (store,), _ = query_async(recorded_server, BBOXES[:1])
+
+    assert store_ids(store) == ([1000], [1000, 1001, 1002])
+    assert len(recorded_server.queries) == 2
+
+
+def test_async_client_cancellation_drops_connection_and_releases_limiter(recorded_server):
+    recorded_server.hold_responses = True
+
+    async def run():
+        # A single in-flight slot: a slot leaked by the cancelled query would block the next one
+        rate_limiter = AsyncRateLimiter(requests_per_second=100, max_in_flight=1, burst=10)
+        async with AsyncOverpassQueries(
+            api_url=recorded_server.url, rate_limiter=rate_limiter, **CLIENT_OPTIONS
+        ) as client:
+            task = asyncio.ensure_future(client.query_roads_and_signals_store(BBOXES[0]))
+            assert await asyncio.to_thread(recorded_server.received.wait, 5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # The half-read connection is closed, not returned to the pool
+            assert client.pool._idle == []
+
+            recorded_server.hold_responses = False
+            recorded_server.release.set()
+            store = await asyncio.wait_for(client.query_roads_and_signals_store(BBOXES[1]), 5)
+            return store, client.pool
+
+    store, pool = asyncio.run(run())
+
+    assert store_ids(store) == ([2000], [2000, 2001, 2002])
+    assert pool.connections_opened == 2
+
+
+@pytest.mark.parametrize("client_type", ["sync", "async"])
+def test_load_error_remark_opens_endpoint_circuit(overpass_server, client_type):
+    # Overpass reports some load errors as a remark in a 200 response
+    remark = "runtime error: rate limit exceeded, please check /api/status for the quota"
+    body = json.dumps({"version": 0.6, "elements": [], "remark": remark}).encode("utf-8")
+    overpass_server.recording.save(
+        with_json_output(build_roads_and_signals_query)(BBOXES[0]), body, "application/json"
+    )
+    options = {**CLIENT_OPTIONS, "max_retries": 3}
+    limiter_factory = RateLimiter if client_type == "sync" else AsyncRateLimiter
+    endpoints = EndpointPool([(overpass_server.url, 100, 1)], limiter_factory, backoff_delay=0.01)
+
+    if client_type == "sync":
+        client = OverpassQueries(endpoints=endpoints, **options)
+        with pytest.raises(Exception, match="rate limit"):
+            client.query_roads_and_signals_store(BBOXES[0])
+    else:
+
+        async def run():
+            async with AsyncOverpassQueries(endpoints=endpoints, **options) as client:
+                await client.query_roads_and_signals_store(BBOXES[0])
+
+        with pytest.raises(Exception, match="rate limit"):
+            asyncio.run(run())
+
+    (endpoint,) = endpoints.endpoints
+    assert len(overpass_server.queries) == 3
+    assert endpoint.consecutive_failures == 3
+    assert endpoint.state == OPEN
+    assert endpoint.in_flight == 0
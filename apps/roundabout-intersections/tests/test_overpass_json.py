@@ -0,0 +1,48 @@
+"""Tests for the windowed Overpass JSON parser."""
+
+import json
+import overpy
+import pytest
+import overpass_json
+
+ELEMENTS = [
+    {"type": "node", "id": 1, "lat": 33.45, "lon": -112.05, "tags": {"highway": "traffic_signals"}},
+    {"type": "node", "id": 2, "lat": 33.46, "lon": -112.05},
+    {"type": "way", "id": 10, "nodes": [1, 2], "tags": {"highway": "residential", "name": "Calle Añil 🚦"}},
+]
+
+
+def response(elements, remark=None) -> bytes:
+    document = {"version": 0.6, "generator": "Overpass API", "elements": elements}
+    if remark is not None:
+        document["remark"] = remark
+    return json.dumps(document, indent=1, ensure_ascii=False).encode("utf-8")
+
+
+# Windows of 1 and 5 bytes split elements and multi-byte characters
+@pytest.mark.parametrize("window_size", [1, 5, 1 << 20])
+def test_elements_across_windows(window_size):
+    assert list(overpass_json.iter_elements(response(ELEMENTS), window_size)) == ELEMENTS
+
+
+def test_empty_elements():
+    assert list(overpass_json.iter_elements(response([]), 4)) == []
+
+
+def test_remark_raised_after_elements():
+    body = response(ELEMENTS[:1], remark="runtime error: Query timed out")
+    elements = overpass_json.iter_elements(body, 8)
+    assert next(elements) == ELEMENTS[0]
+    with pytest.raises(overpy.exception.OverpassRuntimeError):
+        next(elements)
+
+
+def test_truncated_response():
+    with pytest.raises(ValueError):
+        list(overpass_json.iter_elements(response(ELEMENTS)[:-40], 16))
+
+
+def test_parse_into_store():
+    store = overpass_json.parse_json_into_store(response(ELEMENTS))
+    assert store.node_ids.tolist() == [1, 2]
+    assert store.way_ids.tolist() == [10]
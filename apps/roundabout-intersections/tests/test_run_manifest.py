@@ -0,0 +1,37 @@
+"""Tests for the run manifest's stored result features."""
+
+import pytest
+import run_manifest
+
+CHUNKS = [(key, [-112.1, 33.4, -112.0, 33.5]) for key in ("a", "b", "c")]
+
+
+def feature(intersection_id):
+    return {"type": "Feature", "properties": {"intersection_id": intersection_id}, "geometry": None}
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = run_manifest.RunManifest(str(tmp_path / "manifest.sqlite"))
+    manifest.register_chunks(CHUNKS)
+    for key, _ in CHUNKS:
+        manifest.mark_done(key, "params", [feature(f"{key}{i}") for i in range(5)])
+    yield manifest
+    manifest.close()
+
+
+def intersection_ids(features):
+    return [feature["properties"]["intersection_id"] for feature in features]
+
+
+def test_iter_features_pages_through_all_chunks(manifest):
+    expected = [f"{key}{i}" for key in "abc" for i in range(5)]
+    assert intersection_ids(manifest.iter_features(batch_size=2)) == expected
+
+
+def test_iter_features_reads_only_the_given_chunks(manifest):
+    # A row outside the wanted chunks would fail to decode if it were read
+    manifest._conn.execute("UPDATE features SET feature = 'not json' WHERE chunk_key = 'b'")
+
+    features = manifest.iter_features(["c", "a", "c", "missing"], batch_size=2)
+    assert intersection_ids(features) == [f"{key}{i}" for key in "ac" for i in range(5)]
@@ -3,9 +3,12 @@ Functions to filter intersections that have traffic signals using spatial querie
 """
 
 import overpy
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
+import numpy as np
 from shapely.geometry import Point, LineString
-from geometry_utils import point_from_coords, create_buffer
+from chunk_store import ChunkStore
+from geometry_utils import get_way_coordinates
+from projected_workspace import ProjectedWorkspace
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,11 +25,10 @@ def _way_to_linestring(way: overpy.Way) -> LineString:
         Shapely LineString representing the road
     """
     try:
-        nodes = way.get_nodes(resolve_missing=True)
-        if len(nodes) < 2:
+        coordinates = get_way_coordinates(way)
+        if len(coordinates) < 2:
             return None
 
-        coordinates = [(float(node.lon), float(node.lat)) for node in nodes]
         return LineString(coordinates)
     except Exception as e:
         logger.debug(f"Error converting way {way.id} to LineString: {e}")
@@ -51,6 +53,34 @@ def _create_road_linestrings(two_lane_roads: List[overpy.Way]) -> List[LineStrin
     return road_lines
 
 
+def count_roads_per_signal(
+    signals_result: overpy.Result,
+    two_lane_roads: List[overpy.Way],
+    buffer_radius_meters: float = 2.0,
+) -> Dict[str, int]:
+    """
+    Count the two-lane roads that intersect the buffer of each traffic signal.
+
+    Distances are measured in the local metric CRS, so a road counts when it
+    lies within buffer_radius_meters of the signal.
+
+    Args:
+        signals_result: Overpass result containing traffic signal nodes
+        two_lane_roads: List of OSM way objects (two-lane roads)
+        buffer_radius_meters: Radius of buffer around each signal (default: 2.0 meters)
+
+    Returns:
+        Dictionary mapping signal node IDs to the number of intersecting roads
+    """
+    # Project roads and signals of the chunk into meters once
+    workspace = ProjectedWorkspace.from_overpy(signals_result, two_lane_roads)
+    logger.info(f"Created {len(workspace.road_lines)} road LineString geometries")
+
+    # Roads within the radius of a signal are the roads its buffer would intersect
+    counts = workspace.count_roads_within(buffer_radius_meters)
+    return {signal_id: int(count) for signal_id, count in zip(workspace.signal_ids, counts)}
+
+
 def filter_traffic_signals_by_spatial_query(
     signals_result: overpy.Result,
     two_lane_roads: List[overpy.Way],
@@ -60,7 +90,7 @@ def filter_traffic_signals_by_spatial_query(
     """
     Filter traffic signals using spatial queries against two-lane roads.
 
-    Only returns traffic signals whose 2-meter buffer intersects with
+    Only returns traffic signals that lie within 2 meters of
     at least 3 two-lane road lines.
 
     Args:
@@ -72,39 +102,31 @@ def filter_traffic_signals_by_spatial_query(
     Returns:
         Set of node IDs that are traffic signals intersecting with roads
     """
-    # Convert two-lane roads to LineString geometries
-    road_lines = _create_road_linestrings(two_lane_roads)
-    logger.info(f"Created {len(road_lines)} road LineString geometries")
-
-    eligible_signal_ids = set()
-
-    for node in signals_result.nodes:
-        if node.tags.get("highway") != "traffic_signals":
-            continue
-
-        try:
-            # Create point for the traffic signal
-            signal_point = point_from_coords(float(node.lon), float(node.lat))
+    road_counts = count_roads_per_signal(
+        signals_result, two_lane_roads, buffer_radius_meters
+    )
+    return select_eligible_signals(road_counts, min_road_intersections)
 
-            # Create 2-meter buffer around the signal
-            signal_buffer = create_buffer(signal_point, buffer_radius_meters)
 
-            # Count how many road lines intersect with the buffer
-            intersection_count = 0
-            for road_line in road_lines:
-                if signal_buffer.intersects(road_line):
-                    intersection_count += 1
+def select_eligible_signals(road_counts: Dict[str, int], min_road_intersections: int) -> Set[str]:
+    """
+    Select the signals whose buffers intersect enough roads.
 
-            # Only include if buffer intersects with at least min_road_intersections roads
-            if intersection_count >= min_road_intersections:
-                eligible_signal_ids.add(str(node.id))
-                logger.debug(
-                    f"Signal {node.id} intersects with {intersection_count} roads"
-                )
+    Args:
+        road_counts: Dictionary mapping signal node IDs to the number of intersecting roads
+        min_road_intersections: Minimum number of road intersections required
 
-        except Exception as e:
-            logger.warning(f"Error processing signal node {node.id}: {e}")
-            continue
+    Returns:
+        Set of eligible signal node IDs
+    """
+    eligible_signal_ids = set()
+    for signal_id, intersection_count in road_counts.items():
+        # Only include if buffer intersects with at least min_road_intersections roads
+        if intersection_count >= min_road_intersections:
+            eligible_signal_ids.add(signal_id)
+            logger.debug(
+                f"Signal {signal_id} intersects with {intersection_count} roads"
+            )
 
     logger.info(
         f"Found {len(eligible_signal_ids)} traffic signals intersecting with "
@@ -113,6 +135,76 @@ def filter_traffic_signals_by_spatial_query(
     return eligible_signal_ids
 
 
+def signal_node_mask(store: ChunkStore, bbox: Optional[List[float]] = None) -> np.ndarray:
+    """
+    Select the traffic signal nodes of a chunk store.
+
+    Args:
+        store: Chunk store
+        bbox: Optional bounding box [min_lon, min_lat, max_lon, max_lat] the
+            signals must lie in (edges included)
+
+    Returns:
+        Boolean mask aligned with store.node_ids
+    """
+    mask = store.node_tags.equals("highway", "traffic_signals")
+    if bbox is not None:
+        mask &= store.nodes_in_bbox(bbox)
+    return mask
+
+
+def filter_store_signals_by_spatial_query(
+    store: ChunkStore,
+    road_mask: np.ndarray,
+    signal_mask: np.ndarray,
+    buffer_radius_meters: float = 2.0,
+    min_road_intersections: int = 3,
+) -> Set[str]:
+    """
+    Filter the traffic signals of a chunk store using spatial queries against its two-lane roads.
+
+    Same selection as filter_traffic_signals_by_spatial_query(), without
+    building overpy objects.
+
+    Args:
+        store: Chunk store holding the roads and signals
+        road_mask: Boolean mask over store ways selecting the two-lane roads
+        signal_mask: Boolean mask over store nodes selecting the traffic signals
+        buffer_radius_meters: Radius of buffer around each signal (default: 2.0 meters)
+        min_road_intersections: Minimum number of road intersections required (default: 3)
+
+    Returns:
+        Set of node IDs that are traffic signals intersecting with roads
+    """
+    road_counts = count_store_signal_roads(store, road_mask, signal_mask, buffer_radius_meters)
+    return select_eligible_signals(road_counts, min_road_intersections)
+
+
+def count_store_signal_roads(
+    store: ChunkStore,
+    road_mask: np.ndarray,
+    signal_mask: np.ndarray,
+    buffer_radius_meters: float = 2.0,
+) -> Dict[str, int]:
+    """
+    Count the two-lane roads within the buffer of each traffic signal of a chunk store.
+
+    Args:
+        store: Chunk store holding the roads and signals
+        road_mask: Boolean mask over store ways selecting the two-lane roads
+        signal_mask: Boolean mask over store nodes selecting the traffic signals
+        buffer_radius_meters: Radius of buffer around each signal (default: 2.0 meters)
+
+    Returns:
+        Dictionary mapping signal node IDs to the number of intersecting roads
+    """
+    workspace = ProjectedWorkspace.from_store(store, road_mask, signal_mask)
+    logger.info(f"Created {len(workspace.road_lines)} road LineString geometries")
+
+    counts = workspace.count_roads_within(buffer_radius_meters)
+    return {signal_id: int(count) for signal_id, count in zip(workspace.signal_ids, counts)}
+
+
 def find_traffic_signal_nodes(result: overpy.Result) -> Set[str]:
     """
     Extract node IDs that have traffic signals.
@@ -170,6 +262,36 @@ def create_intersection_records_from_signals(
     return intersection_records
 
 
+def create_intersection_records_from_store(
+    store: ChunkStore, signal_node_ids: Set[str]
+) -> List[Dict]:
+    """
+    Create intersection records from the traffic signal nodes of a chunk store.
+
+    Args:
+        store: Chunk store holding the signal nodes
+        signal_node_ids: Set of node IDs that are eligible traffic signals
+
+    Returns:
+        List of intersection dictionaries with node_id, coordinates, and signal info
+    """
+    node_indices = store.node_index([int(node_id) for node_id in signal_node_ids])
+    node_indices = np.sort(node_indices[node_indices >= 0])
+
+    return [
+        {
+            "node_id": str(store.node_ids[i]),
+            "lon": float(store.node_lons[i]),
+            "lat": float(store.node_lats[i]),
+            "roads": [],  # Will be empty since we're using signals directly
+            "road_names": [],
+            "road_ids": [],
+            "num_roads": 0,
+        }
+        for i in node_indices
+    ]
+
+
 def filter_intersections_with_signals(
     intersections: List[Dict], signal_node_ids: Set[str]
 ) -> List[Dict]:
@@ -4,6 +4,39 @@ Functions to filter and identify two-lane roads from OSM data.
 
 import overpy
 from typing import List, Dict, Set
+import numpy as np
+from chunk_store import ChunkStore
+
+# Two-lane rule set, shared by the client-side checks and the Overpass filters
+EXCLUDED_HIGHWAYS = ["service"]
+MAX_LANES = 4
+PLAIN_TWO_LANES = 2
+DIRECTIONAL_LANE_DIFFERENCE = 1
+
+# Bump when the logic of the two-lane rules changes, so chunks are re-run and
+# cached two-lane road sets are recomputed
+TWO_LANE_RULES_VERSION = 1
+
+# Plain decimal spellings of integer tag values, as accepted by int()
+_INT_PATTERN = "^ *[+-]?[0-9]+ *$"
+_NON_POSITIVE_PATTERN = "^ *(-[0-9]+|[+]?0+) *$"
+_NEGATIVE_PATTERN = "^ *-0*[1-9][0-9]* *$"
+
+
+def rule_parameters() -> Dict[str, object]:
+    """
+    Describe the two-lane rule set, for keying results derived from it.
+
+    Returns:
+        Dictionary of the rule constants and TWO_LANE_RULES_VERSION
+    """
+    return {
+        "version": TWO_LANE_RULES_VERSION,
+        "excluded_highways": EXCLUDED_HIGHWAYS,
+        "max_lanes": MAX_LANES,
+        "plain_two_lanes": PLAIN_TWO_LANES,
+        "directional_lane_difference": DIRECTIONAL_LANE_DIFFERENCE,
+    }
 
 
 def is_two_lane_road(way: overpy.Way) -> bool:
@@ -23,7 +56,7 @@ def is_two_lane_road(way: overpy.Way) -> bool:
     tags = way.tags
 
     # Automatically ignore service roads
-    if tags.get("highway") == "service":
+    if tags.get("highway") in EXCLUDED_HIGHWAYS:
         return False
 
     # Get total lanes
@@ -38,7 +71,7 @@ def is_two_lane_road(way: overpy.Way) -> bool:
     if lanes is None:
         return False
 
-    if lanes != 2 and lanes > 4:
+    if lanes != PLAIN_TWO_LANES and lanes > MAX_LANES:
         return False
 
     # Get forward and backward lanes
@@ -59,16 +92,16 @@ def is_two_lane_road(way: overpy.Way) -> bool:
 
     # Check if lanes - lanes:forward = 1
     if forward_lanes is not None:
-        if lanes - forward_lanes == 1:
+        if lanes - forward_lanes == DIRECTIONAL_LANE_DIFFERENCE:
             return True
 
     # Check if lanes - lanes:backward = 1
     if backward_lanes is not None:
-        if lanes - backward_lanes == 1:
+        if lanes - backward_lanes == DIRECTIONAL_LANE_DIFFERENCE:
             return True
 
     # If no forward/backward lanes specified, but lanes is 2, assume it's two-lane
-    if lanes == 2 and forward_lanes is None and backward_lanes is None:
+    if lanes == PLAIN_TWO_LANES and forward_lanes is None and backward_lanes is None:
         return True
 
     return False
@@ -91,6 +124,86 @@ def filter_two_lane_roads(result: overpy.Result) -> List[overpy.Way]:
     return two_lane_roads
 
 
+def two_lane_way_mask(store: ChunkStore) -> np.ndarray:
+    """
+    Select the two-lane roads among the ways of a chunk store.
+
+    Applies the same rules as is_two_lane_road() to whole tag columns at once.
+
+    Args:
+        store: Chunk store with the ways to check
+
+    Returns:
+        Boolean mask aligned with store.way_ids
+    """
+    tags = store.way_tags
+    lanes = tags.int_values("lanes")
+    forward_lanes = tags.int_values("lanes:forward")
+    backward_lanes = tags.int_values("lanes:backward")
+
+    # Must have a usable lanes tag that is 2 or <= 4, and not be a service road
+    eligible = ~np.isnan(lanes)
+    for highway in EXCLUDED_HIGHWAYS:
+        eligible &= ~tags.equals("highway", highway)
+    eligible &= (lanes == PLAIN_TWO_LANES) | (lanes <= MAX_LANES)
+
+    # lanes - lanes:forward = 1 or lanes - lanes:backward = 1 (NaN never matches)
+    directional = (lanes - forward_lanes == DIRECTIONAL_LANE_DIFFERENCE) | (
+        lanes - backward_lanes == DIRECTIONAL_LANE_DIFFERENCE
+    )
+
+    # If no forward/backward lanes specified, but lanes is 2, assume it's two-lane
+    plain_two_lane = (lanes == PLAIN_TWO_LANES) & np.isnan(forward_lanes) & np.isnan(backward_lanes)
+
+    return eligible & (directional | plain_two_lane)
+
+
+def _int_value_pattern(value: int) -> str:
+    """Regex matching the plain decimal spellings of a non-negative integer (e.g. "2", "02", "+2")."""
+    if value == 0:
+        return "^ *[+-]?0+ *$"
+    return f"^ *[+]?0*{value} *$"
+
+
+def build_two_lane_overpass_filters(highway_values: List[str]) -> List[str]:
+    """
+    Translate the two-lane rule set into Overpass QL way filters.
+
+    The union of the returned filters selects every way is_two_lane_road()
+    accepts whose lane tags are plain decimal integers, so most rejected
+    ways are never downloaded. The client-side check still runs on the
+    result.
+
+    Args:
+        highway_values: Highway types to query (excluded types are dropped)
+
+    Returns:
+        List of Overpass QL way statements (without trailing semicolons)
+    """
+    highways = "|".join(h for h in highway_values if h not in EXCLUDED_HIGHWAYS)
+    way = f'way["highway"~"^({highways})$"]'
+
+    # lanes is 2 and neither lanes:forward nor lanes:backward is an integer
+    filters = [
+        f'{way}["lanes"~"{_int_value_pattern(PLAIN_TWO_LANES)}"]'
+        f'["lanes:forward"!~"{_INT_PATTERN}"]["lanes:backward"!~"{_INT_PATTERN}"]'
+    ]
+
+    # lanes <= 4 and lanes - lanes:forward (or lanes:backward) = 1
+    for lanes in range(DIRECTIONAL_LANE_DIFFERENCE, MAX_LANES + 1):
+        directional_lanes = lanes - DIRECTIONAL_LANE_DIFFERENCE
+        for key in ("lanes:forward", "lanes:backward"):
+            filters.append(
+                f'{way}["lanes"~"{_int_value_pattern(lanes)}"]'
+                f'["{key}"~"{_int_value_pattern(directional_lanes)}"]'
+            )
+
+    # lanes <= 0 can only differ by 1 from a negative lanes:forward (or lanes:backward)
+    for key in ("lanes:forward", "lanes:backward"):
+        filters.append(f'{way}["lanes"~"{_NON_POSITIVE_PATTERN}"]["{key}"~"{_NEGATIVE_PATTERN}"]')
+    return filters
+
+
 def get_road_name(way: overpy.Way) -> str:
     """
     Get the name of a road from its OSM tags.